@@ -0,0 +1,88 @@
+'''
+Description:
+    Benchmark of game search on PostgreSQL: the former `title__icontains` query against the ranked
+    full-text search of gamelist.search, on a synthetic catalog of --games games.
+
+    Both queries fetch the first page of 10 results and count all matches, like SearchGameView.
+    The games are inserted inside a transaction that is rolled back at the end, so the configured
+    database is left untouched. Run it against a migrated PostgreSQL database.
+
+Usage:
+    python benchmarks/bench_game_search.py [--games N] [--runs N]
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamebase.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+
+from gamelist import search  # noqa: E402
+from gamelist.models import Game  # noqa: E402
+
+WORDS = (
+    'dragon castle farm train space empire trade dice card tile worker placement deck island ocean '
+    'forest mountain city road river kingdom war peace merchant wizard quest treasure ancient robot '
+    'zombie pirate galaxy colony harvest market guild tower dungeon hero legend'
+).split()
+
+TERMS = ['dragon', 'space empire', 'pirate treasure', 'robot', 'kingdom war']
+
+
+def create_games(count, rng):
+    games = []
+    for n in range(count):
+        title = ' '.join(rng.choices(WORDS, k=3)).title() + f' {n}'
+        description = ' '.join(rng.choices(WORDS, k=120))
+        games.append(Game(
+            title=title, author=' '.join(rng.choices(WORDS, k=2)).title(), description=description,
+            min_players=1, max_players=4, game_time='60 min',
+        ))
+    Game.objects.bulk_create(games, batch_size=2000)
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE gamelist_game')
+
+
+def measure(runs, query):
+    started = time.perf_counter()
+    for _ in range(runs):
+        for term in TERMS:
+            games = query(term)
+            games.count()
+            list(games[:10])
+    return (time.perf_counter() - started) / (runs * len(TERMS)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        sys.exit('This benchmark needs PostgreSQL.')
+
+    with transaction.atomic():
+        started = time.perf_counter()
+        create_games(args.games, random.Random(0))
+        print(f'{args.games} games inserted in {time.perf_counter() - started:.1f} s')
+
+        icontains = measure(args.runs, lambda term: Game.objects.filter(title__icontains=term))
+        full_text = measure(args.runs, search.search_games)
+        print(f'title__icontains   {icontains:8.2f} ms per search')
+        print(f'full-text search   {full_text:8.2f} ms per search')
+        transaction.set_rollback(True)
+
+
+if __name__ == '__main__':
+    main()
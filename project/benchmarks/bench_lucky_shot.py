@@ -0,0 +1,81 @@
+'''
+Description:
+    Benchmark of the LuckyShot random pick: the former `random.choice(queryset)`, which loads every
+    matching game, against userbase.lucky.pick_random, on a user collection of --games games.
+
+    Reports time and peak Python memory (tracemalloc) per pick. The user and games are created inside
+    a transaction that is rolled back at the end, so the configured database is left untouched.
+    Run it against a migrated database.
+
+Usage:
+    python benchmarks/bench_lucky_shot.py [--games N] [--runs N]
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamebase.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import transaction  # noqa: E402
+
+from gamelist.models import Game  # noqa: E402
+from userbase import lucky  # noqa: E402
+from userbase.models import User  # noqa: E402
+
+
+def create_collection(count):
+    user = User.objects.create_user(email='bench-lucky-shot@example.com', password='x', nick='bench-lucky-shot')
+    games = Game.objects.bulk_create([
+        Game(title=f'Lucky Shot Benchmark {n}', author='A', description='x' * 500, min_players=1, max_players=4,
+             game_time='60 min', min_minutes=60, max_minutes=60)
+        for n in range(count)
+    ], batch_size=1000)
+    User.games.through.objects.bulk_create(
+        [User.games.through(user_id=user.pk, game_id=game.pk) for game in games], batch_size=1000,
+    )
+    return user
+
+
+def measure(runs, pick):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(runs):
+        pick()
+    elapsed = (time.perf_counter() - started) / runs * 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=5_000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    with transaction.atomic():
+        user = create_collection(args.games)
+
+        def games():
+            return user.games.filter(min_players__lte=2, max_players__gte=2)
+
+        choice = measure(args.runs, lambda: random.choice(games()))
+        offset = measure(args.runs, lambda: lucky.pick_random(games()))
+        print(f'{args.games} games in the collection')
+        print(f'random.choice(queryset)  {choice[0]:8.2f} ms per pick {choice[1]:10.0f} KiB peak')
+        print(f'lucky.pick_random        {offset[0]:8.2f} ms per pick {offset[1]:10.0f} KiB peak')
+        transaction.set_rollback(True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+'''
+Description:
+    Micro-benchmark of og:image extraction: the former full BeautifulSoup parse of a BoardGameGeek
+    page against the streaming extractor in gamelist.bgg, on a synthetic page of realistic size.
+
+Usage:
+    python benchmarks/bench_og_extract.py [--runs N]
+'''
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamebase.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from gamelist.bgg import CHUNK_SIZE, extract_og_metadata  # noqa: E402
+
+
+def build_page():
+    # Roughly the shape of a BGG game page: a script-heavy head and a large body
+    head = (
+        '<head><title>Test Game | Board Game | BoardGameGeek</title>'
+        + '<link rel="stylesheet" href="/static/app.css">' * 20
+        + '<meta property="og:title" content="Test Game">'
+        + '<meta property="og:image" content="https://cf.geekdo-images.com/test/img/cover.jpg">'
+        + '<script>' + 'var x = 1;' * 3000 + '</script>'
+        + '</head>'
+    )
+    body = '<body>' + '<div class="row"><a href="/boardgame/1">Game</a><span>text</span></div>' * 6000 + '</body>'
+    return '<!DOCTYPE html><html>' + head + body + '</html>'
+
+
+def soup_extract(page_bytes):
+    soup = BeautifulSoup(page_bytes.decode('utf-8'), 'html.parser')
+    return soup.find('meta', property='og:image').get('content')
+
+
+def stream_extract(page_bytes):
+    chunks = (page_bytes[i:i + CHUNK_SIZE].decode('utf-8') for i in range(0, len(page_bytes), CHUNK_SIZE))
+    return extract_og_metadata(chunks, stop_at='image')['image']
+
+
+def measure(name, func, page_bytes, runs):
+    assert func(page_bytes).endswith('cover.jpg')
+    seconds = timeit.timeit(lambda: func(page_bytes), number=runs) / runs
+    tracemalloc.start()
+    func(page_bytes)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f'{name:<14} {seconds * 1000:9.2f} ms/page {peak / 1024:10.0f} KiB peak')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    page_bytes = build_page().encode('utf-8')
+    print(f'page size: {len(page_bytes) / 1024:.0f} KiB')
+    measure('beautifulsoup', soup_extract, page_bytes, args.runs)
+    measure('streaming', stream_extract, page_bytes, args.runs)
+
+
+if __name__ == '__main__':
+    main()
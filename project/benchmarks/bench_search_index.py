@@ -0,0 +1,70 @@
+'''
+Description:
+    Benchmark of the in-process search index of gamelist.search_index: build time and the latency of
+    first and repeated (cached) queries on a synthetic catalog of --games games. The index is filled
+    directly, no database is touched.
+
+Usage:
+    python benchmarks/bench_search_index.py [--games N] [--runs N]
+'''
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamebase.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from gamelist.search_index import InvertedIndex  # noqa: E402
+
+WORDS = (
+    'dragon castle farm train space empire trade dice card tile worker placement deck island ocean '
+    'forest mountain city road river kingdom war peace merchant wizard quest treasure ancient robot '
+    'zombie pirate galaxy colony harvest market guild tower dungeon hero legend'
+).split()
+
+TERMS = ['dragon', 'space empire', 'pirate treas', 'robot', 'kingdom war', 'zombie 1234']
+
+
+def documents(count, rng):
+    for n in range(count):
+        yield n, {
+            'title': ' '.join(rng.choices(WORDS, k=3)).title() + f' {n}',
+            'author': ' '.join(rng.choices(WORDS, k=2)).title(),
+            'categories': rng.sample(WORDS, 2),
+            'mechanics': rng.sample(WORDS, 3),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--games', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    index = InvertedIndex()
+    started = time.perf_counter()
+    for game_id, document in documents(args.games, random.Random(0)):
+        index.add(game_id, **document)
+    print(f'{args.games} games indexed in {time.perf_counter() - started:.1f} s')
+
+    for term in TERMS:
+        started = time.perf_counter()
+        matches = index.search(term)
+        cold = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            index.search(term)
+        cached = (time.perf_counter() - started) / args.runs * 1000
+        print(f'{term!r:16} {len(matches):7} matches {cold:8.3f} ms first search {cached:8.4f} ms repeated')
+
+
+if __name__ == '__main__':
+    main()
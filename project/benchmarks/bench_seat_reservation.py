@@ -0,0 +1,99 @@
+'''
+Description:
+    Benchmark of concurrent joins on PostgreSQL: --joiners threads race for the --seats seats of one
+    invitation through userbase.seats.reserve_seat, each on its own database connection.
+
+    Checks that exactly --seats joins succeed and that seats_taken matches the players rows, and reports
+    the join latency percentiles, which bound the time a joiner waits for the invitation row lock.
+    The benchmark needs committed rows visible to every connection; it deletes them at the end.
+
+Usage:
+    python benchmarks/bench_seat_reservation.py [--seats N] [--joiners N] [--rounds N]
+'''
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamebase.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+
+from gamelist.models import Game  # noqa: E402
+from userbase import seats  # noqa: E402
+from userbase.models import GameInvitation, User  # noqa: E402
+
+PREFIX = 'bench-seat-reservation'
+
+
+def run_round(invitation, joiners):
+    barrier = threading.Barrier(len(joiners))
+    outcomes, latencies, lock = [], [], threading.Lock()
+
+    def join(user):
+        try:
+            barrier.wait()
+            started = time.perf_counter()
+            outcome = seats.reserve_seat(GameInvitation.objects.get(pk=invitation.pk), user)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                outcomes.append(outcome)
+                latencies.append(elapsed)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=join, args=[user]) for user in joiners]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seats', type=int, default=6)
+    parser.add_argument('--joiners', type=int, default=50)
+    parser.add_argument('--rounds', type=int, default=10)
+    args = parser.parse_args()
+
+    if connection.vendor != 'postgresql':
+        sys.exit('This benchmark needs PostgreSQL.')
+
+    host = User.objects.create_user(email=f'{PREFIX}-host@example.com', password='x', nick=f'{PREFIX}-host')
+    joiners = [
+        User.objects.create_user(email=f'{PREFIX}-{n}@example.com', password='x', nick=f'{PREFIX}-{n}')
+        for n in range(args.joiners)
+    ]
+    game = Game.objects.create(title=f'{PREFIX} game', author='A', description='', min_players=1, max_players=99,
+                               game_time='60 min')
+    try:
+        latencies, overbooked = [], 0
+        for _ in range(args.rounds):
+            invitation = GameInvitation.objects.create(user=host, game=game, no_players=args.seats, game_place='Bench')
+            outcomes, round_latencies = run_round(invitation, joiners)
+            latencies.extend(round_latencies)
+            invitation.refresh_from_db()
+            players = invitation.players.count()
+            if outcomes.count(seats.JOINED) != args.seats or players != args.seats or invitation.seats_taken != players:
+                overbooked += 1
+        quantiles = statistics.quantiles(latencies, n=100, method='inclusive')
+        print(f'{args.rounds} rounds of {args.joiners} joiners for {args.seats} seats')
+        print(f'rounds with a wrong seat count: {overbooked}')
+        print(f'join latency: median {quantiles[49]:.2f} ms, p95 {quantiles[94]:.2f} ms, max {max(latencies):.2f} ms')
+    finally:
+        game.delete()
+        User.objects.filter(email__startswith=PREFIX).delete()
+
+
+if __name__ == '__main__':
+    main()
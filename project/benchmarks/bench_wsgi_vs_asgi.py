@@ -0,0 +1,140 @@
+'''
+Description:
+    Load benchmark of GameDetailView served through the WSGI and the ASGI handler while
+    BoardGameGeek is slow. A local stub answers every page after --delay seconds, and the
+    image cache of the benchmark games is cleared before each request, so every request
+    has to wait for the stub.
+
+    WSGI is driven by a fixed pool of --threads worker threads, like a threaded WSGI server.
+    ASGI is driven by --concurrency concurrent requests on a single event loop, like one ASGI worker.
+
+    The benchmark creates its own games (titles starting with "bench-asgi-") in the configured
+    database and removes them afterwards. Run it against a migrated database.
+
+Usage:
+    python benchmarks/bench_wsgi_vs_asgi.py [--requests N] [--delay S] [--threads N] [--concurrency N]
+'''
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gamebase.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.asgi import get_asgi_application  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+from gamelist import covers  # noqa: E402
+from gamelist.models import Game  # noqa: E402
+
+PAGE = (
+    b'<html><head><meta property="og:image" content="http://127.0.0.1/cover.jpg"></head>'
+    b'<body>' + b'x' * 10000 + b'</body></html>'
+)
+
+
+class SlowBGGHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def reset_images(game_pks):
+    Game.objects.filter(pk__in=game_pks).update(image_url='', image_fetched_at=None, cover_source_url='')
+
+
+def run_wsgi(game_pks, total, threads):
+    application = get_wsgi_application()
+    local = threading.local()
+
+    def request(n):
+        if not hasattr(local, 'client'):
+            local.client = httpx.Client(transport=httpx.WSGITransport(app=application), base_url='http://localhost')
+        response = local.client.get(f'/all_games/{game_pks[n % len(game_pks)]}/')
+        assert response.status_code == 200, response.status_code
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(request, range(total)))
+    return time.monotonic() - started
+
+
+async def run_asgi(game_pks, total, concurrency):
+    application = get_asgi_application()
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=application)
+    async with httpx.AsyncClient(transport=transport, base_url='http://localhost') as client:
+        async def request(n):
+            async with semaphore:
+                response = await client.get(f'/all_games/{game_pks[n % len(game_pks)]}/')
+                assert response.status_code == 200, response.status_code
+
+        started = time.monotonic()
+        await asyncio.gather(*(request(n) for n in range(total)))
+        return time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--delay', type=float, default=0.2, help='Seconds the BGG stub waits before answering.')
+    parser.add_argument('--threads', type=int, default=8, help='WSGI worker threads.')
+    parser.add_argument('--concurrency', type=int, default=100, help='Concurrent ASGI requests.')
+    args = parser.parse_args()
+
+    # Measure request handling only, without mirroring covers in the background
+    covers.schedule_cover_mirror = lambda game_pk: None
+    settings.BGG_HTTP_POOL_SIZE = max(args.threads, args.concurrency)
+
+    stub = ThreadingHTTPServer(('127.0.0.1', 0), SlowBGGHandler)
+    stub.daemon_threads = True
+    stub.delay = args.delay
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    bgg_link = f'http://127.0.0.1:{stub.server_port}/boardgame/'
+
+    game_pks = [
+        Game.objects.create(
+            title=f'bench-asgi-{n}', author='bench', description='bench', min_players=1, max_players=4,
+            game_time='30 min', bgg_link=f'{bgg_link}{n}',
+        ).pk
+        for n in range(args.requests)
+    ]
+    try:
+        print(f'{args.requests} requests, BGG delay {args.delay * 1000:.0f} ms')
+
+        reset_images(game_pks)
+        seconds = run_wsgi(game_pks, args.requests, args.threads)
+        print(f'WSGI  {args.threads:4d} threads     {seconds:7.2f} s  {args.requests / seconds:8.1f} req/s')
+
+        reset_images(game_pks)
+        seconds = asyncio.run(run_asgi(game_pks, args.requests, args.concurrency))
+        print(f'ASGI  {args.concurrency:4d} concurrent  {seconds:7.2f} s  {args.requests / seconds:8.1f} req/s')
+    finally:
+        Game.objects.filter(pk__in=game_pks).delete()
+        stub.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -139,4 +139,91 @@ AUTH_USER_MODEL = "userbase.User"
 AUTHENTICATION_BACKENDS = [
     # 'path.to.YourCustomBackend',
     'django.contrib.auth.backends.ModelBackend',
-]
\ No newline at end of file
+]
+
+# BoardGameGeek cover image cache
+# Resolved og:image URLs are stored on Game and re-fetched in the background once stale.
+
+BGG_IMAGE_TTL = 60 * 60 * 24 * 7  # seconds a resolved image URL is considered fresh
+
+BGG_IMAGE_NEGATIVE_TTL = 60 * 60 * 24  # seconds a page without an image is remembered
+
+BGG_REFRESH_IN_BACKGROUND = True  # refresh stale entries in a worker thread instead of inline
+
+# Outbound BoardGameGeek client, shared by every request made to BGG
+
+BGG_HTTP_CONNECT_TIMEOUT = 3.05  # seconds
+
+BGG_HTTP_READ_TIMEOUT = 10  # seconds
+
+BGG_HTTP_POOL_SIZE = 10  # keep-alive connections per host
+
+BGG_CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures before BGG calls are stopped
+
+BGG_CIRCUIT_RESET_TIMEOUT = 30  # seconds before a single trial call is let through again
+
+# Local cover image mirror
+# Thumbnails are stored under content-hashed names, so they never change and can be cached forever.
+# In production serve COVER_ROOT at COVER_URL directly from the web server.
+
+COVER_ROOT = BASE_DIR / 'covers'
+
+COVER_URL = '/covers/'
+
+COVER_THUMBNAIL_WIDTHS = [96, 240, 480]  # pixels
+
+COVER_MAX_BYTES = 10 * 1024 * 1024
+
+COVER_CACHE_MAX_AGE = 60 * 60 * 24 * 365  # seconds
+
+# Cache
+# Required to be shared by every worker process: the catalog and search versions live in it (see
+# gamelist.catalog), and with them the validity of cached pages, ETags, facet counts, in-process
+# search indexes and calendar feed ETags. A per-process cache (LocMemCache, Django's default) is only
+# correct with a single process, e.g. runserver or tests; `manage.py check` warns about it (gamelist.W001).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    }
+}
+
+# Catalog page cache
+# Rendered game, category and mechanic lists are cached per catalog version, which is bumped
+# whenever a game, category or mechanic changes, so entries never have to be deleted.
+
+CATALOG_PAGE_CACHE_TIMEOUT = 60 * 10  # seconds, also bounds staleness of per-user parts like the nick
+
+# Game search
+# On PostgreSQL titles whose pg_trgm word similarity to the query reaches this threshold are
+# returned after the full-text matches, so misspelled titles are still found.
+# It is passed to the server when a connection is opened, so setting it costs no query per request;
+# a DATABASES setting defined elsewhere has to carry these options itself.
+
+GAME_SEARCH_SIMILARITY_THRESHOLD = 0.4
+
+DATABASES['default'].setdefault('OPTIONS', {})['options'] = (
+    f'-c pg_trgm.word_similarity_threshold={GAME_SEARCH_SIMILARITY_THRESHOLD}'
+)
+
+# Search backend used by SearchGameView and the facet counts:
+# 'gamelist.search.DatabaseSearchBackend' (PostgreSQL full-text and trigram search, plain matching elsewhere)
+# or 'gamelist.search_index.InvertedIndexBackend' (in-process index, for SQLite and offline installs).
+
+GAME_SEARCH_BACKEND = 'gamelist.search.DatabaseSearchBackend'
+
+# JSON snapshot the in-process index is loaded from instead of the database, written by
+# `manage.py build_search_index`. Ignored if it no longer matches the catalog.
+
+GAME_SEARCH_INDEX_SNAPSHOT = None
+
+# Seconds browsers and proxies may reuse search box suggestions (gamelist.views.SuggestGamesView).
+
+GAME_SUGGEST_MAX_AGE = 60
+
+# Game invitations
+# `manage.py archive_invitations` moves invitations whose game started more than this many days ago,
+# with their players, to the archive tables read by the history page.
+
+INVITATION_ARCHIVE_AFTER_DAYS = 90
@@ -15,7 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 
 from gamelist import views as gamelist_view
 from userbase import views as userbase_view
@@ -43,18 +43,25 @@ urlpatterns = [
     path('register/', userbase_view.UserCreationView.as_view(), name='register'),
     path('test/', userbase_view.my_view, name='test'),
     path('search/', gamelist_view.SearchGameView.as_view(), name='search'),
+    path('search/suggest', gamelist_view.SuggestGamesView.as_view(), name='search-suggest'),
     path('delete_game/<int:game_pk>/', gamelist_view.DeleteGameView.as_view(), name='delete-game'),
     path('delete_mechanic/<int:mechanic_pk>/', gamelist_view.DeleteGameMechanicView.as_view(), name='delete-mechanic'),
     path('delete_category/<int:category_pk>/', gamelist_view.DeleteCategoryView.as_view(), name='delete-category'),
     path('delete_invitation/<int:invitation_pk>/', userbase_view.DeleteInvitationView.as_view(), name='delete-invitation'),
     path('user_collection/', userbase_view.UserCollectionView.as_view(), name='user-collection'),
     path('user_invitations/', userbase_view.UserInvitationsView.as_view(), name='user-invitations'),
+    path('calendar/<str:token>.ics', userbase_view.InvitationCalendarView.as_view(), name='invitation-calendar'),
+    path('calendar_token/', userbase_view.CalendarTokenView.as_view(), name='calendar-token'),
+    path('invitation_history/', userbase_view.InvitationHistoryView.as_view(), name='invitation-history'),
+    path('discover_invitations/', userbase_view.DiscoverInvitationsView.as_view(), name='discover-invitations'),
     path('user_invitations/<int:invitation_pk>/', userbase_view.UserInvitationDetailsView.as_view(), name='invitation-details'),
     path('user_invitations/<int:invitation_pk>/', userbase_view.UserInvitationDetailsView.as_view(), name='accept-invitation'),
     path('user_invitations/<int:invitation_pk>/<int:player_pk>', userbase_view.UserInvitationDetailsView.as_view(), name='decline-player'),
+    path('user_invitations/<int:invitation_pk>/waitlist/', userbase_view.InvitationWaitlistView.as_view(), name='invitation-waitlist'),
     path('add_invitation/', userbase_view.AddInvitationView.as_view(), name='add-invitation'),
     path('edit_invitation/<int:invitation_pk>/', userbase_view.EditInvitationView.as_view(), name='edit-invitation'),
     path('user_collection/add/<int:game_pk>/', userbase_view.AddGameToCollectionView.as_view(), name='add-to-collection'),
     path('user_collection/delete/<int:game_pk>/', userbase_view.DeleteGameFromCollectionView.as_view(), name='delete-from-collection'),
     path('lucky_shot/', userbase_view.LuckyShotView.as_view(), name='lucky-shot'),
+    re_path(r'^covers/(?P<shard>[0-9a-f]{2})/(?P<name>[0-9a-f]{64}-\d+\.jpg)$', gamelist_view.CoverImageView.as_view(), name='cover-image'),
 ]
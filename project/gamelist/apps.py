@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GamelistConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gamelist'
+
+    def ready(self):
+        from gamelist import checks, signals  # noqa: F401
@@ -0,0 +1,304 @@
+import codecs
+import threading
+from html.parser import HTMLParser
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+from django.utils import timezone
+
+from gamelist.models import Game
+from gamelist.outbound import AsyncOutboundClient, CircuitOpenError, OutboundClient, metrics
+
+
+REFRESH_LOCK_TIMEOUT = 60  # seconds, stops concurrent page views from refreshing the same game twice
+
+CHUNK_SIZE = 8192  # bytes read from a BoardGameGeek page at a time
+
+
+class BGGFetchError(Exception):
+    '''
+    Description:
+        Raised when a BoardGameGeek page could not be fetched for a reason worth retrying
+        (network error, timeout, rate limiting or a server error).
+    '''
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    '''
+    Description:
+        Returns the shared OutboundClient used for every request to BoardGameGeek.
+    '''
+
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OutboundClient(
+                'bgg',
+                connect_timeout=settings.BGG_HTTP_CONNECT_TIMEOUT,
+                read_timeout=settings.BGG_HTTP_READ_TIMEOUT,
+                pool_size=settings.BGG_HTTP_POOL_SIZE,
+                failure_threshold=settings.BGG_CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.BGG_CIRCUIT_RESET_TIMEOUT,
+            )
+        return _client
+
+
+def new_async_client():
+    '''
+    Description:
+        Returns a new AsyncOutboundClient for BoardGameGeek, to be used as an async context manager by one
+        request and closed with it. Under WSGI every async view runs in a fresh event loop, so a client kept
+        per loop would never be reused nor closed. It shares the circuit breaker of the synchronous client,
+        so both stop calling BGG together.
+    '''
+
+    return AsyncOutboundClient(
+        'bgg',
+        connect_timeout=settings.BGG_HTTP_CONNECT_TIMEOUT,
+        read_timeout=settings.BGG_HTTP_READ_TIMEOUT,
+        pool_size=settings.BGG_HTTP_POOL_SIZE,
+        breaker=get_client().breaker,
+    )
+
+
+def reset_client():
+    '''
+    Description:
+        Closes the shared client; the next call to get_client builds a new one from the settings.
+    '''
+
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+@receiver(setting_changed)
+def _reset_client_on_setting_change(setting, **kwargs):
+    if setting.startswith('BGG_HTTP_') or setting.startswith('BGG_CIRCUIT_'):
+        reset_client()
+
+
+class OpenGraphParser(HTMLParser):
+    '''
+    Description:
+        Incremental HTML parser collecting og: meta tags without building a document tree.
+        It can be fed a page in arbitrary chunks and sets `done` as soon as the rest of the
+        page cannot contain anything of interest.
+
+    Variables:
+        metadata: Dict of og: properties found so far, keyed without the 'og:' prefix.
+        stop_at: Optional property name (e.g. 'image') after which parsing is done.
+        done: True once the head has ended or the stop_at property was found.
+    '''
+
+    def __init__(self, stop_at=None):
+        super().__init__(convert_charrefs=True)
+        self.metadata = {}
+        self.stop_at = stop_at
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            attrs = dict(attrs)
+            prop = attrs.get('property') or ''
+            if prop.startswith('og:'):
+                self.metadata.setdefault(prop[3:], attrs.get('content') or '')
+                if prop[3:] == self.stop_at:
+                    self.done = True
+        elif tag == 'body':
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.done = True
+
+
+def extract_og_metadata(chunks, stop_at=None):
+    '''
+    Description:
+        Reads text chunks of an HTML page until the og: metadata is complete and returns it.
+        Chunks after the end of the head (or after the stop_at property) are never consumed.
+    '''
+
+    parser = OpenGraphParser(stop_at=stop_at)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    return parser.metadata
+
+
+def _iter_text(response):
+    # Decode incrementally so a multi-byte character split between chunks survives
+    encoding = response.encoding if 'charset' in response.headers.get('Content-Type', '') else 'utf-8'
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+
+def fetch_og_metadata(bgg_link, stop_at=None):
+    '''
+    Description:
+        Streams a BoardGameGeek page and returns its Open Graph metadata. Only the head of the
+        page is downloaded; the connection is dropped as soon as the metadata is complete.
+
+    Returns:
+        A dict mapping og: property names without the prefix (e.g. 'image', 'title') to their content.
+        The dict is empty if the page does not exist or has no og: tags.
+
+    Raises:
+        BGGFetchError: If the page could not be fetched and the request may succeed later,
+            including while the circuit breaker of the client is open.
+    '''
+
+    try:
+        with get_client().get(bgg_link, stream=True) as response:
+            if response.status_code == 429 or response.status_code >= 500:
+                raise BGGFetchError(f'{bgg_link} responded with {response.status_code}')
+            if response.status_code != 200:
+                return {}
+            return extract_og_metadata(_iter_text(response), stop_at=stop_at)
+    except (requests.RequestException, CircuitOpenError) as error:
+        raise BGGFetchError(str(error)) from error
+
+
+async def afetch_og_metadata(bgg_link, stop_at=None):
+    '''
+    Description:
+        Async version of fetch_og_metadata, using a BoardGameGeek client that is closed once the page is read.
+    '''
+
+    try:
+        async with new_async_client() as client, client.stream(bgg_link) as response:
+            if response.status_code == 429 or response.status_code >= 500:
+                raise BGGFetchError(f'{bgg_link} responded with {response.status_code}')
+            if response.status_code != 200:
+                return {}
+            parser = OpenGraphParser(stop_at=stop_at)
+            async for chunk in response.aiter_text(CHUNK_SIZE):
+                parser.feed(chunk)
+                if parser.done:
+                    break
+            return parser.metadata
+    except (httpx.HTTPError, CircuitOpenError) as error:
+        raise BGGFetchError(str(error)) from error
+
+
+def store_og_metadata(game_pk, metadata):
+    '''
+    Description:
+        Stores resolved Open Graph metadata on a game and marks the lookup as done now.
+        A page without an image is stored as an empty URL, which acts as a negative cache entry.
+    '''
+
+    Game.objects.filter(pk=game_pk).update(
+        image_url=metadata.get('image', ''),
+        bgg_metadata=metadata,
+        image_fetched_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def refresh_game_image(game_pk):
+    '''
+    Description:
+        Resolves the cover image of a game and stores it together with the fetch time.
+        The page is read only up to its og:image tag.
+
+    Returns:
+        The stored image URL, or None if the game no longer exists.
+
+    Raises:
+        BGGFetchError: If BoardGameGeek could not be reached; nothing is stored in that case.
+    '''
+
+    bgg_link = Game.objects.filter(pk=game_pk).values_list('bgg_link', flat=True).first()
+    if bgg_link is None:
+        return None
+    image_url = fetch_og_metadata(bgg_link, stop_at='image').get('image', '')
+    now = timezone.now()
+    Game.objects.filter(pk=game_pk).update(image_url=image_url, image_fetched_at=now, updated_at=now)
+    return image_url
+
+
+async def arefresh_game_image(game):
+    '''
+    Description:
+        Async version of refresh_game_image working on an already loaded game, which is updated in place.
+
+    Raises:
+        BGGFetchError: If BoardGameGeek could not be reached; nothing is stored in that case.
+    '''
+
+    image_url = (await afetch_og_metadata(game.bgg_link, stop_at='image')).get('image', '')
+    game.image_url, game.image_fetched_at = image_url, timezone.now()
+    game.updated_at = game.image_fetched_at
+    await Game.objects.filter(pk=game.pk).aupdate(
+        image_url=game.image_url, image_fetched_at=game.image_fetched_at, updated_at=game.updated_at)
+    return image_url
+
+
+def _run_locked(lock_key, func, args, in_thread):
+    try:
+        func(*args)
+    except BGGFetchError:
+        # Keep the lock so the next attempt waits for REFRESH_LOCK_TIMEOUT
+        return
+    finally:
+        if in_thread:
+            # A background thread owns its own database connection
+            connection.close()
+    cache.delete(lock_key)
+
+
+def run_in_background(lock_key, func, *args):
+    '''
+    Description:
+        Runs func(*args) in a daemon thread unless a run with the same lock_key is already in progress.
+        With BGG_REFRESH_IN_BACKGROUND disabled the call runs inline, which is what tests rely on.
+        A run failing with BGGFetchError keeps the lock until it expires, throttling retries.
+    '''
+
+    if not cache.add(lock_key, True, REFRESH_LOCK_TIMEOUT):
+        return
+    if settings.BGG_REFRESH_IN_BACKGROUND:
+        threading.Thread(target=_run_locked, args=(lock_key, func, args, True), daemon=True).start()
+    else:
+        _run_locked(lock_key, func, args, False)
+
+
+def schedule_image_refresh(game_pk):
+    '''
+    Description:
+        Starts a background refresh of a game's cover image unless one is already running.
+    '''
+
+    run_in_background(f'bgg-image-refresh:{game_pk}', refresh_game_image, game_pk)
+
+
+def ensure_game_image(game):
+    '''
+    Description:
+        Makes sure a game's stored cover image will be up to date without waiting for BoardGameGeek.
+        Fresh entries are used as they are, missing or stale ones are refreshed in the background
+        and the page is rendered with whatever is stored right now.
+    '''
+
+    if game.image_is_fresh():
+        metrics.incr('bgg.image_cache.hit')
+    else:
+        metrics.incr('bgg.image_cache.miss')
+        schedule_image_refresh(game.pk)
+    return game.image_url
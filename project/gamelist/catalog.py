@@ -0,0 +1,132 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+
+from gamelist.conditional import ConditionalGetMixin
+
+
+CATALOG_VERSION_KEY = 'catalog-version'
+CATALOG_MODIFIED_KEY = 'catalog-modified'
+SEARCH_VERSION_KEY = 'search-version'
+
+
+# The versions are kept in the default cache, which must be shared by all worker processes
+# (see CACHES in gamebase.settings); otherwise each process would only see its own changes.
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a version lost with the cache is never handed out again
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_catalog_version():
+    '''
+    Description:
+        Returns the current catalog version, the part of every catalog cache key that changes
+        whenever a game, category or mechanic does.
+    '''
+
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def get_search_version():
+    '''
+    Description:
+        Returns the version of the searchable catalog data (titles, authors, category and mechanic names),
+        which in-process search indexes compare against to notice changes made by other processes.
+    '''
+
+    return _get_version(SEARCH_VERSION_KEY)
+
+
+def bump_catalog_version(search=True):
+    '''
+    Description:
+        Moves the catalog to a new version, which makes every cached catalog page a miss.
+        The search version is moved as well unless the change cannot affect search results (search=False).
+    '''
+
+    _bump_version(CATALOG_VERSION_KEY)
+    if search:
+        _bump_version(SEARCH_VERSION_KEY)
+    cache.set(CATALOG_MODIFIED_KEY, timezone.now(), None)
+
+
+def get_catalog_last_modified():
+    '''
+    Description:
+        Returns the time of the last catalog change, or None if it is not known (e.g. after a cache restart).
+    '''
+
+    return cache.get(CATALOG_MODIFIED_KEY)
+
+
+def catalog_page_cache_key(request):
+    '''
+    Description:
+        Returns the cache key of a catalog page for the current visitor, or None if the page must not be cached.
+
+        Anonymous visitors share one variant. Authenticated users get their own, which also depends on their
+        CSRF cookie because the page contains forms with their CSRF token.
+    '''
+
+    if request.user.is_authenticated:
+        csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+        if not csrf_cookie:
+            return None
+        variant = f'user:{request.user.pk}:{hashlib.md5(csrf_cookie.encode()).hexdigest()}'
+    else:
+        variant = 'anon'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'catalog-page:{get_catalog_version()}:{variant}:{path}'
+
+
+class CatalogConditionalGetMixin(ConditionalGetMixin):
+    '''
+    Description:
+        Conditional GET for catalog lists. The validators come from the catalog version without any query.
+    '''
+
+    def get_last_modified(self):
+        return get_catalog_last_modified()
+
+    def get_etag_state(self, last_modified):
+        return str(get_catalog_version())
+
+
+class CatalogPageCacheMixin:
+    '''
+    Description:
+        Caches the rendered GET responses of a catalog view under the catalog version.
+        A hit returns the stored HTML without touching the catalog tables or rendering a template.
+    '''
+
+    def dispatch(self, request, *args, **kwargs):
+        key = catalog_page_cache_key(request) if request.method == 'GET' else None
+        if key is None:
+            return super().dispatch(request, *args, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().dispatch(request, *args, **kwargs)
+        # A page shared by anonymous visitors must not carry the CSRF token of one of them
+        shared_token = not request.user.is_authenticated and request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        if response.status_code == 200 and not response.streaming and not shared_token:
+            cache.set(key, (response.content, response['Content-Type']), settings.CATALOG_PAGE_CACHE_TIMEOUT)
+        return response
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    '''
+    Description:
+        Warns when the default cache is not shared between processes. The catalog and search versions are
+        kept in it, so with several workers a change made in one of them would not reach the others.
+    '''
+
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [Warning(
+        f'The default cache ({backend}) is private to each process.',
+        hint='Configure a cache shared by all workers (e.g. RedisCache) in CACHES; the catalog version '
+             'that invalidates cached pages and ETags is stored in it.',
+        id='gamelist.W001',
+    )]
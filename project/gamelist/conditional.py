@@ -0,0 +1,73 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    '''
+    Description:
+        Answers GET requests carrying If-None-Match / If-Modified-Since with 304 Not Modified when the
+        page has not changed, before the view loads anything else or renders a template. Works for
+        synchronous and asynchronous views; the validators are computed in a thread for the latter.
+
+        The ETag covers the anonymous or user specific variant of the page, since the pages show
+        user specific links and CSRF tokens. Last-Modified is only sent to anonymous visitors: it
+        cannot tell the variants apart.
+
+    Methods:
+        get_last_modified: Returns the time the page content last changed, or None if unknown.
+            Should need at most one cheap query.
+        get_etag_state: Returns a string that changes whenever the page content does, or None if the
+            object does not exist (the view then runs normally and may answer 404).
+            Defaults to the last modification time.
+    '''
+
+    def get_last_modified(self):
+        return None
+
+    def get_etag_state(self, last_modified):
+        return last_modified.isoformat() if last_modified else None
+
+    def get_validators(self, request):
+        last_modified = self.get_last_modified()
+        state = self.get_etag_state(last_modified)
+        if state is None:
+            return None, None
+        user = request.user
+        if user.is_authenticated:
+            csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+            variant = f'user:{user.pk}:{user.nick}:{user.admin}:{user.is_superuser}:{csrf_cookie}'
+            last_modified = None
+        else:
+            variant = 'anon'
+        etag = hashlib.md5(f'{state}|{variant}|{request.get_full_path()}'.encode()).hexdigest()
+        return quote_etag(etag), int(last_modified.timestamp()) if last_modified else None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        if self.view_is_async:
+            return self._async_dispatch(request, *args, **kwargs)
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        return self._add_validators(response, etag, last_modified)
+
+    async def _async_dispatch(self, request, *args, **kwargs):
+        etag, last_modified = await sync_to_async(self.get_validators)(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await super().dispatch(request, *args, **kwargs)
+        return self._add_validators(response, etag, last_modified)
+
+    def _add_validators(self, response, etag, last_modified):
+        if response.status_code in (200, 304):
+            if etag:
+                response.headers.setdefault('ETag', etag)
+            if last_modified and not response.has_header('Last-Modified'):
+                response.headers['Last-Modified'] = http_date(last_modified)
+        return response
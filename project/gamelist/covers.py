@@ -0,0 +1,165 @@
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from PIL import Image
+
+from gamelist import bgg
+from gamelist.catalog import bump_catalog_version
+from gamelist.models import Game
+from gamelist.outbound import CircuitOpenError
+
+
+class CoverError(Exception):
+    '''
+    Description:
+        Raised when a downloaded cover is too large or is not an image Pillow can read.
+    '''
+
+
+def cover_path(digest, width):
+    '''
+    Description:
+        Returns the path of a thumbnail on disk. Files are sharded by the first two characters
+        of the digest, mirroring the layout of COVER_URL.
+    '''
+
+    return Path(settings.COVER_ROOT) / digest[:2] / f'{digest}-{width}.jpg'
+
+
+def download_cover(image_url):
+    '''
+    Description:
+        Downloads a cover image through the shared BoardGameGeek client.
+
+    Raises:
+        BGGFetchError: If the image could not be fetched and the request may succeed later.
+        CoverError: If the image is missing or larger than COVER_MAX_BYTES.
+    '''
+
+    try:
+        with bgg.get_client().get(image_url, stream=True) as response:
+            if response.status_code == 429 or response.status_code >= 500:
+                raise bgg.BGGFetchError(f'{image_url} responded with {response.status_code}')
+            if response.status_code != 200:
+                raise CoverError(f'{image_url} responded with {response.status_code}')
+            data = bytearray()
+            for chunk in response.iter_content(chunk_size=bgg.CHUNK_SIZE):
+                data += chunk
+                if len(data) > settings.COVER_MAX_BYTES:
+                    raise CoverError(f'{image_url} is larger than {settings.COVER_MAX_BYTES} bytes')
+            return bytes(data)
+    except (requests.RequestException, CircuitOpenError) as error:
+        raise bgg.BGGFetchError(str(error)) from error
+
+
+def _write_atomically(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp:
+        tmp.write(data)
+    os.replace(tmp.name, path)
+
+
+def store_cover(data):
+    '''
+    Description:
+        Writes the thumbnails of an image to COVER_ROOT under content-hashed names.
+        Identical images are stored once; already existing thumbnails are not regenerated.
+
+    Returns:
+        The sha256 digest naming the thumbnails.
+
+    Raises:
+        CoverError: If the data is not an image Pillow can read.
+    '''
+
+    digest = hashlib.sha256(data).hexdigest()
+    missing = [width for width in settings.COVER_THUMBNAIL_WIDTHS if not cover_path(digest, width).exists()]
+    if not missing:
+        return digest
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (OSError, Image.DecompressionBombError) as error:
+        raise CoverError(str(error)) from error
+    image = image.convert('RGB')
+    for width in missing:
+        thumbnail = image.copy()
+        # Keep the aspect ratio, never upscale
+        thumbnail.thumbnail((width, width * 4), Image.LANCZOS)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+        _write_atomically(cover_path(digest, width), buffer.getvalue())
+    return digest
+
+
+def mirror_cover(game_pk):
+    '''
+    Description:
+        Mirrors the current cover image of a game to local disk unless it already is.
+
+    Returns:
+        The digest of the stored cover, or None if the game has no image or the image is unusable.
+
+    Raises:
+        BGGFetchError: If the image could not be fetched and the request may succeed later.
+    '''
+
+    image_url = Game.objects.filter(pk=game_pk).exclude(image_url='').values_list('image_url', flat=True).first()
+    if image_url is None:
+        return None
+    try:
+        digest = store_cover(download_cover(image_url))
+    except CoverError:
+        digest = ''
+    # Remember the source either way so a broken image is not downloaded on every view
+    changed = Game.objects.filter(pk=game_pk, image_url=image_url).update(
+        cover_digest=digest, cover_source_url=image_url, updated_at=timezone.now())
+    if changed:
+        # Game lists show the thumbnail, and update() sends no signals
+        bump_catalog_version(search=False)
+    return digest or None
+
+
+def schedule_cover_mirror(game_pk):
+    '''
+    Description:
+        Starts mirroring a game's cover in the background unless it is already in progress.
+    '''
+
+    bgg.run_in_background(f'cover-mirror:{game_pk}', mirror_cover, game_pk)
+
+
+def ensure_game_cover(game):
+    '''
+    Description:
+        Keeps both the stored image URL and the local cover mirror of a game up to date without
+        doing any work inside the request: a stale image URL is refreshed first, and a fresh URL
+        that has not been mirrored yet is mirrored in the background.
+    '''
+
+    bgg.ensure_game_image(game)
+    if game.image_is_fresh() and game.needs_cover_mirror():
+        schedule_cover_mirror(game.pk)
+
+
+async def aensure_game_cover(game):
+    '''
+    Description:
+        Async version of ensure_game_cover. A game that was never looked up has nothing to show, so its
+        image is fetched right away with the async client: the request waits for BoardGameGeek but the
+        worker keeps serving other requests meanwhile. Everything else is left to background threads.
+    '''
+
+    if game.image_fetched_at is None:
+        try:
+            await bgg.arefresh_game_image(game)
+        except bgg.BGGFetchError:
+            pass
+    await sync_to_async(ensure_game_cover)(game)
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.db.models.functions import Cast
+
+from gamelist import search
+from gamelist.catalog import get_catalog_version
+from gamelist.models import Game
+
+
+FACETS = ('category', 'mechanic', 'game_time', 'players')
+
+PLAYER_COUNTS = range(1, 9)  # values of the player count facet
+
+# Values of the play time facet: key -> (label, condition on the indexed max_minutes)
+TIME_BUCKETS = {
+    '30': ('do 30 min', Q(max_minutes__lte=30)),
+    '60': ('30-60 min', Q(max_minutes__gt=30, max_minutes__lte=60)),
+    '120': ('1-2 h', Q(max_minutes__gt=60, max_minutes__lte=120)),
+    'long': ('ponad 2 h', Q(max_minutes__gt=120)),
+}
+
+FILTERS = FACETS + ('max_time',)  # everything narrowing the results, part of the facet cache key
+
+CategoryLink = Game.category.through
+MechanicLink = Game.game_mechanics.through
+
+
+def facet_conditions(filters):
+    '''
+    Description:
+        Turns selected facet values into one Q object per facet. Values of one facet are ORed,
+        facets are ANDed by the caller. Category and mechanic filters are subqueries on the
+        through tables, so a game matching several selected values is not duplicated.
+
+        filters: dict with lists of category ids, mechanic ids and TIME_BUCKETS keys, the number of players
+            and the time budget in minutes (or None). The time budget keeps the games whose longest play
+            time fits in it; it is not a facet and narrows every facet's counts.
+    '''
+
+    conditions = {}
+    if filters.get('category'):
+        conditions['category'] = Q(pk__in=CategoryLink.objects.filter(category_id__in=filters['category']).values('game_id'))
+    if filters.get('mechanic'):
+        conditions['mechanic'] = Q(pk__in=MechanicLink.objects.filter(gamemechanic_id__in=filters['mechanic']).values('game_id'))
+    buckets = [TIME_BUCKETS[key][1] for key in filters.get('game_time') or [] if key in TIME_BUCKETS]
+    if buckets:
+        conditions['game_time'] = reduce(operator.or_, buckets)
+    if filters.get('players'):
+        conditions['players'] = Q(min_players__lte=filters['players'], max_players__gte=filters['players'])
+    if filters.get('max_time'):
+        conditions['max_time'] = Q(max_minutes__lte=filters['max_time'])
+    return conditions
+
+
+def _matching(text, conditions, exclude):
+    # Games matching the text and every facet but one, the base of that facet's counts
+    games = Game.objects.filter(*(condition for facet, condition in conditions.items() if facet != exclude))
+    text = text.strip()
+    return games.filter(search.search_condition(text)) if text else games
+
+
+def count_facets(text, filters):
+    '''
+    Description:
+        Counts the games per facet value in two queries. Each facet is counted over the games matching the text
+        and all other selected facets, so its counts show what selecting another value of it would return.
+
+        1. One UNION ALL of GROUP BY queries over the category and mechanic through tables and the play
+           time bucket of max_minutes.
+        2. One aggregate with a conditional count per player count.
+
+    Returns:
+        Dict mapping each facet to a list of (value, label, count) tuples, most frequent first for
+        categories and mechanics, in TIME_BUCKETS and player count order for play times and players.
+    '''
+
+    conditions = facet_conditions(filters)
+    categories = CategoryLink.objects.filter(game__in=_matching(text, conditions, 'category')).values_list(
+        Value('category'), Cast('category_id', CharField()), 'category__name',
+    ).annotate(count=Count('game_id'))
+    mechanics = MechanicLink.objects.filter(game__in=_matching(text, conditions, 'mechanic')).values_list(
+        Value('mechanic'), Cast('gamemechanic_id', CharField()), 'gamemechanic__name',
+    ).annotate(count=Count('game_id'))
+    bucket = Case(*(When(condition, then=Value(key)) for key, (label, condition) in TIME_BUCKETS.items()),
+                  output_field=CharField())
+    game_times = _matching(text, conditions, 'game_time').filter(max_minutes__isnull=False).values_list(
+        Value('game_time'), bucket, bucket,
+    ).annotate(count=Count('pk'))
+
+    counts = {facet: [] for facet in FACETS}
+    for facet, value, label, count in categories.union(mechanics, game_times, all=True):
+        if facet == 'game_time':
+            counts[facet].append((value, TIME_BUCKETS[value][0], count))
+        else:
+            counts[facet].append((int(value), label, count))
+    for facet in ('category', 'mechanic'):
+        counts[facet].sort(key=lambda entry: (-entry[2], entry[1]))
+    counts['game_time'].sort(key=lambda entry: list(TIME_BUCKETS).index(entry[0]))
+
+    players = _matching(text, conditions, 'players').aggregate(**{
+        str(n): Count('pk', filter=Q(min_players__lte=n, max_players__gte=n)) for n in PLAYER_COUNTS
+    })
+    counts['players'] = [(n, str(n), players[str(n)]) for n in PLAYER_COUNTS if players[str(n)]]
+    return counts
+
+
+def cached_facet_counts(text, filters):
+    '''
+    Description:
+        count_facets cached per search text and filter combination until the catalog changes.
+    '''
+
+    combination = json.dumps([text.strip().casefold(), {name: filters.get(name) for name in FILTERS}], sort_keys=True)
+    key = f'facets:{get_catalog_version()}:{hashlib.md5(combination.encode()).hexdigest()}'
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_facets(text, filters)
+        cache.set(key, counts, settings.CATALOG_PAGE_CACHE_TIMEOUT)
+    return counts
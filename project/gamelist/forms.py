@@ -3,9 +3,24 @@ from django import forms
 from django.core.validators import URLValidator
 
 from .models import Game, Category, GameMechanic, RequestedCategory, RequestedMechanic, STATUS_CHOICES
+from .playtime import parse_game_time
 
 
-class AddGameForm(forms.ModelForm):
+class PlayTimeFormMixin:
+    '''
+    Description:
+        Accepts only play times that Game.save can parse into min_minutes and max_minutes,
+        so the free-text game_time and the indexed minutes never disagree.
+    '''
+
+    def clean_game_time(self):
+        game_time = self.cleaned_data['game_time'].strip()
+        if parse_game_time(game_time) is None:
+            raise forms.ValidationError('Nie rozpoznano czasu gry, podaj np. "45 min", "30-60 min" lub "1-2 h".')
+        return game_time
+
+
+class AddGameForm(PlayTimeFormMixin, forms.ModelForm):
     '''
     Description:
         Form for adding a new game to the system.
@@ -16,7 +31,7 @@ class AddGameForm(forms.ModelForm):
         description: TextField for the game description.
         min_players: IntegerField for the minimum number of players.
         max_players: IntegerField for the maximum number of players.
-        game_time: CharField for specifying the game time.
+        game_time: CharField for specifying the game time, e.g. "30-60 min". Must be parseable into minutes.
         category: CheckboxSelectMultiple for selecting game categories.
         game_mechanics: CheckboxSelectMultiple for selecting game mechanics.
         bgg_link: URLInput for specifying a BoardGameGeek link.
@@ -54,7 +69,7 @@ class AddGameForm(forms.ModelForm):
         self.fields['game_mechanics'].queryset = GameMechanic.objects.order_by('name')
         self.fields['bgg_link'].widget = forms.URLInput()
 
-class EditGameForm(forms.ModelForm):
+class EditGameForm(PlayTimeFormMixin, forms.ModelForm):
     '''
     Description:
         Form for editing an existing game.
@@ -332,13 +347,45 @@ class EditMechanicForm(forms.ModelForm):
         self.fields['description'].widget = forms.Textarea()
 
 
+class MultipleValueField(forms.Field):
+    '''
+    Description:
+        Field accepting a repeated GET parameter (e.g. ?category=1&category=4) as a sorted list of
+        distinct values converted with `coerce`, without loading any choices from the database.
+    '''
+
+    widget = forms.MultipleHiddenInput
+
+    def __init__(self, coerce=str, **kwargs):
+        self.coerce = coerce
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            return sorted({self.coerce(item) for item in value})
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Enter valid values.', code='invalid')
+
+
 class SearchGameForm(forms.Form):
     '''
     Description:
-        Form for searching games based on title.
+        Form for searching games based on title and filtering them by facets.
 
     Fields:
-        title: CharField for entering the game title.
+        title: CharField for entering the search text.
+        category: MultipleValueField with the ids of the selected categories.
+        mechanic: MultipleValueField with the ids of the selected game mechanics.
+        game_time: MultipleValueField with the selected play time buckets (keys of gamelist.facets.TIME_BUCKETS).
+        players: IntegerField with the number of players the game must support.
+        max_time: IntegerField with the time budget in minutes the longest play time must fit in.
     '''
 
-    title = forms.CharField(max_length=255)
\ No newline at end of file
+    title = forms.CharField(max_length=255, required=False)
+    category = MultipleValueField(coerce=int, required=False)
+    mechanic = MultipleValueField(coerce=int, required=False)
+    game_time = MultipleValueField(required=False)
+    players = forms.IntegerField(min_value=1, required=False)
+    max_time = forms.IntegerField(min_value=1, required=False)
@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from gamelist import search_index
+
+
+class Command(BaseCommand):
+    '''
+    Description:
+        Builds the in-process search index from the database and writes it to a snapshot file, which
+        worker processes load at their first search instead of reading the whole catalog. A snapshot
+        no longer matching the catalog is ignored, so the command can run at any time, e.g. on deploy.
+    '''
+
+    help = 'Writes a snapshot of the game search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=None,
+            help='Snapshot file to write; defaults to the GAME_SEARCH_INDEX_SNAPSHOT setting.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.GAME_SEARCH_INDEX_SNAPSHOT
+        if not path:
+            raise CommandError('Give a snapshot path or set GAME_SEARCH_INDEX_SNAPSHOT.')
+        started = time.perf_counter()
+        index = search_index.InvertedIndex.from_documents(search_index.catalog_documents())
+        search_index.write_snapshot(path, index)
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index)} games into {path} in {time.perf_counter() - started:.2f} s.'
+        ))
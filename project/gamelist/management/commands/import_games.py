@@ -0,0 +1,265 @@
+import contextlib
+import csv
+import json
+import time
+import xml.etree.ElementTree as ET
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from gamelist.catalog import bump_catalog_version
+from gamelist.models import Category, Game, GameMechanic
+from gamelist.playtime import parse_game_time
+
+
+UPSERT_FIELDS = [
+    'author', 'description', 'min_players', 'max_players', 'game_time', 'min_minutes', 'max_minutes', 'bgg_link', 'updated_at',
+]
+
+LIST_SEPARATOR = '|'  # separates category and mechanic names in CSV columns
+
+
+def read_csv(path):
+    '''
+    Description:
+        Yields rows of a CSV file with a header row. The categories and mechanics columns hold
+        names separated by LIST_SEPARATOR.
+    '''
+
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            for key in ('categories', 'mechanics'):
+                row[key] = (row.get(key) or '').split(LIST_SEPARATOR)
+            yield row
+
+
+def read_json_lines(path):
+    '''
+    Description:
+        Yields objects of a JSON Lines file, one game per line.
+    '''
+
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_json_array(path, chunk_size=65536):
+    '''
+    Description:
+        Yields the objects of a top-level JSON array one at a time without loading the whole file.
+    '''
+
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as file:
+        buffer = file.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise CommandError(f'{path} does not contain a JSON array')
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # The object continues in the next chunk
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    raise CommandError(f'{path} ends in the middle of a JSON object')
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def read_bgg_xml(path):
+    '''
+    Description:
+        Yields games of a BoardGameGeek XML API2 dump (<items><item type="boardgame">...</item></items>),
+        freeing every parsed item right away.
+    '''
+
+    def value(item, tag):
+        element = item.find(tag)
+        return element.get('value') if element is not None else None
+
+    context = ET.iterparse(path, events=('start', 'end'))
+    _, root = next(context)
+    for event, item in context:
+        if event != 'end' or item.tag != 'item':
+            continue
+        names = item.findall('name')
+        primary = next((name for name in names if name.get('type') == 'primary'), names[0] if names else None)
+        links = {}
+        for link in item.findall('link'):
+            links.setdefault(link.get('type'), []).append(link.get('value'))
+        min_time, max_time = value(item, 'minplaytime'), value(item, 'maxplaytime')
+        if min_time and max_time and min_time != max_time:
+            game_time = f'{min_time}-{max_time} min'
+        else:
+            game_time = f'{value(item, "playingtime") or max_time or min_time or ""} min'.strip()
+        yield {
+            'title': primary.get('value') if primary is not None else None,
+            'author': ', '.join(links.get('boardgamedesigner', [])),
+            'description': (item.findtext('description') or '').strip(),
+            'min_players': value(item, 'minplayers'),
+            'max_players': value(item, 'maxplayers'),
+            'game_time': game_time,
+            'bgg_link': f'https://boardgamegeek.com/boardgame/{item.get("id")}',
+            'categories': links.get('boardgamecategory', []),
+            'mechanics': links.get('boardgamemechanic', []),
+        }
+        root.clear()
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_json_lines,
+    'json': read_json_array,
+    'xml': read_bgg_xml,
+}
+
+
+def clean_row(row):
+    '''
+    Description:
+        Converts a raw row into Game field values plus category and mechanic names.
+
+    Raises:
+        ValueError: If the row has no title or its player counts are not numbers.
+    '''
+
+    title = (row.get('title') or '').strip()
+    if not title:
+        raise ValueError('missing title')
+    fields = {
+        'title': title[:255],
+        'author': (row.get('author') or '').strip()[:255],
+        'description': (row.get('description') or '').strip(),
+        'min_players': int(row.get('min_players') or 1),
+        'max_players': int(row.get('max_players') or row.get('min_players') or 1),
+        'game_time': str(row.get('game_time') or '').strip()[:64],
+        'bgg_link': (row.get('bgg_link') or '').strip(),
+    }
+    # bulk_create skips Game.save, which keeps the parsed minutes in sync otherwise
+    fields['min_minutes'], fields['max_minutes'] = parse_game_time(fields['game_time']) or (None, None)
+    categories = {name.strip()[:64] for name in row.get('categories') or [] if name and name.strip()}
+    mechanics = {name.strip()[:64] for name in row.get('mechanics') or [] if name and name.strip()}
+    return fields, categories, mechanics
+
+
+def resolve_names(model, names):
+    '''
+    Description:
+        Maps names to primary keys with one lookup, creating the missing ones in bulk.
+    '''
+
+    ids = dict(model.objects.filter(name__in=names).values_list('name', 'id'))
+    missing = names - ids.keys()
+    if missing:
+        model.objects.bulk_create([model(name=name, description='') for name in missing], ignore_conflicts=True)
+        ids.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+    return ids
+
+
+class Command(BaseCommand):
+    '''
+    Description:
+        Streams a CSV, JSON, JSON Lines or BoardGameGeek XML dump into the catalog.
+
+        Games are upserted by their unique title in batches with bulk_create. Category and mechanic
+        names are resolved once per batch (missing ones are created) and the many-to-many rows are
+        written straight to the through tables. The categories and mechanics of an updated game are
+        replaced by the ones in the dump. Every batch is committed on its own.
+    '''
+
+    help = 'Imports games from a CSV, JSON, JSON Lines or BoardGameGeek XML dump.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Dump file to import.')
+        parser.add_argument('--format', choices=sorted(READERS), help='File format, guessed from the extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of games written per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Run the whole import and roll it back.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Unknown format {file_format!r}, use --format with one of: {", ".join(sorted(READERS))}')
+        rows = READERS[file_format](path)
+
+        totals = {'created': 0, 'updated': 0, 'skipped': 0}
+        started = time.monotonic()
+        # A dry run keeps everything in one transaction that is rolled back at the end
+        with transaction.atomic() if options['dry_run'] else contextlib.nullcontext():
+            batch_number = 0
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                batch_number += 1
+                with transaction.atomic():
+                    counts = self.import_batch(batch)
+                # bulk_create sends no signals, so cached catalog pages are invalidated here
+                bump_catalog_version()
+                for key in totals:
+                    totals[key] += counts[key]
+                processed = sum(totals.values())
+                self.stdout.write(
+                    f'Batch {batch_number}: {counts["created"]} created, {counts["updated"]} updated, '
+                    f'{counts["skipped"]} skipped ({processed / (time.monotonic() - started):.0f} rows/s)'
+                )
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        summary = f'{totals["created"]} created, {totals["updated"]} updated, {totals["skipped"]} skipped'
+        if options['dry_run']:
+            summary = f'Dry run, nothing saved: {summary}'
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def import_batch(self, rows):
+        games = {}
+        skipped = 0
+        for row in rows:
+            try:
+                fields, categories, mechanics = clean_row(row)
+            except (TypeError, ValueError) as error:
+                skipped += 1
+                self.stderr.write(f'Skipped {row.get("title")!r}: {error}')
+                continue
+            # A title repeated within the batch keeps its last occurrence
+            games[fields['title']] = (fields, categories, mechanics)
+
+        titles = list(games)
+        existing = set(Game.objects.filter(title__in=titles).values_list('title', flat=True))
+        Game.objects.bulk_create(
+            [Game(**fields) for fields, _, _ in games.values()],
+            update_conflicts=True,
+            unique_fields=['title'],
+            update_fields=UPSERT_FIELDS,
+        )
+        game_ids = dict(Game.objects.filter(title__in=titles).values_list('title', 'id'))
+
+        category_ids = resolve_names(Category, set().union(*(categories for _, categories, _ in games.values())))
+        mechanic_ids = resolve_names(GameMechanic, set().union(*(mechanics for _, _, mechanics in games.values())))
+        updated_ids = [game_ids[title] for title in existing]
+        for through, column, names_index, ids in (
+            (Game.category.through, 'category_id', 1, category_ids),
+            (Game.game_mechanics.through, 'gamemechanic_id', 2, mechanic_ids),
+        ):
+            if updated_ids:
+                through.objects.filter(game_id__in=updated_ids).delete()
+            through.objects.bulk_create(
+                [
+                    through(game_id=game_ids[title], **{column: ids[name]})
+                    for title, game in games.items()
+                    for name in game[names_index]
+                ],
+                ignore_conflicts=True,
+            )
+
+        return {'created': len(games) - len(existing), 'updated': len(existing), 'skipped': skipped}
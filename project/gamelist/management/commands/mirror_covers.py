@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from django.utils import timezone
+
+from gamelist import bgg, covers
+from gamelist.catalog import bump_catalog_version
+from gamelist.models import Game
+
+
+class Command(BaseCommand):
+    '''
+    Description:
+        Downloads the cover image of every game whose current image URL has not been mirrored yet
+        and stores its thumbnails under content-hashed names. Safe to interrupt and run again.
+    '''
+
+    help = 'Mirrors game cover images to local disk and generates thumbnails.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of covers downloaded at once.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of games queued at once.')
+
+    def handle(self, *args, **options):
+        games = (
+            Game.objects.exclude(image_url='')
+            .exclude(cover_source_url=F('image_url'))
+            .order_by('pk')
+            .values_list('pk', 'image_url')
+        )
+        total = games.count()
+        mirrored = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            last_pk = 0
+            while True:
+                batch = list(games.filter(pk__gt=last_pk)[:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                futures = {executor.submit(self.fetch, image_url): (game_pk, image_url) for game_pk, image_url in batch}
+                changed = 0
+                for future in as_completed(futures):
+                    game_pk, image_url = futures[future]
+                    try:
+                        digest = future.result()
+                    except bgg.BGGFetchError as error:
+                        failed += 1
+                        self.stderr.write(f'Game {game_pk}: {error}')
+                        continue
+                    # Workers only touch the filesystem, the database is written from this thread
+                    changed += Game.objects.filter(pk=game_pk, image_url=image_url).update(
+                        cover_digest=digest, cover_source_url=image_url, updated_at=timezone.now(),
+                    )
+                    mirrored += 1
+                if changed:
+                    # Lists show the thumbnails and detail pages are validated by updated_at, as in covers.mirror_cover
+                    bump_catalog_version(search=False)
+                self.stdout.write(f'{mirrored + failed}/{total} processed, {failed} failed (last id {last_pk})')
+
+        self.stdout.write(self.style.SUCCESS(f'Mirrored {mirrored} covers, {failed} failed.'))
+
+    def fetch(self, image_url):
+        try:
+            return covers.store_cover(covers.download_cover(image_url))
+        except covers.CoverError as error:
+            self.stderr.write(f'{image_url}: {error}')
+            return ''
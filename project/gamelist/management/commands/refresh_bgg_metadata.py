@@ -0,0 +1,107 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from gamelist import bgg
+from gamelist.models import Game
+from gamelist.outbound import metrics
+
+
+class HostLimiter:
+    '''
+    Description:
+        Hands out one semaphore per host so no host gets more than `limit` concurrent requests.
+    '''
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+            return self._semaphores[host]
+
+
+class Command(BaseCommand):
+    '''
+    Description:
+        Resolves cover images and og: metadata of games from their BoardGameGeek pages concurrently.
+
+        Only games whose lookup is missing or stale are processed, in primary key order, and every
+        result is stored as soon as it arrives. An interrupted run therefore resumes where it stopped
+        when started again with the same options.
+    '''
+
+    help = 'Resolves cover images and og: metadata of games from their BoardGameGeek pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent requests in total.')
+        parser.add_argument('--per-host', type=int, default=4, help='Number of concurrent requests per host.')
+        parser.add_argument('--retries', type=int, default=3, help='Retries of a failed request.')
+        parser.add_argument('--backoff', type=float, default=1.0,
+                            help='Base delay in seconds between retries, doubled on each attempt.')
+        parser.add_argument('--batch-size', type=int, default=200, help='Number of games queued at once.')
+        parser.add_argument('--older-than', type=int, default=None,
+                            help='Refresh every lookup older than this many seconds instead of only stale ones.')
+
+    def handle(self, *args, **options):
+        self.retries = options['retries']
+        self.backoff = options['backoff']
+        self.host_limiter = HostLimiter(options['per_host'])
+
+        started_at = timezone.now()
+        if options['older_than'] is None:
+            games = Game.stale_images(now=started_at)
+        else:
+            cutoff = started_at - timedelta(seconds=options['older_than'])
+            games = Game.objects.exclude(image_fetched_at__gte=cutoff)
+        games = games.exclude(bgg_link='').order_by('pk').values_list('pk', 'bgg_link')
+
+        total = games.count()
+        resolved = failed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            last_pk = 0
+            while True:
+                batch = list(games.filter(pk__gt=last_pk)[:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                futures = {executor.submit(self.fetch, bgg_link): game_pk for game_pk, bgg_link in batch}
+                for future in as_completed(futures):
+                    try:
+                        metadata = future.result()
+                    except bgg.BGGFetchError as error:
+                        failed += 1
+                        self.stderr.write(f'Game {futures[future]}: {error}')
+                        continue
+                    # Results are written from this thread only, workers never touch the database
+                    bgg.store_og_metadata(futures[future], metadata)
+                    resolved += 1
+                self.stdout.write(f'{resolved + failed}/{total} processed, {failed} failed (last id {last_pk})')
+
+        self.stdout.write(self.style.SUCCESS(f'Resolved {resolved} games, {failed} failed.'))
+        for name, value in sorted(metrics.snapshot().items()):
+            if name.startswith('bgg.'):
+                self.stdout.write(f'{name}: {value:g}')
+
+    def fetch(self, bgg_link):
+        for attempt in range(self.retries + 1):
+            try:
+                with self.host_limiter(bgg_link):
+                    return bgg.fetch_og_metadata(bgg_link)
+            except bgg.BGGFetchError:
+                if attempt == self.retries:
+                    raise
+            # Exponential backoff with jitter, outside of the host slot
+            delay = self.backoff * 2 ** attempt
+            time.sleep(delay + random.uniform(0, delay))
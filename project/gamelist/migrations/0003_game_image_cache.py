@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0002_requestedcategory_requestedmechanic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='image_fetched_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='image_url',
+            field=models.URLField(blank=True, editable=False, max_length=1024),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0003_game_image_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='bgg_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0004_game_bgg_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='cover_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='cover_source_url',
+            field=models.URLField(blank=True, editable=False, max_length=1024),
+        ),
+    ]
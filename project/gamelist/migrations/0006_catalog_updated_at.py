@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0005_game_cover_mirror'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='gamemechanic',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
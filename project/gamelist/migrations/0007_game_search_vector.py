@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:02
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The vector is computed by a trigger, so bulk_create, update() and raw SQL keep it current as well.
+# The text search configuration must match gamelist.search.SEARCH_CONFIG.
+CREATE_TRIGGER = [
+    '''
+    CREATE FUNCTION gamelist_game_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english'::regconfig, coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(NEW.author, '')), 'B') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(NEW.description, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TRIGGER gamelist_game_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, author, description ON gamelist_game
+        FOR EACH ROW EXECUTE FUNCTION gamelist_game_search_vector_update()
+    ''',
+    'UPDATE gamelist_game SET title = title',
+    'CREATE INDEX gamelist_game_search_vector_gin ON gamelist_game USING gin (search_vector)',
+]
+
+DROP_TRIGGER = [
+    'DROP INDEX IF EXISTS gamelist_game_search_vector_gin',
+    'DROP TRIGGER IF EXISTS gamelist_game_search_vector_trigger ON gamelist_game',
+    'DROP FUNCTION IF EXISTS gamelist_game_search_vector_update()',
+]
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in CREATE_TRIGGER:
+            schema_editor.execute(statement)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in DROP_TRIGGER:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0006_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
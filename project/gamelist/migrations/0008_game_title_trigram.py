@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:20
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX gamelist_game_title_trgm ON gamelist_game USING gin (title gin_trgm_ops)'
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS gamelist_game_title_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0007_game_search_vector'),
+    ]
+
+    operations = [
+        # Skipped on databases other than PostgreSQL
+        TrigramExtension(),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:55
+
+import re
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+# Frozen copy of gamelist.playtime as of this migration, so replaying it always stores the same
+# minutes whatever the parser of the app later becomes
+
+HOUR_UNITS = r'h|hr|hrs|hours?|godz|godzin[aey]?|g'
+MINUTE_UNITS = r'm|min|mins|minutes?|minut[ay]?|\''
+
+DURATION_RE = re.compile(
+    rf'(?P<number>\d+(?:\.\d+)?)\s*'
+    rf'(?:(?P<hours>{HOUR_UNITS})\.?\s*(?:(?P<rest>\d+)\s*(?:{MINUTE_UNITS})?\.?)?|(?P<minutes>{MINUTE_UNITS})\.?)?'
+)
+CLOCK_RE = re.compile(r'(?P<hours>\d+):(?P<minutes>[0-5]\d)')
+RANGE_SEPARATOR_RE = re.compile(r'\s*(?:-|\bto\b|\bdo\b)\s*')
+APPROXIMATELY_RE = re.compile(r'^(?:ok\.?|około|ca\.?|approx\.?|~)\s*')
+
+MAX_MINUTES = 7 * 24 * 60  # longer play times are taken for typos; they would also overflow the integer columns
+
+
+def _duration(text):
+    # Returns (minutes, unit) of one duration, unit being 'h', 'm' or None when no unit was given
+    match = CLOCK_RE.fullmatch(text)
+    if match:
+        return int(match['hours']) * 60 + int(match['minutes']), 'h'
+    match = DURATION_RE.fullmatch(text)
+    if match is None:
+        return None
+    number = float(match['number'])
+    if match['hours']:
+        return round(number * 60) + int(match['rest'] or 0), 'h'
+    return round(number), 'm' if match['minutes'] else None
+
+
+def parse_game_time(text):
+    # (min_minutes, max_minutes), or None if the text is empty, not understood or longer than MAX_MINUTES
+    text = APPROXIMATELY_RE.sub('', text.strip().casefold().replace(',', '.').replace('–', '-').replace('—', '-'))
+    parts = RANGE_SEPARATOR_RE.split(text, maxsplit=1)
+    durations = [_duration(part) for part in parts]
+    if not text or None in durations:
+        return None
+    (low, low_unit), (high, high_unit) = durations[0], durations[-1]
+    if low_unit is None and high_unit == 'h' and len(durations) == 2:
+        low *= 60
+    if not 0 < low <= high <= MAX_MINUTES:
+        return None
+    return low, high
+
+
+def parse_play_times(apps, schema_editor):
+    # Walks the games in primary key order, one batch in memory at a time, and lists what it cannot parse
+    Game = apps.get_model('gamelist', 'Game')
+    games = Game.objects.using(schema_editor.connection.alias).only('pk', 'game_time').order_by('pk')
+    last_pk, unparsed = 0, 0
+    while True:
+        batch = list(games.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for game in batch:
+            game.min_minutes, game.max_minutes = parse_game_time(game.game_time) or (None, None)
+            if game.min_minutes is None and game.game_time.strip():
+                unparsed += 1
+                print(f'\n  Could not parse the play time of game {game.pk}: {game.game_time!r}', end='')
+        Game.objects.using(schema_editor.connection.alias).bulk_update(batch, ['min_minutes', 'max_minutes'])
+    if unparsed:
+        print(f'\n  Play time of {unparsed} games left empty, fix them in the game edit form.', end='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0008_game_title_trigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='max_minutes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='min_minutes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(parse_play_times, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['max_minutes', 'min_minutes'], name='gamelist_game_minutes_idx'),
+        ),
+    ]
@@ -1,4 +1,11 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
+
+from gamelist.playtime import parse_game_time
 
 
 STATUS_CHOICES = [
@@ -12,6 +19,7 @@ class Category(models.Model):
     Attributes:
         name: CharField with max length of 64 characters. Should be unique.
         description: TextField to provide additional information about the category.
+        updated_at: DateTimeField with the time of the last change, used to answer conditional requests.
 
     Methods:
         str: Returns the name of the category.
@@ -19,6 +27,7 @@ class Category(models.Model):
 
     name = models.CharField(max_length=64, unique=True)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -28,6 +37,7 @@ class GameMechanic(models.Model):
     Attributes:
         name: CharField with max length of 64 characters. Should be unique.
         description: TextField to provide additional information about the game mechanic.
+        updated_at: DateTimeField with the time of the last change, used to answer conditional requests.
 
     Methods:
         str: Returns the name of the game mechanic.
@@ -35,6 +45,7 @@ class GameMechanic(models.Model):
 
     name = models.CharField(max_length=64, unique=True)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -48,12 +59,29 @@ class Game(models.Model):
         min_players: IntegerField to specify the minimum number of players for the game.
         max_players: IntegerField to specify the maximum number of players for the game.
         game_time: CharField with max length of 64 characters to specify the estimated game time.
+        min_minutes, max_minutes: PositiveIntegerFields with the play time parsed from game_time, kept in sync on save.
+            Null if game_time is empty or not understood. Indexed together for time budget filters.
         category: Many-to-Many relationship with Category model.
         game_mechanics: Many-to-Many relationship with GameMechanic model.
         bgg_link: URLField to store the BoardGameGeek link for the game.
+        image_url: URLField with the cover image URL resolved from the BoardGameGeek page. Empty if none was found.
+        image_fetched_at: DateTimeField with the time of the last BoardGameGeek lookup. Null if never fetched.
+        bgg_metadata: JSONField with the og: metadata of the BoardGameGeek page, keyed without the 'og:' prefix.
+        cover_digest: CharField with the sha256 digest naming the locally mirrored cover thumbnails. Empty if not mirrored.
+        cover_source_url: URLField with the image URL the local cover was mirrored from.
+        updated_at: DateTimeField with the time the game page last changed, including its categories,
+            mechanics and cover. Used to answer conditional requests.
+        search_vector: SearchVectorField with the weighted full-text document of the title, author and description.
+            Maintained by a database trigger on PostgreSQL, unused elsewhere.
 
     Methods:
         str: Returns the title of the game.
+        save: Parses game_time into min_minutes and max_minutes before saving.
+        image_is_fresh: Returns True if the stored image lookup (positive or negative) is still within its TTL.
+        stale_images: Returns a queryset of games whose image lookup is missing or expired.
+        needs_cover_mirror: Returns True if the current image URL has not been mirrored locally yet.
+        cover_url: Returns the URL of the local cover thumbnail of the given width.
+        cover_src, cover_thumbnail_url, cover_srcset: Largest and smallest thumbnail URL and the srcset of all of them.
     '''
 
     title = models.CharField(max_length=255, unique=True)
@@ -62,13 +90,70 @@ class Game(models.Model):
     min_players = models.IntegerField()
     max_players = models.IntegerField()
     game_time = models.CharField(max_length=64)
+    min_minutes = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    max_minutes = models.PositiveIntegerField(null=True, blank=True, editable=False)
     category = models.ManyToManyField(Category)
     game_mechanics = models.ManyToManyField(GameMechanic)
     bgg_link = models.URLField()
+    image_url = models.URLField(max_length=1024, blank=True, editable=False)
+    image_fetched_at = models.DateTimeField(null=True, blank=True, editable=False)
+    bgg_metadata = models.JSONField(default=dict, blank=True, editable=False)
+    cover_digest = models.CharField(max_length=64, blank=True, editable=False)
+    cover_source_url = models.URLField(max_length=1024, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # "Fits in N minutes" is a range on max_minutes, optionally narrowed by min_minutes
+            models.Index(fields=['max_minutes', 'min_minutes'], name='gamelist_game_minutes_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.min_minutes, self.max_minutes = parse_game_time(self.game_time) or (None, None)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'game_time' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'min_minutes', 'max_minutes'}
+        super().save(*args, **kwargs)
+
+    def image_is_fresh(self):
+        if self.image_fetched_at is None:
+            return False
+        # Pages without an image are re-checked sooner than resolved ones
+        ttl = settings.BGG_IMAGE_TTL if self.image_url else settings.BGG_IMAGE_NEGATIVE_TTL
+        return timezone.now() - self.image_fetched_at < timedelta(seconds=ttl)
+
+    def needs_cover_mirror(self):
+        return bool(self.image_url) and self.image_url != self.cover_source_url
+
+    def cover_url(self, width):
+        return f'{settings.COVER_URL}{self.cover_digest[:2]}/{self.cover_digest}-{width}.jpg'
+
+    def cover_src(self):
+        return self.cover_url(max(settings.COVER_THUMBNAIL_WIDTHS))
+
+    def cover_thumbnail_url(self):
+        return self.cover_url(min(settings.COVER_THUMBNAIL_WIDTHS))
+
+    def cover_srcset(self):
+        return ', '.join(f'{self.cover_url(width)} {width}w' for width in sorted(settings.COVER_THUMBNAIL_WIDTHS))
+
+    @classmethod
+    def stale_images(cls, now=None):
+        '''
+        Returns a queryset of games whose BoardGameGeek lookup is missing or past its TTL.
+        '''
+
+        now = now or timezone.now()
+        return cls.objects.filter(
+            models.Q(image_fetched_at__isnull=True)
+            | models.Q(image_fetched_at__lt=now - timedelta(seconds=settings.BGG_IMAGE_TTL))
+            | models.Q(image_url='', image_fetched_at__lt=now - timedelta(seconds=settings.BGG_IMAGE_NEGATIVE_TTL))
+        )
+
 class RequestedMechanic(models.Model):
     '''
     Attributes:
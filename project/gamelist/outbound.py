@@ -0,0 +1,239 @@
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(Exception):
+    '''
+    Description:
+        Raised instead of making a request while the circuit breaker of a client is open.
+    '''
+
+
+class Metrics:
+    '''
+    Description:
+        Thread-safe in-process counters and latency observations, keyed by dotted names
+        such as 'bgg.requests' or 'bgg.latency'.
+
+    Methods:
+        incr: Adds n to a counter.
+        observe: Records a duration in seconds (count, total and max are kept).
+        snapshot: Returns a copy of all counters and latency summaries.
+        reset: Clears everything.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timings = {}
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        with self._lock:
+            count, total, maximum = self._timings.get(name, (0, 0.0, 0.0))
+            self._timings[name] = (count + 1, total + seconds, max(maximum, seconds))
+
+    def snapshot(self):
+        with self._lock:
+            snapshot = dict(self._counters)
+            for name, (count, total, maximum) in self._timings.items():
+                snapshot[f'{name}.count'] = count
+                snapshot[f'{name}.avg'] = total / count
+                snapshot[f'{name}.max'] = maximum
+            return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = Metrics()
+
+
+class CircuitBreaker:
+    '''
+    Description:
+        Stops calls to an upstream after repeated failures.
+
+        Closed: calls go through, consecutive failures are counted.
+        Open: after failure_threshold consecutive failures every call is rejected for reset_timeout seconds.
+        Half-open: after that a single trial call is let through; success closes the circuit, failure opens it again.
+            A trial that ends with neither (e.g. its task is cancelled) is released, so another call can try.
+
+    Methods:
+        before_call: Raises CircuitOpenError if the call must not be made. Returns the trial token of a half-open
+            trial call, None otherwise.
+        record_success, record_failure: Report the outcome of a call.
+        release_trial: Frees the trial slot taken by before_call if no outcome was recorded for it. Call it in a
+            finally block, so even a cancelled call cannot keep the circuit half-open for good.
+    '''
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial = None  # token of the half-open trial call in flight
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and self._trial is None:
+                self._trial = object()
+                return self._trial
+            raise CircuitOpenError(f'circuit open, retry in {self.reset_timeout}s')
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = None
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+    def release_trial(self, trial):
+        with self._lock:
+            if trial is not None and self._trial is trial:
+                self._trial = None
+
+
+class OutboundClient:
+    '''
+    Description:
+        HTTP client for one upstream service. It keeps connections alive in a bounded pool,
+        always applies connect/read timeouts, guards the upstream with a circuit breaker and
+        records request, failure and latency metrics under its name.
+
+    Variables:
+        name: Prefix of the metrics recorded by the client.
+        timeout: (connect, read) timeout in seconds applied to every request.
+        session: requests.Session sharing the connection pool.
+        breaker: CircuitBreaker of the upstream.
+
+    Methods:
+        get: Performs a GET request. Server errors (5xx, 429) and network errors count as failures.
+    '''
+
+    def __init__(self, name, connect_timeout=3.05, read_timeout=10, pool_size=10,
+                 failure_threshold=5, reset_timeout=30, user_agent='FoG'):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get(self, url, **kwargs):
+        try:
+            trial = self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.incr(f'{self.name}.short_circuited')
+            raise
+        metrics.incr(f'{self.name}.requests')
+        started = time.monotonic()
+        try:
+            try:
+                response = self.session.get(url, timeout=self.timeout, **kwargs)
+            except requests.RequestException:
+                self.breaker.record_failure()
+                metrics.incr(f'{self.name}.failures')
+                raise
+            finally:
+                metrics.observe(f'{self.name}.latency', time.monotonic() - started)
+            if response.status_code == 429 or response.status_code >= 500:
+                self.breaker.record_failure()
+                metrics.incr(f'{self.name}.failures')
+            else:
+                self.breaker.record_success()
+            return response
+        finally:
+            self.breaker.release_trial(trial)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncOutboundClient:
+    '''
+    Description:
+        asyncio counterpart of OutboundClient built on httpx. It pools keep-alive connections,
+        applies the same timeouts and records the same metrics. The circuit breaker can be shared
+        with a synchronous client talking to the same upstream.
+
+        An httpx.AsyncClient is bound to the event loop it was first used in, so an instance must
+        only be used from one loop. Use it as an async context manager to close its connections.
+
+    Methods:
+        stream: Async context manager performing a streamed GET request and yielding the httpx.Response.
+        aclose: Closes the pooled connections.
+    '''
+
+    def __init__(self, name, connect_timeout=3.05, read_timeout=10, pool_size=10,
+                 breaker=None, user_agent='FoG'):
+        self.name = name
+        self.breaker = breaker or CircuitBreaker()
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            headers={'User-Agent': user_agent},
+        )
+
+    @asynccontextmanager
+    async def stream(self, url):
+        try:
+            trial = self.breaker.before_call()
+        except CircuitOpenError:
+            metrics.incr(f'{self.name}.short_circuited')
+            raise
+        metrics.incr(f'{self.name}.requests')
+        started = time.monotonic()
+        try:
+            async with self.client.stream('GET', url) as response:
+                metrics.observe(f'{self.name}.latency', time.monotonic() - started)
+                if response.status_code == 429 or response.status_code >= 500:
+                    self.breaker.record_failure()
+                    metrics.incr(f'{self.name}.failures')
+                else:
+                    self.breaker.record_success()
+                yield response
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            metrics.incr(f'{self.name}.failures')
+            raise
+        finally:
+            # Cancellation (e.g. a disconnected ASGI client) is a BaseException and records no outcome
+            self.breaker.release_trial(trial)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
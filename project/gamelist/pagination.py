@@ -0,0 +1,119 @@
+import base64
+import binascii
+import datetime
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder cuts times to milliseconds; a cursor must keep every digit or the row it
+    # points at would compare greater than itself and show up again on the next page
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    '''
+    Description:
+        One page of a KeysetPaginator.
+
+    Variables:
+        object_list: Objects on the page, in the paginator's ordering.
+        has_next, has_previous: Whether there are objects after / before this page.
+        next_cursor, previous_cursor: Opaque cursors of the neighbouring pages, None at either end.
+    '''
+
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = paginator.encode_cursor('next', object_list[-1]) if has_next else None
+        self.previous_cursor = paginator.encode_cursor('prev', object_list[0]) if has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    '''
+    Description:
+        Cursor (keyset) pagination over a queryset ordered by a unique tuple of fields, e.g. (title, pk).
+
+        A page is selected with a WHERE clause on the ordering fields of the last (or first) row of
+        the neighbouring page instead of OFFSET, so the database walks the index straight to it and
+        deep pages cost the same as the first one. Rows inserted or deleted meanwhile do not shift pages.
+
+    Variables:
+        queryset: Unordered queryset to paginate; the paginator applies the ordering.
+        ordering: Field names forming a unique key; the last one should be 'pk' as a tie breaker.
+            Values are stored in the cursor as JSON, dates and times as ISO strings.
+        per_page: Number of objects per page.
+
+    Methods:
+        page: Returns the KeysetPage for a cursor, the first page for None, an invalid cursor or one
+            pointing past either end.
+        encode_cursor: Returns the cursor of the page after ('next') or before ('prev') an object.
+    '''
+
+    def __init__(self, queryset, ordering=('pk',), per_page=50):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+
+    def encode_cursor(self, direction, obj):
+        values = [getattr(obj, field) for field in self.ordering]
+        raw = json.dumps([direction, values], separators=(',', ':'), cls=_CursorEncoder).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError):
+            return None
+        if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(self.ordering):
+            return None
+        return direction, values
+
+    def _after(self, values, lookup):
+        # (a, b, c) > (x, y, z)  <=>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        conditions = []
+        for i, field in enumerate(self.ordering):
+            equal = {f: v for f, v in zip(self.ordering[:i], values[:i])}
+            conditions.append(Q(**equal, **{f'{field}__{lookup}': values[i]}))
+        # The redundant a >= x bound is what lets the database start the index range scan at the
+        # cursor; the OR alone is only a filter and every row before the cursor would still be read
+        leading = Q(**{f'{self.ordering[0]}__{lookup}e': values[0]})
+        return leading & reduce(lambda a, b: a | b, conditions)
+
+    def page(self, cursor=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            return KeysetPage(self, rows[:self.per_page], len(rows) > self.per_page, False)
+
+        direction, values = decoded
+        try:
+            if direction == 'next':
+                queryset = self.queryset.filter(self._after(values, 'gt')).order_by(*self.ordering)
+            else:
+                # Walk backwards from the cursor and flip the rows back into display order
+                queryset = self.queryset.filter(self._after(values, 'lt')).order_by(*(f'-{f}' for f in self.ordering))
+            rows = list(queryset[:self.per_page + 1])
+        except (ValueError, TypeError, ValidationError):
+            # A well-formed cursor holding values the ordering fields cannot take, e.g. a string for the pk
+            return self.page()
+        if not rows:
+            return self.page()
+        if direction == 'next':
+            return KeysetPage(self, rows[:self.per_page], len(rows) > self.per_page, True)
+        return KeysetPage(self, rows[:self.per_page][::-1], True, len(rows) > self.per_page)
@@ -0,0 +1,54 @@
+import re
+
+
+HOUR_UNITS = r'h|hr|hrs|hours?|godz|godzin[aey]?|g'
+MINUTE_UNITS = r'm|min|mins|minutes?|minut[ay]?|\''
+
+DURATION_RE = re.compile(
+    rf'(?P<number>\d+(?:\.\d+)?)\s*'
+    rf'(?:(?P<hours>{HOUR_UNITS})\.?\s*(?:(?P<rest>\d+)\s*(?:{MINUTE_UNITS})?\.?)?|(?P<minutes>{MINUTE_UNITS})\.?)?'
+)
+CLOCK_RE = re.compile(r'(?P<hours>\d+):(?P<minutes>[0-5]\d)')
+RANGE_SEPARATOR_RE = re.compile(r'\s*(?:-|\bto\b|\bdo\b)\s*')
+APPROXIMATELY_RE = re.compile(r'^(?:ok\.?|około|ca\.?|approx\.?|~)\s*')
+
+MAX_MINUTES = 7 * 24 * 60  # longer play times are taken for typos; they would also overflow the integer columns
+
+
+def _duration(text):
+    # Returns (minutes, unit) of one duration, unit being 'h', 'm' or None when no unit was given
+    match = CLOCK_RE.fullmatch(text)
+    if match:
+        return int(match['hours']) * 60 + int(match['minutes']), 'h'
+    match = DURATION_RE.fullmatch(text)
+    if match is None:
+        return None
+    number = float(match['number'])
+    if match['hours']:
+        return round(number * 60) + int(match['rest'] or 0), 'h'
+    return round(number), 'm' if match['minutes'] else None
+
+
+def parse_game_time(text):
+    '''
+    Description:
+        Parses the free-text play time of a game into whole minutes, e.g. '45 min' -> (45, 45),
+        '30-60 min' -> (30, 60), '1-2 h' -> (60, 120), '1h30' -> (90, 90), '2 godziny' -> (120, 120).
+        A bare number means minutes; in a range without a unit on its lower end, the unit of the upper
+        end applies to both.
+
+    Returns:
+        (min_minutes, max_minutes), or None if the text is empty, not understood or longer than MAX_MINUTES.
+    '''
+
+    text = APPROXIMATELY_RE.sub('', text.strip().casefold().replace(',', '.').replace('–', '-').replace('—', '-'))
+    parts = RANGE_SEPARATOR_RE.split(text, maxsplit=1)
+    durations = [_duration(part) for part in parts]
+    if not text or None in durations:
+        return None
+    (low, low_unit), (high, high_unit) = durations[0], durations[-1]
+    if low_unit is None and high_unit == 'h' and len(durations) == 2:
+        low *= 60
+    if not 0 < low <= high <= MAX_MINUTES:
+        return None
+    return low, high
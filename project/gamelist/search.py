@@ -0,0 +1,144 @@
+from django.conf import settings
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, TrigramWordSimilarity
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Value
+from django.dispatch import receiver
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from gamelist.models import Game
+
+
+# Text search configuration of Game.search_vector; must match the trigger created in migration 0007
+SEARCH_CONFIG = 'english'
+
+# Control characters marking highlighted words in snippets, replaced by <mark> after escaping
+SNIPPET_START, SNIPPET_STOP = '\x02', '\x03'
+
+
+def highlight(snippet):
+    '''
+    Description:
+        Turns a snippet returned by ts_headline into safe HTML: the text is escaped and only the
+        highlighted words are wrapped in <mark>.
+    '''
+
+    html = escape(snippet).replace(SNIPPET_START, '<mark>').replace(SNIPPET_STOP, '</mark>')
+    return mark_safe(html)
+
+
+def _postgres_query(text):
+    query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+    return query, Q(search_vector=query), Q(TrigramWordSimilar(F('title'), Value(text)))
+
+
+def postgres_search(queryset, text):
+    '''
+    Description:
+        Filters games in a single query that both GIN indexes can serve: PostgreSQL full-text search over
+        the stored, weighted search_vector (title A, author B, description C), or a title that is
+        trigram-similar to the text (pg_trgm word similarity above GAME_SEARCH_SIMILARITY_THRESHOLD),
+        which catches misspelled titles.
+
+        Full-text matches come first, ordered by relevance, followed by the fuzzy title matches ordered by
+        similarity. Each game gets `exact`, `rank`, `similarity` and a `snippet` of its description with the
+        matched words between SNIPPET_START and SNIPPET_STOP.
+
+        The query uses web search syntax: words are ANDed, "quoted phrases", "or" and -exclusion work.
+    '''
+
+    query, matches_text, similar_title = _postgres_query(text)
+    return queryset.filter(matches_text | similar_title).annotate(
+        exact=ExpressionWrapper(matches_text, output_field=BooleanField()),
+        rank=SearchRank(F('search_vector'), query),
+        similarity=TrigramWordSimilarity(text, 'title'),
+        snippet=SearchHeadline(
+            'description', query, config=SEARCH_CONFIG, start_sel=SNIPPET_START, stop_sel=SNIPPET_STOP,
+            max_words=30, min_words=15, max_fragments=2,
+        ),
+    ).order_by('-exact', '-rank', '-similarity', 'title', 'pk')
+
+
+def did_you_mean(games, text):
+    '''
+    Description:
+        Returns the title to suggest when the first page of results holds no exact match, i.e. when only
+        misspelled title matches were found, or None.
+    '''
+
+    best = games[0] if games else None
+    if best is None or getattr(best, 'exact', True) or best.title.casefold() == text.strip().casefold():
+        return None
+    return best.title
+
+
+class DatabaseSearchBackend:
+    '''
+    Description:
+        Searches the database: full-text and trigram title search on PostgreSQL,
+        a case-insensitive title/author match elsewhere.
+
+    Methods:
+        search: Returns the games matching a non-empty text and Q conditions, best matches first.
+        condition: Returns the Q object selecting the games matching a non-empty text, without ranking.
+    '''
+
+    def search(self, text, *conditions):
+        games = Game.objects.filter(*conditions).only('id', 'title', 'cover_digest')
+        if connection.vendor == 'postgresql':
+            return postgres_search(games, text)
+        return games.filter(self.condition(text)).order_by('title', 'pk')
+
+    def condition(self, text):
+        if connection.vendor == 'postgresql':
+            _, matches_text, similar_title = _postgres_query(text)
+            return matches_text | similar_title
+        return Q(title__icontains=text) | Q(author__icontains=text)
+
+
+_backend = None
+
+
+def get_search_backend():
+    '''
+    Description:
+        Returns the search backend instance selected by the GAME_SEARCH_BACKEND setting.
+    '''
+
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.GAME_SEARCH_BACKEND)()
+    return _backend
+
+
+@receiver(setting_changed)
+def _reset_backend_on_setting_change(setting, **kwargs):
+    global _backend
+    if setting == 'GAME_SEARCH_BACKEND':
+        _backend = None
+
+
+def search_condition(text):
+    '''
+    Description:
+        Returns the Q object selecting the games search_games returns for a non-empty text, without ranking.
+    '''
+
+    return get_search_backend().condition(text.strip())
+
+
+def search_games(text, *conditions):
+    '''
+    Description:
+        Returns the games matching a search text and the given Q conditions (e.g. facet filters),
+        best matches first, with only the columns result lists need, using the configured search backend.
+        An empty text matches every game, ordered by title.
+    '''
+
+    text = text.strip()
+    if not text:
+        return Game.objects.filter(*conditions).only('id', 'title', 'cover_digest').order_by('title', 'pk')
+    return get_search_backend().search(text, *conditions)
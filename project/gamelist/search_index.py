@@ -0,0 +1,338 @@
+import json
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from pathlib import Path
+
+from django.conf import settings
+from django.db.models import Count, Max, Q
+
+from gamelist.catalog import get_search_version
+from gamelist.models import Game
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+MIN_PREFIX_LENGTH = 2  # shorter query words only match whole words
+
+RESULT_CACHE_SIZE = 1024  # ranked results of recent queries kept per index
+
+SNAPSHOT_FORMAT = 1
+
+
+def tokenize(text):
+    '''
+    Description:
+        Splits text into lowercase words with accents removed, so 'Zoë' matches 'zoe'.
+    '''
+
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return TOKEN_RE.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+
+class InvertedIndex:
+    '''
+    Description:
+        In-memory inverted index over the title, author, category and mechanic names of games.
+
+        Every word maps to the games containing it with a weight depending on the field it appears in.
+        A query matches games containing all of its words, each query word matching whole words or,
+        from MIN_PREFIX_LENGTH characters on, word prefixes (looked up by bisection in the sorted
+        vocabulary). Games are ranked by the summed weights, then by title. All methods are thread-safe.
+
+    Variables:
+        version: Search version (see gamelist.catalog.get_search_version) the index reflects, or None.
+
+    Methods:
+        add: Indexes a game, replacing its previous entry.
+        remove: Drops a game from the index.
+        search: Returns the ids of the games matching a text, best matches first. Results of recent queries
+            are kept until the index changes; callers must not modify the returned list.
+        documents: Returns the indexed data, from which from_documents rebuilds an equal index.
+    '''
+
+    FIELD_WEIGHTS = (('title', 8), ('author', 4), ('categories', 2), ('mechanics', 2))
+
+    def __init__(self, version=None):
+        self.version = version
+        self._lock = threading.RLock()
+        self._documents = {}  # game id -> {'title': ..., 'author': ..., 'categories': [...], 'mechanics': [...]}
+        self._weights = {}  # game id -> {word: weight}
+        self._postings = {}  # word -> {game id: weight}
+        self._vocabulary = []  # sorted words of _postings
+        self._sort_keys = {}  # game id -> casefolded title, the tie breaker of equally ranked games
+        self._results = {}  # query words -> ranked game ids, emptied by every change
+
+    @classmethod
+    def from_documents(cls, documents, version=None):
+        index = cls(version)
+        for game_id, document in documents.items():
+            index.add(game_id, **document)
+        return index
+
+    def __len__(self):
+        return len(self._documents)
+
+    def add(self, game_id, title, author, categories, mechanics):
+        document = {'title': title, 'author': author, 'categories': list(categories), 'mechanics': list(mechanics)}
+        weights = {}
+        for field, weight in self.FIELD_WEIGHTS:
+            values = document[field] if isinstance(document[field], list) else [document[field]]
+            for word in {word for value in values for word in tokenize(value)}:
+                weights[word] = weights.get(word, 0) + weight
+        with self._lock:
+            self.remove(game_id)
+            self._results.clear()
+            self._documents[game_id] = document
+            self._weights[game_id] = weights
+            self._sort_keys[game_id] = title.casefold()
+            for word, weight in weights.items():
+                if word not in self._postings:
+                    self._postings[word] = {}
+                    insort(self._vocabulary, word)
+                self._postings[word][game_id] = weight
+
+    def remove(self, game_id):
+        with self._lock:
+            self._results.clear()
+            self._documents.pop(game_id, None)
+            self._sort_keys.pop(game_id, None)
+            for word in self._weights.pop(game_id, {}):
+                games = self._postings[word]
+                del games[game_id]
+                if not games:
+                    del self._postings[word]
+                    del self._vocabulary[bisect_left(self._vocabulary, word)]
+
+    def _matches(self, word):
+        if len(word) < MIN_PREFIX_LENGTH:
+            return dict(self._postings.get(word, {}))
+        matches = {}
+        position = bisect_left(self._vocabulary, word)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(word):
+            # A whole word outweighs a word it is only the prefix of
+            factor = 1 if self._vocabulary[position] == word else 0.5
+            for game_id, weight in self._postings[self._vocabulary[position]].items():
+                matches[game_id] = max(matches.get(game_id, 0), weight * factor)
+            position += 1
+        return matches
+
+    def search(self, text):
+        words = tuple(sorted(set(tokenize(text))))
+        if not words:
+            return []
+        with self._lock:
+            if words not in self._results:
+                if len(self._results) >= RESULT_CACHE_SIZE:
+                    self._results.clear()
+                self._results[words] = self._search(words)
+            return self._results[words]
+
+    def _search(self, words):
+        # Intersect starting from the smallest match set so the candidate set only shrinks
+        matches = sorted((self._matches(word) for word in words), key=len)
+        scores = matches[0]
+        for other in matches[1:]:
+            scores = {game_id: score + other[game_id] for game_id, score in scores.items() if game_id in other}
+        return sorted(scores, key=lambda game_id: (-scores[game_id], self._sort_keys[game_id], game_id))
+
+    def documents(self):
+        with self._lock:
+            return {game_id: dict(document) for game_id, document in self._documents.items()}
+
+
+def catalog_documents():
+    '''
+    Description:
+        Reads the indexed fields of every game in three queries.
+    '''
+
+    documents = {
+        game_id: {'title': title, 'author': author, 'categories': [], 'mechanics': []}
+        for game_id, title, author in Game.objects.values_list('pk', 'title', 'author')
+    }
+    for game_id, name in Game.category.through.objects.values_list('game_id', 'category__name'):
+        documents[game_id]['categories'].append(name)
+    for game_id, name in Game.game_mechanics.through.objects.values_list('game_id', 'gamemechanic__name'):
+        documents[game_id]['mechanics'].append(name)
+    return documents
+
+
+def catalog_fingerprint():
+    '''
+    Description:
+        Returns (number of games, time of the last game change), which tells whether a snapshot still matches
+        the catalog: creating or deleting a game changes the count, any other change moves updated_at.
+    '''
+
+    state = Game.objects.aggregate(count=Count('pk'), updated_at=Max('updated_at'))
+    return [state['count'], state['updated_at'].isoformat() if state['updated_at'] else None]
+
+
+def write_snapshot(path, index):
+    '''
+    Description:
+        Writes the documents of an index to a JSON file together with the catalog fingerprint.
+    '''
+
+    data = {'format': SNAPSHOT_FORMAT, 'fingerprint': catalog_fingerprint(), 'documents': index.documents()}
+    path = Path(path)
+    tmp = path.with_name(f'{path.name}.tmp')
+    tmp.write_text(json.dumps(data, separators=(',', ':')), encoding='utf-8')
+    tmp.replace(path)
+
+
+def read_snapshot(path):
+    '''
+    Description:
+        Returns the documents stored in a snapshot file, or None if it is missing, unreadable or out of date.
+    '''
+
+    try:
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if data.get('format') != SNAPSHOT_FORMAT or data.get('fingerprint') != catalog_fingerprint():
+        return None
+    return {int(game_id): document for game_id, document in data['documents'].items()}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    '''
+    Description:
+        Returns the index of this process, built on first use from GAME_SEARCH_INDEX_SNAPSHOT if it matches
+        the catalog, or from the database otherwise. The index is rebuilt when the search version moved
+        without it, i.e. when another process or a bulk operation changed the catalog.
+    '''
+
+    global _index
+    version = get_search_version()
+    with _index_lock:
+        if _index is None or _index.version != version:
+            documents = None
+            if _index is None and settings.GAME_SEARCH_INDEX_SNAPSHOT:
+                documents = read_snapshot(settings.GAME_SEARCH_INDEX_SNAPSHOT)
+            if documents is None:
+                documents = catalog_documents()
+            _index = InvertedIndex.from_documents(documents, version)
+        return _index
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def invalidate_index():
+    '''
+    Description:
+        Makes the next get_index call rebuild the loaded index from the database.
+    '''
+
+    index = _index
+    if index is not None:
+        index.version = None
+
+
+def _apply(change):
+    # Applies a change made by this process, if the index is loaded at all
+    index = _index
+    if index is None:
+        return
+    change(index)
+    # The change moved the search version by one; any other move means changes this process did not see
+    version = get_search_version()
+    index.version = version if index.version is not None and version == index.version + 1 else None
+
+
+def reindex_games(game_ids):
+    '''
+    Description:
+        Re-reads the given games into the loaded index and drops the ones that no longer exist.
+    '''
+
+    def change(index):
+        game_ids_ = set(game_ids)
+        documents = {
+            game_id: {'title': title, 'author': author, 'categories': [], 'mechanics': []}
+            for game_id, title, author in Game.objects.filter(pk__in=game_ids_).values_list('pk', 'title', 'author')
+        }
+        links = Game.category.through.objects.filter(game_id__in=documents)
+        for game_id, name in links.values_list('game_id', 'category__name'):
+            documents[game_id]['categories'].append(name)
+        links = Game.game_mechanics.through.objects.filter(game_id__in=documents)
+        for game_id, name in links.values_list('game_id', 'gamemechanic__name'):
+            documents[game_id]['mechanics'].append(name)
+        for game_id in game_ids_ - documents.keys():
+            index.remove(game_id)
+        for game_id, document in documents.items():
+            index.add(game_id, **document)
+
+    _apply(change)
+
+
+def unindex_game(game_id):
+    _apply(lambda index: index.remove(game_id))
+
+
+class InvertedIndexBackend:
+    '''
+    Description:
+        Search backend answering text queries from the in-process InvertedIndex, for databases without
+        full-text indexes such as SQLite. Only the page shown is loaded from the database.
+
+    Methods:
+        search: Returns IndexResults of the games matching a non-empty text and Q conditions, best matches first.
+        condition: Returns a Q object selecting the ids of the games matching a non-empty text.
+    '''
+
+    def search(self, text, *conditions):
+        return IndexResults(get_index().search(text), conditions)
+
+    def condition(self, text):
+        return Q(pk__in=get_index().search(text))
+
+
+class IndexResults:
+    '''
+    Description:
+        Lazy, sliceable sequence of the games matching an index search, in index order. Additional Q
+        conditions are applied with one query over the matched ids; a slice loads only its own games.
+        Works with Django's Paginator and ListView like a queryset.
+    '''
+
+    def __init__(self, game_ids, conditions=()):
+        self._game_ids = game_ids
+        self._conditions = conditions
+        self._filtered = None
+
+    def game_ids(self):
+        if self._filtered is None:
+            if self._conditions and self._game_ids:
+                kept = set(Game.objects.filter(*self._conditions, pk__in=self._game_ids).values_list('pk', flat=True))
+                self._filtered = [game_id for game_id in self._game_ids if game_id in kept]
+            else:
+                self._filtered = self._game_ids
+        return self._filtered
+
+    def count(self):
+        return len(self.game_ids())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            game_ids = self.game_ids()[key]
+            games = Game.objects.only('id', 'title', 'cover_digest').in_bulk(game_ids)
+            return [games[game_id] for game_id in game_ids if game_id in games]
+        return self[key:key + 1][0]
+
+    def __iter__(self):
+        return iter(self[:])
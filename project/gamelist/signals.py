@@ -0,0 +1,84 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from gamelist import search_index
+from gamelist.catalog import bump_catalog_version
+from gamelist.models import Category, Game, GameMechanic
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=GameMechanic)
+@receiver(post_delete, sender=GameMechanic)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+@receiver(post_save, sender=GameMechanic)
+@receiver(pre_delete, sender=GameMechanic)
+def touch_games_of_label(sender, instance, created=False, **kwargs):
+    # Game pages list the names of their categories and mechanics
+    if not created:
+        field = 'category' if sender is Category else 'game_mechanics'
+        Game.objects.filter(**{field: instance}).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Game.category.through)
+@receiver(m2m_changed, sender=Game.game_mechanics.through)
+def catalog_relations_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # The games losing the label are only known before the clear
+        field = 'category' if sender is Game.category.through else 'game_mechanics'
+        Game.objects.filter(**{field: instance}).update(updated_at=timezone.now())
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        Game.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif pk_set:
+        Game.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+    bump_catalog_version()
+
+
+# The receivers below keep a loaded search index up to date; they are connected after the ones bumping the
+# search version, which the index follows (see gamelist.search_index._apply)
+
+@receiver(post_save, sender=Game)
+def index_saved_game(sender, instance, **kwargs):
+    search_index.reindex_games([instance.pk])
+
+
+@receiver(post_delete, sender=Game)
+def unindex_deleted_game(sender, instance, **kwargs):
+    search_index.unindex_game(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=GameMechanic)
+def index_games_of_label(sender, instance, created, **kwargs):
+    field = 'category' if sender is Category else 'game_mechanics'
+    search_index.reindex_games(Game.objects.filter(**{field: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=GameMechanic)
+def label_deleted(sender, **kwargs):
+    # The games that had the label are no longer known; rare enough to rebuild the index
+    search_index.invalidate_index()
+
+
+@receiver(m2m_changed, sender=Game.category.through)
+@receiver(m2m_changed, sender=Game.game_mechanics.through)
+def index_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        search_index.reindex_games([instance.pk])
+    elif pk_set:
+        search_index.reindex_games(pk_set)
+    else:
+        search_index.invalidate_index()
@@ -0,0 +1,79 @@
+import threading
+from bisect import bisect_left
+
+from gamelist.catalog import get_search_version
+from gamelist.models import Game
+from gamelist.search_index import tokenize
+
+
+SUGGEST_LIMIT = 10  # titles returned when the request does not ask for a number
+SUGGEST_MAX_LIMIT = 25
+
+
+def title_key(text):
+    # Case and accent insensitive form of a title or query, words separated by single spaces
+    return ' '.join(tokenize(text))
+
+
+class TitlePrefixIndex:
+    '''
+    Description:
+        Sorted arrays of game titles answering "titles starting with" queries by bisection, without
+        touching the database. Titles starting with the query come first, then titles with a later word
+        starting with it, each group in alphabetical order. The index is immutable once built.
+
+    Variables:
+        version: Search version (see gamelist.catalog.get_search_version) the titles were read at.
+
+    Methods:
+        suggest: Returns up to `limit` (game id, title) pairs whose title or one of its words starts with a text.
+    '''
+
+    def __init__(self, games, version=None):
+        self.version = version
+        self._titles = []  # (key of the whole title, id)
+        self._words = []  # (key from the second, third... word of the title to its end, id)
+        self._names = {}  # id -> title
+        for game_id, title in games:
+            words = title_key(title).split(' ')
+            self._names[game_id] = title
+            self._titles.append((' '.join(words), game_id))
+            self._words.extend((' '.join(words[start:]), game_id) for start in range(1, len(words)))
+        self._titles.sort()
+        self._words.sort()
+
+    def suggest(self, text, limit=SUGGEST_LIMIT):
+        prefix = title_key(text)
+        if not prefix:
+            return []
+        found = {}
+        for entries in (self._titles, self._words):
+            position = bisect_left(entries, (prefix,))
+            while len(found) < limit and position < len(entries) and entries[position][0].startswith(prefix):
+                found.setdefault(entries[position][1], self._names[entries[position][1]])
+                position += 1
+        return list(found.items())
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_title_index():
+    '''
+    Description:
+        Returns the title index of this process, rebuilt with one query whenever the search version moved.
+    '''
+
+    global _index
+    version = get_search_version()
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = TitlePrefixIndex(Game.objects.values_list('pk', 'title').iterator(), version)
+        return _index
+
+
+def reset_title_index():
+    global _index
+    with _index_lock:
+        _index = None
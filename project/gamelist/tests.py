@@ -1,9 +1,35 @@
-from django.test import TestCase
+import asyncio
+import base64
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+import requests
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from gamelist.models import Game, RequestedMechanic
-from gamelist.forms import AddMechanicForm
+from gamelist.forms import AddMechanicForm, EditGameForm
+from gamelist import bgg, catalog, checks, covers, facets, search, search_index, suggest
+from gamelist.management.commands import import_games
+from gamelist.pagination import KeysetPaginator
+from gamelist.outbound import AsyncOutboundClient, CircuitBreaker, CircuitOpenError, OutboundClient
 from userbase.models import User
 
 
@@ -125,4 +151,1160 @@ class AddNewMechanicViewTest(TestCase):
         self.assertIn('/login/', response.url)
 
         # Check if the mechanic was not added to the database
-        self.assertFalse(GameMechanic.objects.filter(name='Test Mechanic').exists())
\ No newline at end of file
+        self.assertFalse(GameMechanic.objects.filter(name='Test Mechanic').exists())
+
+class GameImageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.game = Game.objects.create(
+            title='Test Game',
+            author='Test Author',
+            description='Test Description',
+            min_players=2,
+            max_players=4,
+            game_time='30 minutes',
+            bgg_link='https://boardgamegeek.com/boardgame/1/test-game',
+        )
+
+    def test_fresh_image_is_served_without_fetching(self):
+        # Store a fresh image URL on the game
+        Game.objects.filter(pk=self.game.pk).update(
+            image_url='https://example.com/cover.jpg',
+            image_fetched_at=timezone.now(),
+        )
+
+        # The detail page must not touch BoardGameGeek
+        with mock.patch('gamelist.bgg.schedule_image_refresh') as schedule, \
+                mock.patch('gamelist.covers.schedule_cover_mirror') as schedule_mirror:
+            response = self.client.get(reverse('game-details', kwargs={'game_pk': self.game.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'https://example.com/cover.jpg')
+        schedule.assert_not_called()
+        # Mirroring the cover is left to a background thread as well
+        schedule_mirror.assert_called_once_with(self.game.pk)
+
+    def test_stale_image_is_refreshed_in_background(self):
+        # Store an image URL fetched long ago
+        Game.objects.filter(pk=self.game.pk).update(
+            image_url='https://example.com/old.jpg',
+            image_fetched_at=timezone.now() - timedelta(days=365),
+        )
+
+        # The stale value is rendered and a refresh is scheduled
+        with mock.patch('gamelist.bgg.schedule_image_refresh') as schedule:
+            response = self.client.get(reverse('game-details', kwargs={'game_pk': self.game.pk}))
+
+        self.assertContains(response, 'https://example.com/old.jpg')
+        schedule.assert_called_once_with(self.game.pk)
+
+    def test_refresh_stores_negative_entry(self):
+        # A page without og:image is remembered as an empty URL
+        with mock.patch('gamelist.bgg.fetch_og_metadata', return_value={}):
+            bgg.refresh_game_image(self.game.pk)
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.image_url, '')
+        self.assertIsNotNone(self.game.image_fetched_at)
+        self.assertTrue(self.game.image_is_fresh())
+
+    @override_settings(BGG_REFRESH_IN_BACKGROUND=False)
+    def test_schedule_refresh_stores_image(self):
+        with mock.patch('gamelist.bgg.fetch_og_metadata', return_value={'image': 'https://example.com/new.jpg'}):
+            bgg.schedule_image_refresh(self.game.pk)
+
+        self.game.refresh_from_db()
+        self.assertEqual(self.game.image_url, 'https://example.com/new.jpg')
+
+
+class BGGStubHandler(BaseHTTPRequestHandler):
+    '''
+    Serves canned BoardGameGeek pages registered on the server as {path: [(status, body[, delay]), ...]}.
+    Each request pops the next response for its path; the last one is repeated.
+    '''
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        responses = self.server.pages.get(self.path, [(404, '')])
+        status, body, *delay = responses.pop(0) if len(responses) > 1 else responses[0]
+        self.server.hits.append(self.path)
+        self.server.clients.add(self.client_address)
+        if delay:
+            time.sleep(delay[0])
+        body = body if isinstance(body, bytes) else body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BGGStubServer:
+    def __init__(self, pages):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), BGGStubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.pages = pages
+        self.httpd.hits = []
+        self.httpd.clients = set()
+
+    @property
+    def hits(self):
+        return self.httpd.hits
+
+    @property
+    def clients(self):
+        return self.httpd.clients
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.httpd.server_port}{path}'
+
+    def __enter__(self):
+        # Every stub is a new upstream, so start from a fresh client and a closed circuit
+        bgg.reset_client()
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        bgg.reset_client()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def bgg_page(image_url, title='Test Game'):
+    return (
+        '<html><head>'
+        f'<meta property="og:title" content="{title}">'
+        f'<meta property="og:image" content="{image_url}">'
+        '</head><body>' + 'x' * 1000 + '</body></html>'
+    )
+
+
+class RefreshBGGMetadataCommandTest(TestCase):
+    def create_game(self, title, bgg_link):
+        return Game.objects.create(
+            title=title,
+            author='Test Author',
+            description='Test Description',
+            min_players=2,
+            max_players=4,
+            game_time='30 minutes',
+            bgg_link=bgg_link,
+        )
+
+    def test_resolves_metadata_with_retries(self):
+        pages = {
+            '/boardgame/1': [(200, bgg_page('https://example.com/1.jpg', 'One'))],
+            # First request fails, the retry succeeds
+            '/boardgame/2': [(503, ''), (200, bgg_page('https://example.com/2.jpg', 'Two'))],
+            '/boardgame/3': [(200, '<html><head></head><body></body></html>')],
+        }
+        with BGGStubServer(pages) as server:
+            games = [self.create_game(f'Game {n}', server.url(f'/boardgame/{n}')) for n in (1, 2, 3)]
+            call_command('refresh_bgg_metadata', workers=2, backoff=0, stdout=StringIO(), stderr=StringIO())
+
+        for game in games:
+            game.refresh_from_db()
+        self.assertEqual(games[0].image_url, 'https://example.com/1.jpg')
+        self.assertEqual(games[0].bgg_metadata['title'], 'One')
+        self.assertEqual(games[1].image_url, 'https://example.com/2.jpg')
+        self.assertEqual(server.hits.count('/boardgame/2'), 2)
+        # A page without an image becomes a negative entry
+        self.assertEqual(games[2].image_url, '')
+        self.assertTrue(games[2].image_is_fresh())
+
+    def test_resumes_with_stale_games_only(self):
+        pages = {'/boardgame/1': [(200, bgg_page('https://example.com/1.jpg'))]}
+        with BGGStubServer(pages) as server:
+            game = self.create_game('Game 1', server.url('/boardgame/1'))
+            self.create_game('Game 2', server.url('/boardgame/2'))
+            Game.objects.filter(pk=game.pk).update(image_url='https://example.com/1.jpg', image_fetched_at=timezone.now())
+
+            call_command('refresh_bgg_metadata', backoff=0, stdout=StringIO(), stderr=StringIO())
+
+        # The already fresh game was not fetched again
+        self.assertEqual(server.hits, ['/boardgame/2'])
+
+    def test_gives_up_after_retries(self):
+        pages = {'/boardgame/1': [(500, '')]}
+        with BGGStubServer(pages) as server:
+            game = self.create_game('Game 1', server.url('/boardgame/1'))
+            call_command('refresh_bgg_metadata', retries=2, backoff=0, stdout=StringIO(), stderr=StringIO())
+
+        game.refresh_from_db()
+        self.assertEqual(len(server.hits), 3)
+        # Nothing is stored, so the next run tries again
+        self.assertIsNone(game.image_fetched_at)
+
+
+class OpenGraphExtractorTest(TestCase):
+    def test_stops_reading_at_end_of_head(self):
+        consumed = []
+
+        def chunks():
+            # The meta tag is split across chunks, the body must never be read
+            for chunk in ['<html><head><meta property="og:ti', 'tle" content="A &amp; B">',
+                          '<meta property="og:image" content="https://example.com/a.jpg"></head>',
+                          '<body>' + 'x' * 10000]:
+                consumed.append(chunk)
+                yield chunk
+
+        metadata = bgg.extract_og_metadata(chunks())
+
+        self.assertEqual(metadata, {'title': 'A & B', 'image': 'https://example.com/a.jpg'})
+        self.assertEqual(len(consumed), 3)
+
+    def test_stops_at_requested_property(self):
+        chunks = iter(['<head><meta property="og:image" content="https://example.com/a.jpg">',
+                       '<meta property="og:title" content="A"></head>'])
+
+        metadata = bgg.extract_og_metadata(chunks, stop_at='image')
+
+        self.assertEqual(metadata, {'image': 'https://example.com/a.jpg'})
+        # The second chunk was left unread
+        self.assertEqual(next(chunks), '<meta property="og:title" content="A"></head>')
+
+    def test_fetch_reads_streamed_page(self):
+        pages = {'/boardgame/1': [(200, bgg_page('https://example.com/1.jpg', 'Zażółć'))]}
+        with BGGStubServer(pages) as server:
+            metadata = bgg.fetch_og_metadata(server.url('/boardgame/1'))
+
+        self.assertEqual(metadata, {'title': 'Zażółć', 'image': 'https://example.com/1.jpg'})
+
+
+class OutboundClientTest(TestCase):
+    def test_reuses_pooled_connection(self):
+        pages = {'/a': [(200, 'a')], '/b': [(200, 'b')]}
+        with BGGStubServer(pages) as server:
+            client = OutboundClient('test')
+            self.assertEqual(client.get(server.url('/a')).text, 'a')
+            self.assertEqual(client.get(server.url('/b')).text, 'b')
+            client.close()
+
+        # Both requests came over the same keep-alive connection
+        self.assertEqual(len(server.clients), 1)
+
+    def test_read_timeout(self):
+        pages = {'/slow': [(200, 'late', 1)]}
+        with BGGStubServer(pages) as server:
+            client = OutboundClient('test', read_timeout=0.1)
+            started = time.monotonic()
+            with self.assertRaises(requests.Timeout):
+                client.get(server.url('/slow'))
+            client.close()
+
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        pages = {'/boardgame/1': [(500, '')]}
+        with BGGStubServer(pages) as server:
+            client = OutboundClient('test', failure_threshold=2, reset_timeout=60)
+            client.get(server.url('/boardgame/1'))
+            client.get(server.url('/boardgame/1'))
+            with self.assertRaises(CircuitOpenError):
+                client.get(server.url('/boardgame/1'))
+            client.close()
+
+        # The third call never reached the server
+        self.assertEqual(len(server.hits), 2)
+
+    def test_circuit_half_open_trial(self):
+        now = [0]
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        # After the reset timeout a single trial call is allowed
+        now[0] = 31
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        breaker.before_call()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_interrupted_trial_releases_the_circuit(self):
+        class Interrupted(BaseException):
+            pass
+
+        client = OutboundClient('test', failure_threshold=1, reset_timeout=0)
+        client.breaker.record_failure()
+        with mock.patch.object(client.session, 'get', side_effect=Interrupted), self.assertRaises(Interrupted):
+            client.get('http://bgg.invalid/')
+        self.assertIsNotNone(client.breaker.before_call())
+        client.close()
+
+    def test_cancelled_async_trial_releases_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        pages = {'/slow': [(200, 'late', 1)]}
+
+        async def fetch(url):
+            async with AsyncOutboundClient('test', breaker=breaker) as client, client.stream(url) as response:
+                return response.status_code
+
+        with BGGStubServer(pages) as server:
+            with self.assertRaises(asyncio.TimeoutError):
+                asyncio.run(asyncio.wait_for(fetch(server.url('/slow')), 0.1))
+
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertIsNotNone(breaker.before_call())
+
+    @override_settings(BGG_CIRCUIT_FAILURE_THRESHOLD=1)
+    def test_open_circuit_is_a_fetch_error(self):
+        pages = {'/boardgame/1': [(503, '')]}
+        with BGGStubServer(pages) as server:
+            with self.assertRaises(bgg.BGGFetchError):
+                bgg.fetch_og_metadata(server.url('/boardgame/1'))
+            with self.assertRaises(bgg.BGGFetchError):
+                bgg.fetch_og_metadata(server.url('/boardgame/1'))
+
+        self.assertEqual(len(server.hits), 1)
+
+
+def png_bytes(size=(600, 900), color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(BGG_REFRESH_IN_BACKGROUND=False)
+class CoverMirrorTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(COVER_ROOT=Path(tmp.name), COVER_THUMBNAIL_WIDTHS=[96, 480])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def create_game(self, title, image_url):
+        return Game.objects.create(
+            title=title,
+            author='Test Author',
+            description='Test Description',
+            min_players=2,
+            max_players=4,
+            game_time='30 minutes',
+            bgg_link='https://boardgamegeek.com/boardgame/1/test-game',
+            image_url=image_url,
+            image_fetched_at=timezone.now(),
+        )
+
+    def test_mirror_stores_content_hashed_thumbnails(self):
+        pages = {'/cover.png': [(200, png_bytes())]}
+        with BGGStubServer(pages) as server:
+            game = self.create_game('Game 1', server.url('/cover.png'))
+            digest = covers.mirror_cover(game.pk)
+
+        game.refresh_from_db()
+        self.assertEqual(game.cover_digest, digest)
+        self.assertEqual(game.cover_source_url, game.image_url)
+        self.assertFalse(game.needs_cover_mirror())
+        with Image.open(covers.cover_path(digest, 96)) as thumbnail:
+            self.assertEqual(thumbnail.size, (96, 144))
+        # The largest thumbnail is never upscaled past the source
+        with Image.open(covers.cover_path(digest, 480)) as thumbnail:
+            self.assertEqual(thumbnail.width, 480)
+
+    def test_detail_page_schedules_mirror_and_serves_srcset(self):
+        pages = {'/cover.png': [(200, png_bytes())]}
+        with BGGStubServer(pages) as server:
+            game = self.create_game('Game 1', server.url('/cover.png'))
+            # The first view mirrors the cover (inline here, in a thread in production)
+            self.client.get(reverse('game-details', kwargs={'game_pk': game.pk}))
+            response = self.client.get(reverse('game-details', kwargs={'game_pk': game.pk}))
+
+        game.refresh_from_db()
+        self.assertContains(response, f'srcset="{game.cover_srcset()}"')
+        self.assertEqual(server.hits, ['/cover.png'])
+
+    def test_cover_view_sets_far_future_cache_headers(self):
+        digest = covers.store_cover(png_bytes())
+
+        response = self.client.get(f'/covers/{digest[:2]}/{digest}-96.jpg')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', response['Cache-Control'])
+        missing = self.client.get(f'/covers/{digest[:2]}/{digest}-97.jpg')
+        self.assertEqual(missing.status_code, 404)
+
+    def test_mirror_covers_command(self):
+        pages = {'/a.png': [(200, png_bytes())], '/b.png': [(200, png_bytes())], '/c.png': [(200, b'not an image')]}
+        with BGGStubServer(pages) as server:
+            games = [self.create_game(f'Game {name}', server.url(f'/{name}.png')) for name in 'abc']
+            version, updated_at = catalog.get_catalog_version(), Game.objects.get(pk=games[0].pk).updated_at
+            call_command('mirror_covers', stdout=StringIO(), stderr=StringIO())
+
+        for game in games:
+            game.refresh_from_db()
+        # Identical images share their files
+        self.assertEqual(games[0].cover_digest, games[1].cover_digest)
+        # A broken image is remembered and not downloaded again
+        self.assertEqual(games[2].cover_digest, '')
+        self.assertFalse(games[2].needs_cover_mirror())
+        # Cached list pages and detail page validators see the new covers
+        self.assertNotEqual(catalog.get_catalog_version(), version)
+        self.assertGreater(games[0].updated_at, updated_at)
+
+
+@override_settings(BGG_REFRESH_IN_BACKGROUND=False)
+class AsyncGameViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            nick='admin', email='admin@example.com', password='testpassword', is_superuser=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_game(self, bgg_link):
+        return Game.objects.create(
+            title='Test Game',
+            author='Test Author',
+            description='Test Description',
+            min_players=2,
+            max_players=4,
+            game_time='30 minutes',
+            bgg_link=bgg_link,
+        )
+
+    def test_first_view_fetches_image_with_async_client(self):
+        pages = {'/boardgame/1': [(200, bgg_page('https://example.com/1.jpg'))]}
+        with BGGStubServer(pages) as server, mock.patch('gamelist.covers.schedule_cover_mirror'):
+            game = self.create_game(server.url('/boardgame/1'))
+            response = self.client.get(reverse('game-details', kwargs={'game_pk': game.pk}))
+
+        # The image is rendered right away and stored for the next views
+        self.assertContains(response, 'https://example.com/1.jpg')
+        game.refresh_from_db()
+        self.assertEqual(game.image_url, 'https://example.com/1.jpg')
+
+    def test_async_client_is_closed_after_each_fetch(self):
+        pages = {'/boardgame/1': [(200, bgg_page('https://example.com/1.jpg'))]}
+        aclose = AsyncOutboundClient.aclose
+        with BGGStubServer(pages) as server, mock.patch('gamelist.covers.schedule_cover_mirror'), \
+                mock.patch.object(AsyncOutboundClient, 'aclose', autospec=True, side_effect=aclose) as closed:
+            game = self.create_game(server.url('/boardgame/1'))
+            self.client.get(reverse('game-details', kwargs={'game_pk': game.pk}))
+
+        self.assertEqual(closed.call_count, 1)
+
+    def test_unreachable_bgg_still_renders_page(self):
+        pages = {'/boardgame/1': [(503, '')]}
+        with BGGStubServer(pages) as server:
+            game = self.create_game(server.url('/boardgame/1'))
+            response = self.client.get(reverse('game-details', kwargs={'game_pk': game.pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Cover Artwork')
+        game.refresh_from_db()
+        self.assertIsNone(game.image_fetched_at)
+
+    def test_logged_in_user_sees_delete_page_and_deletes(self):
+        game = self.create_game('https://boardgamegeek.com/boardgame/1/test-game')
+        Game.objects.filter(pk=game.pk).update(image_fetched_at=timezone.now())
+        self.client.login(email='admin@example.com', password='testpassword')
+
+        response = self.client.get(reverse('delete-game', kwargs={'game_pk': game.pk}))
+        self.assertContains(response, 'czy na pewno chcesz usunąć grę z bazy?')
+
+        response = self.client.post(reverse('delete-game', kwargs={'game_pk': game.pk}))
+        self.assertRedirects(response, reverse('all-games'))
+        self.assertFalse(Game.objects.filter(pk=game.pk).exists())
+
+
+class ImportGamesCommandTest(TestCase):
+    def write_file(self, suffix, content):
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, encoding='utf-8', delete=False)
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write(content)
+        return file.name
+
+    def test_csv_import_and_upsert(self):
+        Category.objects.create(name='Strategy', description='Existing')
+        path = self.write_file('.csv', (
+            'title,author,description,min_players,max_players,game_time,bgg_link,categories,mechanics\n'
+            'Alpha,Ann,First,2,4,30 min,https://boardgamegeek.com/boardgame/1,Strategy|Family,Dice Rolling\n'
+            'Beta,Bob,Second,1,5,60 min,https://boardgamegeek.com/boardgame/2,Family,\n'
+            ',Nobody,No title,1,2,5 min,,,\n'
+        ))
+
+        call_command('import_games', path, batch_size=2, stdout=StringIO(), stderr=StringIO())
+
+        alpha = Game.objects.get(title='Alpha')
+        self.assertEqual(alpha.max_players, 4)
+        self.assertEqual(set(alpha.category.values_list('name', flat=True)), {'Strategy', 'Family'})
+        self.assertEqual(list(alpha.game_mechanics.values_list('name', flat=True)), ['Dice Rolling'])
+        # Existing categories are reused, missing ones created once
+        self.assertEqual(Category.objects.count(), 2)
+        self.assertEqual(Game.objects.count(), 2)
+
+        # A second import updates by title and replaces the categories
+        path = self.write_file('.csv', (
+            'title,author,description,min_players,max_players,game_time,bgg_link,categories,mechanics\n'
+            'Alpha,Ann,Changed,2,6,30 min,https://boardgamegeek.com/boardgame/1,Family,\n'
+        ))
+        out = StringIO()
+        call_command('import_games', path, stdout=out, stderr=StringIO())
+
+        alpha.refresh_from_db()
+        self.assertEqual(alpha.max_players, 6)
+        self.assertEqual(alpha.description, 'Changed')
+        self.assertEqual(list(alpha.category.values_list('name', flat=True)), ['Family'])
+        self.assertFalse(alpha.game_mechanics.exists())
+        self.assertIn('0 created, 1 updated, 0 skipped', out.getvalue())
+
+    def test_dry_run_saves_nothing(self):
+        path = self.write_file('.jsonl', json.dumps({
+            'title': 'Alpha', 'author': 'Ann', 'min_players': 2, 'max_players': 4, 'categories': ['Family'],
+        }) + '\n')
+        out = StringIO()
+
+        call_command('import_games', path, dry_run=True, stdout=out, stderr=StringIO())
+
+        self.assertIn('Dry run, nothing saved: 1 created', out.getvalue())
+        self.assertFalse(Game.objects.exists())
+        self.assertFalse(Category.objects.exists())
+
+    def test_json_array_import(self):
+        games = [{'title': f'Game {n}', 'author': 'A', 'min_players': 1, 'max_players': 2} for n in range(50)]
+        path = self.write_file('.json', json.dumps(games, indent=2))
+
+        with mock.patch('gamelist.management.commands.import_games.read_json_array',
+                        side_effect=lambda path: import_games.read_json_array(path, chunk_size=64)):
+            call_command('import_games', path, stdout=StringIO(), stderr=StringIO())
+
+        self.assertEqual(Game.objects.count(), 50)
+
+    def test_bgg_xml_import(self):
+        path = self.write_file('.xml', '''<?xml version="1.0" encoding="utf-8"?>
+<items>
+    <item type="boardgame" id="13">
+        <name type="alternate" value="Die Siedler von Catan"/>
+        <name type="primary" value="Catan"/>
+        <description>Trade &amp; build.</description>
+        <minplayers value="3"/>
+        <maxplayers value="4"/>
+        <playingtime value="120"/>
+        <minplaytime value="60"/>
+        <maxplaytime value="120"/>
+        <link type="boardgamecategory" id="1" value="Negotiation"/>
+        <link type="boardgamemechanic" id="2" value="Dice Rolling"/>
+        <link type="boardgamedesigner" id="3" value="Klaus Teuber"/>
+    </item>
+</items>''')
+
+        call_command('import_games', path, stdout=StringIO(), stderr=StringIO())
+
+        game = Game.objects.get(title='Catan')
+        self.assertEqual(game.author, 'Klaus Teuber')
+        self.assertEqual(game.description, 'Trade & build.')
+        self.assertEqual(game.game_time, '60-120 min')
+        self.assertEqual(game.bgg_link, 'https://boardgamegeek.com/boardgame/13')
+        self.assertEqual(list(game.category.values_list('name', flat=True)), ['Negotiation'])
+        self.assertEqual(list(game.game_mechanics.values_list('name', flat=True)), ['Dice Rolling'])
+
+
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Game.objects.bulk_create([
+            Game(title=f'Game {n:03d}', author='A', description='x' * 1000, min_players=1, max_players=4, game_time='30 min')
+            for n in range(120)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, response):
+        return [game.title for game in response.context['games']]
+
+    def test_walks_forward_and_back(self):
+        response = self.client.get(reverse('all-games'))
+        self.assertEqual(self.titles(response), [f'Game {n:03d}' for n in range(50)])
+        self.assertFalse(response.context['page'].has_previous)
+
+        second = self.client.get(reverse('all-games'), {'cursor': response.context['page'].next_cursor})
+        self.assertEqual(self.titles(second), [f'Game {n:03d}' for n in range(50, 100)])
+
+        last = self.client.get(reverse('all-games'), {'cursor': second.context['page'].next_cursor})
+        self.assertEqual(self.titles(last), [f'Game {n:03d}' for n in range(100, 120)])
+        self.assertFalse(last.context['page'].has_next)
+
+        back = self.client.get(reverse('all-games'), {'cursor': last.context['page'].previous_cursor})
+        self.assertEqual(self.titles(back), self.titles(second))
+        self.assertTrue(back.context['page'].has_previous)
+        self.assertContains(back, 'rel="prev"')
+        self.assertContains(back, 'rel="next"')
+
+        first = self.client.get(reverse('all-games'), {'cursor': back.context['page'].previous_cursor})
+        self.assertEqual(self.titles(first), self.titles(response))
+        self.assertFalse(first.context['page'].has_previous)
+
+    def test_pages_stay_stable_when_rows_are_inserted(self):
+        response = self.client.get(reverse('all-games'))
+        Game.objects.create(title='Game 000a', author='A', description='', min_players=1, max_players=2, game_time='')
+
+        second = self.client.get(reverse('all-games'), {'cursor': response.context['page'].next_cursor})
+
+        self.assertEqual(self.titles(second)[0], 'Game 050')
+
+    def test_invalid_cursor_shows_first_page(self):
+        response = self.client.get(reverse('all-games'), {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(response)[0], 'Game 000')
+
+    def test_cursor_with_wrong_values_shows_first_page(self):
+        paginator = KeysetPaginator(Game.objects.all(), ordering=('title', 'pk'))
+        for values in (['a', 'abc'], ['a', None], ['a', [1]]):
+            raw = json.dumps(['next', values]).encode()
+            cursor = base64.urlsafe_b64encode(raw).decode().rstrip('=')
+            with self.subTest(values=values):
+                self.assertEqual(paginator.page(cursor).object_list[0].title, 'Game 000')
+                response = self.client.get(reverse('all-games'), {'cursor': cursor})
+                self.assertEqual(self.titles(response)[0], 'Game 000')
+
+        by_time = KeysetPaginator(Game.objects.all(), ordering=('updated_at', 'pk'))
+        raw = json.dumps(['prev', ['not a date', 1]]).encode()
+        self.assertFalse(by_time.page(base64.urlsafe_b64encode(raw).decode()).has_previous)
+
+    def test_deep_page_is_one_lean_query(self):
+        cursor = KeysetPaginator(Game.objects.all(), ordering=('title', 'pk')).encode_cursor(
+            'next', Game.objects.get(title='Game 100'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('all-games'), {'cursor': cursor})
+
+        self.assertEqual(self.titles(response)[0], 'Game 101')
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]['sql']
+        self.assertNotIn('description', sql)
+        self.assertNotIn('OFFSET', sql.upper())
+
+    def test_keyset_filter_bounds_the_leading_column(self):
+        game = Game.objects.get(title='Game 100')
+        paginator = KeysetPaginator(Game.objects.all(), ordering=('title', 'pk'))
+
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(paginator.encode_cursor('next', game))
+            paginator.page(paginator.encode_cursor('prev', game))
+
+        title = f'{connection.ops.quote_name(Game._meta.db_table)}.{connection.ops.quote_name("title")}'
+        self.assertRegex(queries[0]['sql'], rf'\({re.escape(title)} >= .+? AND \(.*{re.escape(title)} > ')
+        self.assertRegex(queries[1]['sql'], rf'\({re.escape(title)} <= .+? AND \(.*{re.escape(title)} < ')
+
+    @skipUnless(connection.vendor == 'postgresql', 'index range scans are checked with the PostgreSQL planner')
+    def test_deep_page_starts_the_index_scan_at_the_cursor(self):
+        paginator = KeysetPaginator(Game.objects.all(), ordering=('title', 'pk'))
+        queryset = Game.objects.filter(paginator._after(['Game 100', 0], 'gt')).order_by('title', 'pk')
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+
+        self.assertRegex(plan, r'Index Cond: \(+title')
+
+    def test_category_and_mechanic_lists_are_paginated(self):
+        Category.objects.bulk_create([Category(name=f'Category {n:03d}', description='') for n in range(60)])
+        GameMechanic.objects.bulk_create([GameMechanic(name=f'Mechanic {n:03d}', description='') for n in range(60)])
+
+        categories = self.client.get(reverse('category-list'))
+        mechanics = self.client.get(reverse('mechanic-list'))
+        more_categories = self.client.get(reverse('category-list'), {'cursor': categories.context['page'].next_cursor})
+
+        self.assertEqual(len(categories.context['categories']), 50)
+        self.assertEqual(len(mechanics.context['mechanics']), 50)
+        self.assertEqual([category.name for category in more_categories.context['categories']][0], 'Category 050')
+
+
+class CatalogPageCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(nick='testuser', email='test@example.com', password='testpassword')
+        cls.game = Game.objects.create(
+            title='Alpha', author='A', description='', min_players=1, max_players=4, game_time='30 min')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_hit_skips_database_and_rendering(self):
+        first = self.client.get(reverse('all-games'))
+
+        with self.assertNumQueries(0), mock.patch('gamelist.views.render') as render:
+            second = self.client.get(reverse('all-games'))
+
+        render.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertNotContains(second, 'csrfmiddlewaretoken')
+
+    def test_saving_a_game_invalidates_pages(self):
+        self.client.get(reverse('all-games'))
+        self.game.title = 'Beta'
+        self.game.save()
+
+        self.assertContains(self.client.get(reverse('all-games')), 'Beta')
+
+    def test_category_changes_invalidate_pages(self):
+        self.client.get(reverse('category-list'))
+        category = Category.objects.create(name='Family', description='')
+        self.assertContains(self.client.get(reverse('category-list')), 'Family')
+
+        version = catalog.get_catalog_version()
+        self.game.category.add(category)
+        self.assertNotEqual(catalog.get_catalog_version(), version)
+
+        version = catalog.get_catalog_version()
+        category.delete()
+        self.assertNotEqual(catalog.get_catalog_version(), version)
+
+    def test_authenticated_users_get_their_own_variant(self):
+        anonymous = self.client.get(reverse('all-games'))
+        self.assertNotContains(anonymous, 'Add to collection')
+
+        self.client.login(email='test@example.com', password='testpassword')
+        # Without a CSRF cookie the page is rendered but not cached; the response sets the cookie
+        self.client.get(reverse('all-games'))
+        first = self.client.get(reverse('all-games'))
+        self.assertContains(first, 'Add to collection')
+        self.assertContains(first, 'testuser')
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(reverse('all-games'))
+        self.assertEqual(second.content, first.content)
+        self.assertFalse([query for query in queries if 'gamelist_game' in query['sql']])
+
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse('all-games')), 'Add to collection')
+
+    def test_import_invalidates_pages(self):
+        self.client.get(reverse('all-games'))
+        file = tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False)
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write(json.dumps({'title': 'Imported', 'author': 'A'}) + '\n')
+
+        call_command('import_games', file.name, stdout=StringIO(), stderr=StringIO())
+
+        self.assertContains(self.client.get(reverse('all-games')), 'Imported')
+
+
+    def test_per_process_cache_is_reported(self):
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://x'}}
+        with override_settings(CACHES=locmem):
+            self.assertEqual([w.id for w in checks.check_shared_cache(None)], ['gamelist.W001'])
+        with override_settings(CACHES=redis):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(nick='testuser', email='test@example.com', password='testpassword')
+        cls.category = Category.objects.create(name='Family', description='')
+        cls.mechanic = GameMechanic.objects.create(name='Dice Rolling', description='')
+        cls.game = Game.objects.create(
+            title='Alpha', author='A', description='', min_players=1, max_players=4, game_time='30 min',
+            image_fetched_at=timezone.now())
+        cls.game.category.add(cls.category)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_game_details_not_modified_in_one_query(self):
+        url = reverse('game-details', kwargs={'game_pk': self.game.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1), mock.patch('gamelist.views.render') as render:
+            not_modified = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        render.assert_not_called()
+
+        with self.assertNumQueries(1):
+            not_modified = self.client.get(url, headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_label_pages_not_modified_in_one_query(self):
+        for url in (reverse('category-details', kwargs={'category_pk': self.category.pk}),
+                    reverse('mechanic-details', kwargs={'mechanic_pk': self.mechanic.pk})):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_list_pages_not_modified_without_queries(self):
+        for url in (reverse('all-games'), reverse('category-list'), reverse('mechanic-list')):
+            etag = self.client.get(url)['ETag']
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_changes_invalidate_validators(self):
+        url = reverse('game-details', kwargs={'game_pk': self.game.pk})
+        etag = self.client.get(url)['ETag']
+
+        # Renaming a category of the game changes the game page
+        self.category.name = 'Party'
+        self.category.save()
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Party')
+
+        etag = response['ETag']
+        self.game.game_mechanics.add(self.mechanic)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 200)
+
+        list_etag = self.client.get(reverse('all-games'))['ETag']
+        self.mechanic.delete()
+        self.assertEqual(self.client.get(reverse('all-games'), headers={'If-None-Match': list_etag}).status_code, 200)
+
+    def test_validators_depend_on_the_user(self):
+        url = reverse('game-details', kwargs={'game_pk': self.game.pk})
+        anonymous = self.client.get(url)
+
+        self.client.login(email='test@example.com', password='testpassword')
+        response = self.client.get(url, headers={'If-None-Match': anonymous['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'editButton')
+        # Last-Modified cannot tell anonymous and user pages apart, so users only get an ETag
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_missing_game_is_not_found(self):
+        response = self.client.get(reverse('game-details', kwargs={'game_pk': 0}), headers={'If-None-Match': '"x"'})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class GameSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Game.objects.create(title='Dragon Castle', author='Luca Bellini', min_players=1, max_players=4, game_time='45 min',
+                            description='Build a castle <b>with</b> tiles.')
+        Game.objects.create(title='Azul', author='Michael Kiesling', min_players=2, max_players=4, game_time='45 min',
+                            description='Decorate the palace with dragon tiles.')
+
+    def test_highlight_escapes_everything_but_marks(self):
+        snippet = f'<script>x</script> {search.SNIPPET_START}dragon{search.SNIPPET_STOP} & more'
+
+        self.assertEqual(search.highlight(snippet), '&lt;script&gt;x&lt;/script&gt; <mark>dragon</mark> &amp; more')
+
+    def test_search_view_matches_title_and_author(self):
+        response = self.client.get(reverse('search'), {'title': 'kiesling'})
+
+        self.assertEqual([game.title for game in response.context['games']], ['Azul'])
+
+    def test_empty_query_lists_every_game(self):
+        response = self.client.get(reverse('search'), {'title': ''})
+
+        self.assertEqual([game.title for game in response.context['games']], ['Azul', 'Dragon Castle'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search needs PostgreSQL')
+    def test_full_text_search_ranks_and_highlights(self):
+        response = self.client.get(reverse('search'), {'title': 'dragon tiles'})
+
+        games = list(response.context['games'])
+        # A title match outranks a description match
+        self.assertEqual([game.title for game in games], ['Dragon Castle', 'Azul'])
+        self.assertIn('<mark>', games[1].snippet_html)
+        self.assertContains(response, '&lt;b&gt;with&lt;/b&gt;')
+
+    @skipUnless(connection.vendor == 'postgresql', 'full-text search needs PostgreSQL')
+    def test_search_vector_follows_bulk_writes(self):
+        Game.objects.filter(title='Azul').update(description='Pattern building with mosaics.')
+        Game.objects.bulk_create([Game(title='Mosaic', author='Glenn Drover', description='', min_players=1,
+                                       max_players=4, game_time='90 min')])
+
+        self.assertEqual({game.title for game in search.search_games('mosaic')}, {'Azul', 'Mosaic'})
+
+    @skipUnless(connection.vendor == 'postgresql', 'trigram search needs PostgreSQL')
+    def test_similarity_threshold_comes_with_the_connection(self):
+        with CaptureQueriesContext(connection) as queries, connection.cursor() as cursor:
+            cursor.execute('SHOW pg_trgm.word_similarity_threshold')
+            threshold = cursor.fetchone()[0]
+        self.assertEqual(float(threshold), settings.GAME_SEARCH_SIMILARITY_THRESHOLD)
+        self.assertEqual(len(queries), 1)
+
+    @skipUnless(connection.vendor == 'postgresql', 'trigram search needs PostgreSQL')
+    def test_misspelled_title_suggests_the_closest_one(self):
+        response = self.client.get(reverse('search'), {'title': 'Dragn Castel'})
+
+        self.assertEqual(response.context['games'][0].title, 'Dragon Castle')
+        self.assertEqual(response.context['did_you_mean'], 'Dragon Castle')
+        self.assertContains(response, '?title=Dragon%20Castle')
+
+    def test_did_you_mean_needs_a_fuzzy_best_match(self):
+        exact, fuzzy = Game(title='Azul'), Game(title='Azul')
+        exact.exact, fuzzy.exact = True, False
+
+        self.assertIsNone(search.did_you_mean([exact], 'azul'))
+        self.assertIsNone(search.did_you_mean([], 'azul'))
+        self.assertEqual(search.did_you_mean([fuzzy], 'azl'), 'Azul')
+        # Results of databases without trigram search never trigger a suggestion
+        self.assertIsNone(search.did_you_mean([Game(title='Azul')], 'azl'))
+
+
+class FacetedSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.family = Category.objects.create(name='Family', description='')
+        cls.strategy = Category.objects.create(name='Strategy', description='')
+        cls.dice = GameMechanic.objects.create(name='Dice Rolling', description='')
+        cls.azul = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4, game_time='45 min')
+        cls.catan = Game.objects.create(title='Catan', author='B', description='', min_players=3, max_players=4, game_time='90 min')
+        cls.solo = Game.objects.create(title='Onirim', author='C', description='', min_players=1, max_players=2, game_time='15 min')
+        cls.azul.category.add(cls.family)
+        cls.catan.category.add(cls.family, cls.strategy)
+        cls.catan.game_mechanics.add(cls.dice)
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, response):
+        return [game.title for game in response.context['games']]
+
+    def test_filters_combine_facets(self):
+        response = self.client.get(reverse('search'), {'category': [self.family.pk, self.strategy.pk]})
+        self.assertEqual(self.titles(response), ['Azul', 'Catan'])
+
+        response = self.client.get(reverse('search'), {'category': self.family.pk, 'players': 2})
+        self.assertEqual(self.titles(response), ['Azul'])
+
+        response = self.client.get(reverse('search'), {'mechanic': self.dice.pk, 'game_time': '120'})
+        self.assertEqual(self.titles(response), ['Catan'])
+
+        response = self.client.get(reverse('search'), {'game_time': ['30', '120']})
+        self.assertEqual(self.titles(response), ['Catan', 'Onirim'])
+
+    def test_time_budget_uses_parsed_minutes(self):
+        response = self.client.get(reverse('search'), {'max_time': 45, 'category': self.family.pk})
+
+        self.assertEqual(self.titles(response), ['Azul'])
+        self.assertEqual(response.context['other_params'], [('category', str(self.family.pk))])
+
+    def test_invalid_facet_values_are_ignored(self):
+        response = self.client.get(reverse('search'), {'category': 'abc', 'players': 0, 'title': 'azul'})
+
+        self.assertEqual(self.titles(response), ['Azul'])
+
+    def test_counts_in_two_queries(self):
+        with self.assertNumQueries(2):
+            counts = facets.count_facets('', {'category': [self.strategy.pk]})
+
+        # Other category counts ignore the selected category, everything else respects it
+        self.assertEqual(counts['category'], [(self.family.pk, 'Family', 2), (self.strategy.pk, 'Strategy', 1)])
+        self.assertEqual(counts['mechanic'], [(self.dice.pk, 'Dice Rolling', 1)])
+        self.assertEqual(counts['game_time'], [('120', '1-2 h', 1)])
+        self.assertEqual(counts['players'], [(3, '3', 1), (4, '4', 1)])
+
+    def test_counts_are_cached_per_filter_combination(self):
+        facets.cached_facet_counts('', {'players': 2})
+        with self.assertNumQueries(0):
+            facets.cached_facet_counts('', {'players': 2})
+        with self.assertNumQueries(2):
+            facets.cached_facet_counts('', {'players': 3})
+
+        # Catalog changes invalidate the cached counts
+        self.solo.category.add(self.family)
+        counts = facets.cached_facet_counts('', {'players': 2})
+        self.assertIn((self.family.pk, 'Family', 2), counts['category'])
+
+    def test_facet_links_toggle_values(self):
+        response = self.client.get(reverse('search'), {'title': '', 'category': self.family.pk})
+
+        categories = response.context['facets'][0]
+        self.assertEqual(categories['label'], 'Kategorie')
+        family, strategy = categories['values']
+        self.assertTrue(family['selected'])
+        self.assertNotIn('category', family['url'])
+        self.assertIn(f'category={self.family.pk}', strategy['url'])
+        self.assertIn(f'category={self.strategy.pk}', strategy['url'])
+
+
+@override_settings(GAME_SEARCH_BACKEND='gamelist.search_index.InvertedIndexBackend')
+class InvertedIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.family = Category.objects.create(name='Family', description='')
+        cls.dice = GameMechanic.objects.create(name='Dice Rolling', description='')
+        cls.castle = Game.objects.create(title='Dragon Castle', author='Luca Bellini', description='', min_players=1,
+                                         max_players=4, game_time='45 min')
+        cls.azul = Game.objects.create(title='Azul', author='Michael Kiesling', description='', min_players=2,
+                                       max_players=4, game_time='45 min')
+        cls.dragons = Game.objects.create(title='Dice Dragons', author='Zoë Dragonfly', description='', min_players=2,
+                                          max_players=6, game_time='30 min')
+        cls.azul.category.add(cls.family)
+        cls.dragons.game_mechanics.add(cls.dice)
+
+    def setUp(self):
+        cache.clear()
+        search_index.reset_index()
+        self.addCleanup(search_index.reset_index)
+
+    def titles(self, games):
+        return [game.title for game in games]
+
+    def test_tokenize_folds_case_and_accents(self):
+        self.assertEqual(search_index.tokenize('Zoë DRAGON-fly, 7 Wonders'), ['zoe', 'dragon', 'fly', '7', 'wonders'])
+
+    def test_ranks_fields_and_matches_prefixes(self):
+        index = search_index.get_index()
+
+        # A title word outweighs an author word, a whole word outweighs a prefix
+        self.assertEqual(index.search('dragon'), [self.castle.pk, self.dragons.pk])
+        self.assertEqual(index.search('zoe'), [self.dragons.pk])
+        self.assertEqual(index.search('dice dra'), [self.dragons.pk])
+        self.assertEqual(index.search('family azul'), [self.azul.pk])
+        self.assertEqual(index.search('d'), [])
+        self.assertEqual(index.search('dragon monopoly'), [])
+
+    def test_search_view_uses_the_selected_backend(self):
+        response = self.client.get(reverse('search'), {'title': 'kies', 'category': self.family.pk})
+
+        self.assertEqual(self.titles(response.context['games']), ['Azul'])
+
+        response = self.client.get(reverse('search'), {'title': 'dragon', 'players': 5})
+        self.assertEqual(self.titles(response.context['games']), ['Dice Dragons'])
+        self.assertEqual(response.context['paginator'].count, 1)
+
+    def test_results_load_only_the_requested_slice(self):
+        results = search.search_games('dragon')
+        search_index.get_index()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.titles(results[1:2]), ['Dice Dragons'])
+        self.assertEqual(len(results), 2)
+
+    def test_follows_catalog_changes_incrementally(self):
+        index = search_index.get_index()
+
+        with mock.patch.object(search_index, 'catalog_documents') as rebuild:
+            game = Game.objects.create(title='Castle Panic', author='Justin De Witt', description='', min_players=1,
+                                       max_players=6, game_time='60 min')
+            self.assertEqual(search_index.get_index().search('castle'), [game.pk, self.castle.pk])
+
+            game.category.add(self.family)
+            self.assertEqual(search_index.get_index().search('family castle'), [game.pk])
+
+            self.dice.name = 'Dice Chucking'
+            self.dice.save()
+            self.assertEqual(search_index.get_index().search('chucking'), [self.dragons.pk])
+            self.assertEqual(search_index.get_index().search('rolling'), [])
+
+            game.delete()
+            self.assertEqual(search_index.get_index().search('panic'), [])
+        rebuild.assert_not_called()
+        self.assertIs(search_index.get_index(), index)
+
+    def test_rebuilds_after_changes_it_did_not_see(self):
+        search_index.get_index()
+        Game.objects.filter(pk=self.azul.pk).update(title='Azul Summer Pavilion')
+        catalog.bump_catalog_version()
+
+        self.assertEqual(search_index.get_index().search('pavilion'), [self.azul.pk])
+
+    def test_loads_matching_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index.json')
+            call_command('build_search_index', path, stdout=StringIO())
+
+            with override_settings(GAME_SEARCH_INDEX_SNAPSHOT=path):
+                with mock.patch.object(search_index, 'catalog_documents') as rebuild:
+                    self.assertEqual(search_index.get_index().search('bellini'), [self.castle.pk])
+                rebuild.assert_not_called()
+
+                # A snapshot older than the catalog is ignored
+                search_index.reset_index()
+                Game.objects.filter(pk=self.castle.pk).update(author='Someone Else', updated_at=timezone.now())
+                self.assertEqual(search_index.get_index().search('bellini'), [])
+
+
+class SuggestGamesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for title in ('Dragon Castle', 'Dragonheart', 'Azul', 'Azul: Summer Pavilion', 'Dice Dragons', 'Ździebko'):
+            Game.objects.create(title=title, author='', description='', min_players=1, max_players=4, game_time='30 min')
+
+    def setUp(self):
+        cache.clear()
+        suggest.reset_title_index()
+        self.addCleanup(suggest.reset_title_index)
+
+    def suggest(self, **params):
+        return self.client.get(reverse('search-suggest'), params)
+
+    def titles(self, response):
+        return [game['title'] for game in response.json()['games']]
+
+    def test_title_prefixes_come_before_word_prefixes(self):
+        self.assertEqual(self.titles(self.suggest(q='drag')), ['Dragon Castle', 'Dragonheart', 'Dice Dragons'])
+        self.assertEqual(self.titles(self.suggest(q='summer pav')), ['Azul: Summer Pavilion'])
+        self.assertEqual(self.titles(self.suggest(q='zdzie')), ['Ździebko'])
+        self.assertEqual(self.titles(self.suggest(q='drag', limit=1)), ['Dragon Castle'])
+        self.assertEqual(self.titles(self.suggest(q='  ')), [])
+
+    def test_answers_from_memory_with_cache_headers(self):
+        self.suggest(q='az')
+        with self.assertNumQueries(0):
+            response = self.suggest(q='az')
+
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.GAME_SUGGEST_MAX_AGE}')
+        self.assertEqual(response.json()['games'][0]['url'], reverse('game-details', args=[Game.objects.get(title='Azul').pk]))
+        self.assertEqual(self.client.get(reverse('search-suggest'), {'q': 'AZ'}, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_follows_catalog_changes(self):
+        etag = self.suggest(q='cat')['ETag']
+        Game.objects.create(title='Catan', author='', description='', min_players=3, max_players=4, game_time='90 min')
+
+        response = self.client.get(reverse('search-suggest'), {'q': 'cat'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(self.titles(response), ['Catan'])
+
+
+class PlayTimeTest(TestCase):
+    def test_parses_free_text_play_times(self):
+        from gamelist.playtime import parse_game_time
+
+        cases = {
+            '45 min': (45, 45), '30-60 min': (30, 60), '30–60 minutes': (30, 60), '1-2 h': (60, 120),
+            '1h30': (90, 90), '1:30': (90, 90), '2 godziny': (120, 120), '90': (90, 90), 'ok. 60 min': (60, 60),
+            '30 min - 1 h': (30, 60), '10 do 20 minut': (10, 20),
+            '': None, 'varies': None, '60+ min': None, '0 min': None, '60-30': None,
+            '7 days': None, '168 h': (10080, 10080), '169 h': None, '99999999999 min': None, '30-99999999999': None,
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse_game_time(text), expected)
+
+    def test_save_and_forms_keep_minutes_in_sync(self):
+        category = Category.objects.create(name='Family', description='')
+        mechanic = GameMechanic.objects.create(name='Tile Placement', description='')
+        game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                   game_time='30-45 min')
+        self.assertEqual((game.min_minutes, game.max_minutes), (30, 45))
+
+        game.game_time = '1 h'
+        game.save(update_fields=['game_time'])
+        game.refresh_from_db()
+        self.assertEqual((game.min_minutes, game.max_minutes), (60, 60))
+
+        data = {'title': 'Azul', 'author': 'A', 'description': 'x', 'min_players': 2, 'max_players': 4,
+                'game_time': 'a while', 'bgg_link': 'https://boardgamegeek.com/boardgame/230802',
+                'category': [category.pk], 'game_mechanics': [mechanic.pk]}
+        form = EditGameForm(data, instance=game)
+        self.assertIn('game_time', form.errors)
+
+        form = EditGameForm({**data, 'game_time': '99999999999 min'}, instance=game)
+        self.assertIn('game_time', form.errors)
+
+        form = EditGameForm({**data, 'game_time': '2-3 h'}, instance=game)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        self.assertTrue(Game.objects.filter(max_minutes__lte=180, min_minutes__gte=120).exists())
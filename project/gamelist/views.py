@@ -1,10 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import render, get_object_or_404, redirect
-from django.urls import reverse_lazy
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
+from django.urls import reverse, reverse_lazy
+from django.utils.http import quote_etag
 from django.views import View
 from django.views.generic import ListView
+from gamelist import covers, facets, search, suggest
+from gamelist.catalog import CatalogConditionalGetMixin, CatalogPageCacheMixin, get_search_version
+from gamelist.conditional import ConditionalGetMixin
+from gamelist.pagination import KeysetPaginator
 from gamelist.models import (
     Game,
     Category,
@@ -29,56 +36,60 @@ from gamelist.forms import (
 )
 
 
-class BaseGameListView(View):
+class BaseGameListView(CatalogConditionalGetMixin, CatalogPageCacheMixin, View):
     '''
     Description:
-        This view renders a list of all games.
+        This view renders a paginated list of all games. Rendered pages are cached until the catalog changes
+        and unchanged pages are answered with 304 Not Modified.
 
     Variables:
         template_name: Template used for rendering the view.
-        games: Queryset of all games ordered by title.
+        paginate_by: Number of games per page.
+        page: KeysetPage of games ordered by title, with only the columns the template needs.
 
     Methods:
-        get: Renders a list of all games. Retrieves all games from the database and orders them by title.
-            Renders the template specified by template_name with the games queryset.
+        get: Renders one page of the game list.
+            Selects the page with the cursor passed in the "cursor" GET parameter (keyset pagination on title and id),
+            the first page without one.
+            Renders the template specified by template_name with the page.
     '''
     template_name = 'gamelist/all_games_list.html'
+    paginate_by = 50
 
     def get(self, request, *args, **kwargs):
-        games = Game.objects.order_by('title')
-        return render(request, self.template_name, {'games': games})
+        games = Game.objects.only('id', 'title', 'cover_digest')
+        page = KeysetPaginator(games, ordering=('title', 'pk'), per_page=self.paginate_by).page(request.GET.get('cursor'))
+        return render(request, self.template_name, {'games': page, 'page': page})
 
 
-class GameDetailView(View):
+class GameDetailView(ConditionalGetMixin, View):
     '''
     Description:
-        This view displays details of a specific game, including an image fetched from the game's BoardGameGeek link.
+        This view displays details of a specific game, including its cover image from BoardGameGeek.
+        It is asynchronous: under ASGI a worker keeps serving other requests while BoardGameGeek is queried.
 
     Variables:
         game: The game object fetched from the database.
-        game_image_url: The URL of the game image fetched from BoardGameGeek.
 
     Methods:
-        get: Displays details of a specific game, including an image fetched from the game's BoardGameGeek link.
-            Retrieves the game object based on the provided game_pk.
-            Fetches the HTML content of the game's BoardGameGeek link and extracts the image URL using BeautifulSoup.
+        get: Displays details of a specific game, including its cover image from BoardGameGeek.
+            Retrieves the game object with its categories and mechanics based on the provided game_pk.
+            Uses the cover stored on the game. A game never looked up before is fetched with the async client,
+            a stale one is refreshed and mirrored in the background.
             Renders the game_details.html template with the game object.
+            Answers 304 Not Modified if the game has not changed since the version the client has.
+        get_last_modified: Returns the modification time of the game.
     '''
 
-    def get(self, request, *args, **kwargs):
+    def get_last_modified(self):
+        return Game.objects.filter(pk=self.kwargs['game_pk']).values_list('updated_at', flat=True).first()
+
+    async def get(self, request, *args, **kwargs):
         game_pk = self.kwargs['game_pk']
-        game = get_object_or_404(Game, pk=game_pk)
-        # Fetch the HTML content of the bgg_link page
-        response = requests.get(game.bgg_link)
-        if response.status_code == 200:
-            html_content = response.text
-
-            # Use BeautifulSoup to parse HTML and find the image URL
-            soup = BeautifulSoup(html_content, 'html.parser')
-            meta_tag = soup.find('meta', property='og:image')
-            if meta_tag:
-                game_image_url = meta_tag.get('content')
-                game.image_url = game_image_url  # Store the image URL in the model
+        game = await aget_object_or_404(Game.objects.prefetch_related('category', 'game_mechanics'), pk=game_pk)
+        await covers.aensure_game_cover(game)
+        # The template checks the user, which must not trigger a database query in async context
+        request.user = await request.auser()
         return render(request, 'gamelist/game_details.html', {'game': game})
 
 class AddGameView(View):
@@ -120,7 +131,7 @@ class AddGameView(View):
             return render(request, self.template_name, context)
 
 
-class GameMechanicView(View):
+class GameMechanicView(ConditionalGetMixin, View):
     '''
     Description:
     This view displays details of a specific game mechanic.
@@ -132,14 +143,19 @@ class GameMechanicView(View):
         get: Displays details of a specific game mechanic.
             Retrieves the game mechanic object based on the provided mechanic_pk.
             Renders the mechanic_details.html template with the game mechanic object.
+            Answers 304 Not Modified if the game mechanic has not changed since the version the client has.
+        get_last_modified: Returns the modification time of the game mechanic.
     '''
 
+    def get_last_modified(self):
+        return GameMechanic.objects.filter(pk=self.kwargs['mechanic_pk']).values_list('updated_at', flat=True).first()
+
     def get(self, request, *args, **kwargs):
         mechanic_pk = self.kwargs['mechanic_pk']
         mechanic = get_object_or_404(GameMechanic, pk=mechanic_pk)
         return render(request, 'gamelist/mechanic_details.html', {'mechanic': mechanic})
 
-class CategoryView(View):
+class CategoryView(ConditionalGetMixin, View):
     '''
     Description:
         This view displays details of a specific category.
@@ -151,48 +167,61 @@ class CategoryView(View):
         get: Displays details of a specific category.
             Retrieves the category object based on the provided category_pk.
             Renders the category_details.html template with the category object.
+            Answers 304 Not Modified if the category has not changed since the version the client has.
+        get_last_modified: Returns the modification time of the category.
     '''
 
+    def get_last_modified(self):
+        return Category.objects.filter(pk=self.kwargs['category_pk']).values_list('updated_at', flat=True).first()
+
     def get(self, request, *args, **kwargs):
         category_pk = self.kwargs['category_pk']
         category = get_object_or_404(Category, pk=category_pk)
         return render(request, 'gamelist/category_details.html', {'category': category})
 
-class MechanicListView(View):
+class MechanicListView(CatalogConditionalGetMixin, CatalogPageCacheMixin, View):
     '''
     Description:
-        This view renders a list of all game mechanics.
+        This view renders a paginated list of all game mechanics. Rendered pages are cached until the catalog changes
+        and unchanged pages are answered with 304 Not Modified.
 
     Variables:
-        mechanics: Queryset of all game mechanics ordered by name.
+        paginate_by: Number of game mechanics per page.
+        page: KeysetPage of game mechanics ordered by name, with only their ids and names.
 
     Methods:
-        get: Renders a list of all game mechanics.
-            Retrieves all game mechanics from the database and orders them by name.
-            Renders the mechanics_list.html template with the mechanics queryset.
+        get: Renders one page of the game mechanic list.
+            Selects the page with the cursor passed in the "cursor" GET parameter (keyset pagination on name and id).
+            Renders the mechanics_list.html template with the page.
     '''
+    paginate_by = 50
 
     def get(self, request, *args, **kwargs):
-        mechanics = GameMechanic.objects.order_by('name')
-        return render(request, 'gamelist/mechanics_list.html', {'mechanics': mechanics})
+        mechanics = GameMechanic.objects.only('id', 'name')
+        page = KeysetPaginator(mechanics, ordering=('name', 'pk'), per_page=self.paginate_by).page(request.GET.get('cursor'))
+        return render(request, 'gamelist/mechanics_list.html', {'mechanics': page, 'page': page})
 
-class CategoryListView(View):
+class CategoryListView(CatalogConditionalGetMixin, CatalogPageCacheMixin, View):
     '''
     Description:
-        This view renders a list of all categories.
+        This view renders a paginated list of all categories. Rendered pages are cached until the catalog changes
+        and unchanged pages are answered with 304 Not Modified.
 
     Variables:
-        categories: Queryset of all categories ordered by name.
+        paginate_by: Number of categories per page.
+        page: KeysetPage of categories ordered by name, with only their ids and names.
 
     Methods:
-        get: Renders a list of all categories.
-            Retrieves all categories from the database and orders them by name.
-            Renders the categories_list.html template with the categories queryset.
+        get: Renders one page of the category list.
+            Selects the page with the cursor passed in the "cursor" GET parameter (keyset pagination on name and id).
+            Renders the categories_list.html template with the page.
     '''
+    paginate_by = 50
 
     def get(self, request, *args, **kwargs):
-        categories = Category.objects.order_by('name')
-        return render(request, 'gamelist/categories_list.html', {'categories': categories})
+        categories = Category.objects.only('id', 'name')
+        page = KeysetPaginator(categories, ordering=('name', 'pk'), per_page=self.paginate_by).page(request.GET.get('cursor'))
+        return render(request, 'gamelist/categories_list.html', {'categories': page, 'page': page})
 
 class EditGameView(View):
     '''
@@ -612,67 +641,159 @@ class EditMechanicView(View):
 class SearchGameView(ListView):
     '''
     Description:
-        This view allows users to search for games based on title.
+        This view allows users to search for games by title, author and description
+        and to narrow the results down by category, mechanic, game time and number of players.
 
     Variables:
         template_name: Template used for rendering the view.
-        games: Queryset of games filtered based on search query.
+        games: Page of games matching the search query and the selected facets, best matches first.
         search_query: Search query entered by the user.
+        facets: Values of every facet with the number of matching games and a link selecting or unselecting them.
+        max_time, other_params: Time budget in minutes and the other query parameters, kept by the time budget form.
 
     Methods:
-        get_queryset: Retrieves the queryset of games based on the search query entered by the user.
-        get_context_data: Adds the search query entered by the user to the context data.
+        get_queryset: Retrieves the games matching the search query entered by the user, the selected facets
+            and the time budget.
+            On PostgreSQL this is a ranked full-text search over the indexed search vector of the games,
+            followed by titles similar to the query, so misspelled titles are still found.
+        get_context_data: Adds the search query entered by the user to the context data,
+            the highlighted description snippet to every game on the page,
+            a "did you mean" title when only similar titles were found,
+            and the facet counts, which are cached per filter combination until the catalog changes.
     '''
 
     template_name = "gamelist/search.html"
     context_object_name = "games"
     paginate_by = 10
+    facet_labels = {
+        'category': 'Kategorie',
+        'mechanic': 'Mechaniki',
+        'game_time': 'Czas gry',
+        'players': 'Liczba graczy',
+    }
 
     def get_queryset(self):
-        title = self.request.GET.get("title", "")
-        return Game.objects.filter(title__icontains=title)
+        form = SearchGameForm(self.request.GET)
+        form.is_valid()
+        # Invalid parameters are ignored, the valid ones still apply
+        self.filters = form.cleaned_data
+        conditions = facets.facet_conditions(self.filters).values()
+        return search.search_games(self.filters.get('title') or '', *conditions)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['search_query'] = self.request.GET.get("title", "")
+        for game in context['games']:
+            if getattr(game, 'snippet', None):
+                game.snippet_html = search.highlight(game.snippet)
+        if context['page_obj'].number == 1:
+            context['did_you_mean'] = search.did_you_mean(context['games'], context['search_query'])
+        context['max_time'] = self.filters.get('max_time')
+        context['other_params'] = [
+            (name, value) for name, values in self.request.GET.lists() if name not in ('max_time', 'page') for value in values
+        ]
+        counts = facets.cached_facet_counts(self.filters.get('title') or '', self.filters)
+        context['facets'] = [
+            {
+                'label': self.facet_labels[facet],
+                'values': [
+                    {'label': label, 'count': count, 'selected': self.is_selected(facet, value),
+                     'url': self.toggle_url(facet, value)}
+                    for value, label, count in counts[facet]
+                ],
+            }
+            for facet in facets.FACETS if counts[facet]
+        ]
         return context
 
+    def is_selected(self, facet, value):
+        selected = self.filters.get(facet)
+        return value in selected if isinstance(selected, list) else value == selected
+
+    def toggle_url(self, facet, value):
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        if facet == 'players':
+            if self.is_selected(facet, value):
+                query.pop(facet, None)
+            else:
+                query[facet] = value
+        else:
+            values = [item for item in self.filters.get(facet) or [] if item != value]
+            if not self.is_selected(facet, value):
+                values.append(value)
+            query.setlist(facet, values)
+        return f'?{query.urlencode()}'
+
+class SuggestGamesView(ConditionalGetMixin, View):
+    '''
+    Description:
+        This view answers search box typeahead requests with the titles starting with the typed text,
+        or having a word starting with it, as compact JSON. Titles come from a per-process in-memory
+        index, so no query runs unless the catalog changed. The response is the same for every user
+        and may be cached publicly; unchanged suggestions are answered with 304 Not Modified.
+
+    Variables:
+        q: Typed text.
+        limit: Maximum number of titles, SUGGEST_LIMIT by default, at most SUGGEST_MAX_LIMIT.
+
+    Methods:
+        get: Returns {"q": ..., "games": [{"id": ..., "title": ..., "url": ...}, ...]}.
+    '''
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.GET.get('limit', suggest.SUGGEST_LIMIT))
+        except ValueError:
+            limit = suggest.SUGGEST_LIMIT
+        return min(max(limit, 1), suggest.SUGGEST_MAX_LIMIT)
+
+    def get_validators(self, request):
+        key = suggest.title_key(request.GET.get('q', ''))
+        etag = hashlib.md5(f'{get_search_version()}|{key}|{self.get_limit()}'.encode()).hexdigest()
+        return quote_etag(etag), None
+
+    def get(self, request, *args, **kwargs):
+        text = request.GET.get('q', '')
+        games = suggest.get_title_index().suggest(text, self.get_limit())
+        response = JsonResponse(
+            {'q': text, 'games': [
+                {'id': game_id, 'title': title, 'url': reverse('game-details', args=[game_id])}
+                for game_id, title in games
+            ]},
+            json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False},
+        )
+        response['Cache-Control'] = f'public, max-age={settings.GAME_SUGGEST_MAX_AGE}'
+        return response
+
+
 class DeleteGameView(View):
     '''
     Description:
-        This view handles the deletion of a game.
+        This view handles the deletion of a game. Like GameDetailView it is asynchronous.
 
     Variables:
         template_name: Template used for rendering the delete game confirmation page.
 
     Methods:
-        get: Retrieves the game object to be deleted and fetches its image URL from an external source.
+        get: Retrieves the game object to be deleted together with its stored cover image.
             Renders the delete game confirmation page with the game object.
         post: Handles the deletion of the game object upon receiving a POST request.
     '''
 
     template_name = 'gamelist/delete_game.html'
 
-    def get(self, request, *args, **kwargs):
+    async def get(self, request, *args, **kwargs):
         game_pk = self.kwargs['game_pk']
-        game = get_object_or_404(Game, pk=game_pk)
-        # Fetch the HTML content of the bgg_link page
-        response = requests.get(game.bgg_link)
-        if response.status_code == 200:
-            html_content = response.text
-
-            # Use BeautifulSoup to parse HTML and find the image URL
-            soup = BeautifulSoup(html_content, 'html.parser')
-            meta_tag = soup.find('meta', property='og:image')
-            if meta_tag:
-                game_image_url = meta_tag.get('content')
-                game.image_url = game_image_url  # Store the image URL in the model
+        game = await aget_object_or_404(Game.objects.prefetch_related('category', 'game_mechanics'), pk=game_pk)
+        await covers.aensure_game_cover(game)
+        request.user = await request.auser()
         return render(request, self.template_name, {'game': game})
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         game_pk = kwargs['game_pk']
-        game = get_object_or_404(Game, id=game_pk)
-        game.delete()
+        game = await aget_object_or_404(Game, id=game_pk)
+        await game.adelete()
         return redirect('all-games')
 
 
@@ -726,4 +847,23 @@ class DeleteCategoryView(View):
         category_pk = kwargs['category_pk']
         category = get_object_or_404(Category, id=category_pk)
         category.delete()
-        return redirect('category-list')
\ No newline at end of file
+        return redirect('category-list')
+
+
+class CoverImageView(View):
+    '''
+    Description:
+        This view serves locally mirrored cover thumbnails.
+        File names are content hashes, so responses are cached by browsers and proxies for good.
+
+    Methods:
+        get: Returns the thumbnail file with far-future cache headers, or 404 if it does not exist.
+    '''
+
+    def get(self, request, *args, **kwargs):
+        path = settings.COVER_ROOT / kwargs['shard'] / kwargs['name']
+        if not kwargs['name'].startswith(kwargs['shard']) or not path.is_file():
+            raise Http404
+        response = FileResponse(open(path, 'rb'), content_type='image/jpeg')
+        response['Cache-Control'] = f'public, max-age={settings.COVER_CACHE_MAX_AGE}, immutable'
+        return response
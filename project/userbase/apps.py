@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UserbaseConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'userbase'
+
+    def ready(self):
+        from userbase import signals  # noqa: F401
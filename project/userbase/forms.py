@@ -2,7 +2,9 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.contrib.auth import authenticate
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
+from django.db.models import Q
 
+from gamelist.models import Category
 from .models import User, GameInvitation, Game
 
 class LoginForm(forms.Form):
@@ -157,20 +159,90 @@ class LuckyShotForm(forms.ModelForm):
         Form for selecting the number of players for a lucky shot game.
 
     Fields:
-        no_players: Integer field for specifying the number of players.
+        no_players: Integer field for specifying the number of players. Defaults to the number of players
+            of the selected invitation.
+        max_time: Optional integer field with the time budget in minutes the game must fit in.
+        prefer_fresh: Boolean field asking to skip the games picked recently, when others are left.
+        invitation: Optional select field with the invitations the user organizes or joined; the game is then
+            drawn from the collections of everyone on it instead of the user's own.
+        group_mode: Choice field telling whether the game may be owned by anyone on the invitation (union)
+            or must be owned by everyone (intersection).
 
     Customization:
         Sets a custom validation rule for the number of players.
 
     '''
 
+    GROUP_MODES = [
+        ('union', 'Gra kogokolwiek z uczestników'),
+        ('intersection', 'Gra, którą mają wszyscy uczestnicy'),
+    ]
+
     # Custom field for number of players
-    no_players = forms.IntegerField(min_value=1)
+    no_players = forms.IntegerField(min_value=1, required=False)
+    max_time = forms.IntegerField(min_value=1, required=False)
+    prefer_fresh = forms.BooleanField(required=False, initial=True)
+    invitation = forms.ModelChoiceField(queryset=GameInvitation.objects.none(), required=False)
+    group_mode = forms.ChoiceField(choices=GROUP_MODES, initial='union', required=False)
 
     class Meta:
         model = Game
         fields = []
 
+    def __init__(self, user, *args, **kwargs):
+        super(LuckyShotForm, self).__init__(*args, **kwargs)
+
+        self.fields['invitation'].queryset = GameInvitation.objects.filter(
+            Q(user=user) | Q(players=user)
+        ).distinct().select_related('game').order_by('game_time')
+        self.fields['invitation'].label_from_instance = (
+            lambda invitation: f'{invitation.game.title} ({invitation.game_time:%Y-%m-%d %H:%M})'
+        )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('no_players'):
+            if cleaned_data.get('invitation'):
+                cleaned_data['no_players'] = cleaned_data['invitation'].no_players
+            elif 'no_players' not in self.errors:
+                self.add_error('no_players', 'Podaj liczbę graczy.')
+        cleaned_data['group_mode'] = cleaned_data.get('group_mode') or 'union'
+        return cleaned_data
+
+
+class DiscoverInvitationsForm(forms.Form):
+    '''
+    Description:
+        Form for filtering the upcoming game invitations open to the user.
 
+    Fields:
+        date_from: Optional date field, the first day of the window; invitations before now are never shown.
+        date_to: Optional date field, the last day of the window (inclusive).
+        game: Optional select field with the game the invitation is for, offering only games with upcoming
+            invitations rather than the whole catalog.
+        category: Optional select field with a category of that game.
+        free: Boolean field limiting the results to invitations with free seats.
 
+    Customization:
+        Rejects a window whose last day is before its first day.
+    '''
 
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    game = forms.ModelChoiceField(queryset=Game.objects.none(), required=False)
+    category = forms.ModelChoiceField(queryset=Category.objects.order_by('name'), required=False)
+    free = forms.BooleanField(required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Games of upcoming invitations only: the time index bounds the rows read, not the catalog size
+        self.fields['game'].queryset = Game.objects.filter(
+            pk__in=GameInvitation.objects.upcoming().values('game_id'),
+        ).only('id', 'title').order_by('title')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_to < date_from:
+            self.add_error('date_to', 'Data końcowa nie może być wcześniejsza niż początkowa.')
+        return cleaned_data
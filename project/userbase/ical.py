@@ -0,0 +1,148 @@
+import contextlib
+import contextvars
+import datetime
+import hashlib
+import secrets
+
+from django.db.models import F, Q
+from django.utils.http import quote_etag
+
+from gamelist.catalog import get_catalog_version
+from userbase.models import GameInvitation, User
+
+
+DEFAULT_EVENT_MINUTES = 120  # length of the event of a game without a parsed play time
+FEED_CHUNK_SIZE = 500  # invitations fetched per round trip of the server-side cursor
+
+_bumped_invitations = contextvars.ContextVar('bumped_invitations', default=frozenset())
+
+
+def rotate_token(user):
+    '''
+    Description:
+        Gives a user a new random feed token, which invalidates the previous feed URL.
+    '''
+
+    user.calendar_token = secrets.token_urlsafe(32)
+    User.objects.filter(pk=user.pk).update(calendar_token=user.calendar_token)
+    return user.calendar_token
+
+
+def bump_invitation_version(invitation_ids, user_ids=()):
+    '''
+    Description:
+        Increments invitation_version of the organizers and players of the given invitations, and of
+        the given users, with a single relative UPDATE. Call it whenever an invitation, or who plays in it,
+        changes; the feeds of those users then answer the next poll with the new content.
+    '''
+
+    players = GameInvitation.players.through.objects.filter(gameinvitation_id__in=invitation_ids).values('user_id')
+    organizers = GameInvitation.objects.filter(pk__in=invitation_ids).values('user_id')
+    User.objects.filter(Q(pk__in=organizers) | Q(pk__in=players) | Q(pk__in=user_ids)).update(
+        invitation_version=F('invitation_version') + 1,
+    )
+
+
+@contextlib.contextmanager
+def invitations_bumped(invitation_ids):
+    '''
+    Description:
+        Marks the given invitations as having had their feeds bumped already, for the duration of the block.
+        Deleting them there does not bump the same feeds again with one UPDATE per invitation.
+    '''
+
+    token = _bumped_invitations.set(_bumped_invitations.get() | frozenset(invitation_ids))
+    try:
+        yield
+    finally:
+        _bumped_invitations.reset(token)
+
+
+def is_bumped(invitation_id):
+    return invitation_id in _bumped_invitations.get()
+
+
+def feed_etag(user_id, invitation_version):
+    # Game titles come from the catalog, so its version is part of the feed state too
+    state = f'{user_id}|{invitation_version}|{get_catalog_version()}'
+    return quote_etag(hashlib.md5(state.encode()).hexdigest())
+
+
+def escape(text):
+    '''
+    Description:
+        Escapes a TEXT value of RFC 5545.
+    '''
+
+    text = text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+    return text.replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n')
+
+
+def fold(line):
+    '''
+    Description:
+        Ends a content line with CRLF, split into lines of at most 75 octets as RFC 5545 requires,
+        never inside a UTF-8 character.
+    '''
+
+    if len(line.encode()) <= 75:
+        return line + '\r\n'
+    parts, current, size = [], '', 0
+    for char in line:
+        width = len(char.encode())
+        # Continuation lines start with a space, which counts towards their 75 octets
+        if size + width > (74 if parts else 75):
+            parts.append(current)
+            current, size = '', 0
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def feed_invitations(user_id):
+    '''
+    Description:
+        Returns the invitations a user organizes or plays in, as the tuples the feed is rendered from.
+    '''
+
+    joined = GameInvitation.players.through.objects.filter(user_id=user_id).values('gameinvitation_id')
+    return GameInvitation.objects.filter(Q(user_id=user_id) | Q(pk__in=joined)).order_by('game_time', 'pk').values_list(
+        'pk', 'game_time', 'game_place', 'extra_text', 'game__title', 'game__min_minutes', 'game__max_minutes',
+    )
+
+
+def feed_lines(user_id, domain):
+    '''
+    Description:
+        Yields the iCalendar feed of a user, one chunk per event. The invitations are read with
+        QuerySet.iterator(), a server-side cursor on PostgreSQL, so memory stays constant however long
+        the feed is.
+    '''
+
+    stamp = _utc(datetime.datetime.now(datetime.timezone.utc))
+    yield ''.join(fold(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//FoG//Game nights//PL', 'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH', 'X-WR-CALNAME:FoG',
+    ))
+    rows = feed_invitations(user_id).iterator(chunk_size=FEED_CHUNK_SIZE)
+    for pk, game_time, place, extra_text, title, min_minutes, max_minutes in rows:
+        minutes = max_minutes or min_minutes or DEFAULT_EVENT_MINUTES
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:invitation-{pk}@{domain}',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART:{_utc(game_time)}',
+            f'DTEND:{_utc(game_time + datetime.timedelta(minutes=minutes))}',
+            f'SUMMARY:{escape(title)}',
+            f'LOCATION:{escape(place)}',
+        ]
+        if extra_text:
+            lines.append(f'DESCRIPTION:{escape(extra_text)}')
+        lines.append('END:VEVENT')
+        yield ''.join(fold(line) for line in lines)
+    yield fold('END:VCALENDAR')
@@ -0,0 +1,84 @@
+import random
+
+from django.db.models import Count, IntegerField, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from gamelist.models import Game
+from userbase.models import GameInvitation, User
+
+
+RECENT_PICKS_SESSION_KEY = 'lucky_shot_recent'
+RECENT_PICKS = 5  # picks remembered per session for the "prefer games not picked recently" option
+PICK_ATTEMPTS = 3  # random picks tried before falling back to the first game, if games keep disappearing
+
+
+def pick_random(games, rng=random):
+    '''
+    Description:
+        Returns a uniformly random game of a queryset without loading the matching games: one COUNT over
+        the id projection, then the id at a random OFFSET in primary key order, then that game alone.
+        Memory stays constant whatever the size of the collection. Returns None if nothing matches.
+        Games deleted between the queries make it count again, up to PICK_ATTEMPTS times.
+    '''
+
+    ids = games.order_by('pk').values_list('pk', flat=True)
+    for _ in range(PICK_ATTEMPTS):
+        count = ids.count()
+        if not count:
+            return None
+        # The collection may shrink between the COUNT and the OFFSET lookup; then count again
+        game_id = ids[rng.randrange(count):].first()
+        if game_id is not None:
+            game = games.model.objects.only('id', 'title').filter(pk=game_id).first()
+            if game is not None:
+                return game
+    return games.model.objects.only('id', 'title').filter(pk__in=ids).order_by('pk').first()
+
+
+def pick_fresh(games, recent_ids, rng=random):
+    '''
+    Description:
+        Like pick_random, but prefers games whose ids are not in recent_ids. Falls back to every
+        matching game when all of them were picked recently.
+    '''
+
+    if recent_ids:
+        game = pick_random(games.exclude(pk__in=recent_ids), rng)
+        if game is not None:
+            return game
+    return pick_random(games, rng)
+
+
+def remember_pick(session, game):
+    '''
+    Description:
+        Stores the id of a picked game in the session, keeping the RECENT_PICKS latest ones.
+    '''
+
+    recent = [game_id for game_id in session.get(RECENT_PICKS_SESSION_KEY, []) if game_id != game.pk]
+    session[RECENT_PICKS_SESSION_KEY] = [game.pk, *recent][:RECENT_PICKS]
+
+
+def group_games(invitation, mode='union'):
+    '''
+    Description:
+        Returns the games in the collections of the organizer and the players of an invitation, as one
+        queryset evaluated in a single SQL query over the User.games through table:
+
+        union: games owned by at least one of them.
+        intersection: games owned by every one of them, i.e. whose owners among them number as many as
+            the organizer plus the players (GROUP BY game HAVING COUNT(owner) = number of people).
+    '''
+
+    Collection = User.games.through
+    people = Q(user_id=invitation.user_id) | Q(user_id__in=GameInvitation.players.through.objects.filter(
+        gameinvitation_id=invitation.pk).values('user_id'))
+    owned = Collection.objects.filter(people).values('game_id')
+    if mode == 'intersection':
+        players = GameInvitation.players.through.objects.filter(
+            gameinvitation_id=invitation.pk,
+        ).exclude(user_id=invitation.user_id).values('gameinvitation_id').annotate(count=Count('user_id')).values('count')
+        # The organizer plus the players; an invitation without players gives no row, hence Coalesce
+        size = Coalesce(Subquery(players, output_field=IntegerField()), Value(0)) + 1
+        owned = owned.annotate(owners=Count('user_id')).filter(owners=size).values('game_id')
+    return Game.objects.filter(pk__in=owned)
@@ -0,0 +1,61 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from userbase import ical
+from userbase.models import ArchivedGameInvitation, GameInvitation
+
+
+class Command(BaseCommand):
+    '''
+    Description:
+        Moves the invitations whose game started more than --days days ago, with their players, from
+        GameInvitation to ArchivedGameInvitation. Each batch of --batch-size invitations is copied and
+        deleted in its own short transaction, oldest first, so the rows are locked only for one batch and
+        an interrupted run leaves every invitation either live or archived, never both. The calendar feeds
+        of everyone on a batch are invalidated with a single UPDATE.
+    '''
+
+    help = 'Moves past game invitations and their players to the archive tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.INVITATION_ARCHIVE_AFTER_DAYS,
+                            help='Archive invitations whose game started more than this many days ago.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of invitations moved per transaction.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(days=options['days'])
+        archived = 0
+        while True:
+            with transaction.atomic():
+                moved = self.archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            archived += moved
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} invitations.'))
+
+    def archive_batch(self, cutoff, size):
+        # Rows locked by a join or a leave in progress are left for the next run
+        invitations = list(
+            GameInvitation.objects.filter(game_time__lt=cutoff).order_by('game_time', 'pk')
+            .select_for_update(skip_locked=True).values(*ArchivedGameInvitation.COPIED_FIELDS)[:size]
+        )
+        if not invitations:
+            return 0
+        ids = [invitation['id'] for invitation in invitations]
+        Players = GameInvitation.players.through
+        players = Players.objects.filter(gameinvitation_id__in=ids).values_list('gameinvitation_id', 'user_id')
+
+        ArchivedGameInvitation.objects.bulk_create([ArchivedGameInvitation(**invitation) for invitation in invitations])
+        ArchivedGameInvitation.players.through.objects.bulk_create([
+            ArchivedGameInvitation.players.through(archivedgameinvitation_id=invitation_id, user_id=user_id)
+            for invitation_id, user_id in players
+        ])
+        # Once per batch and while the players rows still exist, so every feed showing the events changes
+        ical.bump_invitation_version(ids)
+        with ical.invitations_bumped(ids):
+            GameInvitation.objects.filter(pk__in=ids).delete()
+        return len(ids)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from userbase.models import GameInvitation
+from userbase.seats import reconcile_seats
+
+
+class Command(BaseCommand):
+    '''
+    Description:
+        Recounts the players of every invitation and repairs the seats_taken counters that drifted,
+        e.g. after raw SQL or a crash between a players change and its counter update. Invitations are
+        walked in primary key ranges, each range repaired by one UPDATE in its own short transaction.
+    '''
+
+    help = 'Repairs GameInvitation.seats_taken counters that no longer match the players.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of invitations checked per UPDATE.')
+
+    def handle(self, *args, **options):
+        ids = GameInvitation.objects.order_by('pk').values_list('pk', flat=True)
+        last_pk, repaired = 0, 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_pk)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                repaired += reconcile_seats(GameInvitation.objects.filter(pk__gte=batch[0], pk__lte=batch[-1]))
+            last_pk = batch[-1]
+        self.stdout.write(self.style.SUCCESS(f'Repaired {repaired} invitations.'))
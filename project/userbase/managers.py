@@ -1,4 +1,7 @@
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -32,3 +35,41 @@ class UserManager(BaseUserManager):
         if extra_fields.get("admin") is not True:
             raise ValueError(_("Superuser must have admin=True."))
         return self.create_user(email, password, **extra_fields)
+
+
+class GameInvitationQuerySet(models.QuerySet):
+    """
+    Queries of game invitations that read seat availability from the seats_taken counter
+    instead of counting players per invitation.
+    """
+    def with_available_places(self):
+        """
+        Annotate available_places (no_players minus the seats taken) and join the game.
+        """
+        return self.select_related('game').annotate(available_places=F('no_players') - F('seats_taken'))
+
+    def upcoming(self):
+        """
+        Keep the invitations that have not started yet; a range condition on game_time, so ordered by
+        (game_time, id) the past rows are skipped by userbase_invitation_time_idx instead of being read.
+        """
+        return self.filter(game_time__gte=timezone.now())
+
+    def with_free_places(self):
+        """
+        Keep the invitations with at least one free place; served by the partial index
+        userbase_invitation_free_idx when ordered by game_time.
+        """
+        return self.filter(seats_taken__lt=F('no_players'))
+
+    def joined_by(self, user):
+        """
+        Keep the invitations a user joined as a player.
+        """
+        return self.filter(pk__in=self.model.players.through.objects.filter(user=user).values('gameinvitation_id'))
+
+    def not_joined_by(self, user):
+        """
+        Drop the invitations a user joined as a player.
+        """
+        return self.exclude(pk__in=self.model.players.through.objects.filter(user=user).values('gameinvitation_id'))
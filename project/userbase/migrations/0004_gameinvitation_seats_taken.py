@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:02
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_seats(apps, schema_editor):
+    # Same UPDATE as userbase.seats.reconcile_seats, written against the historical models
+    GameInvitation = apps.get_model('userbase', 'GameInvitation')
+    players = GameInvitation.players.through.objects.filter(gameinvitation_id=models.OuterRef('pk')).order_by().values(
+        'gameinvitation_id',
+    ).annotate(count=models.Count('*')).values('count')
+    seats = Coalesce(models.Subquery(players, output_field=models.IntegerField()), models.Value(0))
+    GameInvitation.objects.using(schema_editor.connection.alias).exclude(seats_taken=seats).update(seats_taken=seats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0009_game_play_minutes'),
+        ('userbase', '0003_gameinvitation_extra_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gameinvitation',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_seats, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='gameinvitation',
+            index=models.Index(condition=models.Q(('seats_taken__lt', models.F('no_players'))), fields=['game_time', 'id'], name='userbase_invitation_free_idx'),
+        ),
+    ]
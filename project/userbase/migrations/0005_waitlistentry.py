@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:07
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userbase', '0004_gameinvitation_seats_taken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('invitation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='userbase.gameinvitation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['invitation', 'id'], name='userbase_waitlist_queue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('invitation', 'user'), name='userbase_waitlist_unique')],
+            },
+        ),
+    ]
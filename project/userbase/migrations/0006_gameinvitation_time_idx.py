@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0009_game_play_minutes'),
+        ('userbase', '0005_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gameinvitation',
+            index=models.Index(fields=['game_time', 'id'], name='userbase_invitation_time_idx'),
+        ),
+    ]
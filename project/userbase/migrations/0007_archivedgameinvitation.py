@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gamelist', '0009_game_play_minutes'),
+        ('userbase', '0006_gameinvitation_time_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedGameInvitation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('no_players', models.IntegerField()),
+                ('game_time', models.DateTimeField()),
+                ('game_place', models.CharField(max_length=64)),
+                ('extra_text', models.CharField(blank=True, max_length=510)),
+                ('seats_taken', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='gamelist.game')),
+                ('players', models.ManyToManyField(blank=True, related_name='archived_invited_players', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_invitations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userbase', '0007_archivedgameinvitation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='calendar_token',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='invitation_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,9 +1,10 @@
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from .managers import UserManager
+from .managers import GameInvitationQuerySet, UserManager
 from gamelist.models import Game
 
 
@@ -17,6 +18,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         admin: BooleanField - Indicates if the user is an admin. Default value is False.
         games: ManyToManyField - Relates the user to multiple Game objects. Can be blank.
         date_joined: DateTimeField - Stores the date and time when the user joined. Default value is the current time.
+        calendar_token: CharField - Secret token in the URL of the user's iCalendar feed. Unique, empty until requested.
+        invitation_version: PositiveIntegerField - Bumped by userbase.ical whenever an invitation the user
+            organizes or plays in changes; the ETag of the iCalendar feed.
 
     Properties:
         USERNAME_FIELD = "email" - Specifies the field used as the unique identifier for the user (email).
@@ -37,6 +41,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     admin = models.BooleanField(default=False)
     games = models.ManyToManyField(Game, blank=True)
     date_joined = models.DateTimeField(default=timezone.now)
+    calendar_token = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    invitation_version = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = []
@@ -57,9 +63,15 @@ class GameInvitation(models.Model):
         game_place: CharField - Stores the place/location of the game with a maximum length of 64 characters.
         players: ManyToManyField to User - Relates multiple users as invited players for the game. Can be blank.
         extra_text: CharField - Stores additional text related to the invitation with a maximum length of 510 characters. Can be blank.
+        seats_taken: PositiveIntegerField - Number of players, kept equal to players.count() by userbase.signals with
+            atomic F() updates. Repaired by the reconcile_seats command if it ever drifts.
+
+    Managers:
+        objects - GameInvitationQuerySet manager, computing seat availability in SQL.
 
     Methods:
         str(self) - Returns a string representation of the game invitation object, using the associated game as the output.
+        save(self) - Saves the invitation without overwriting seats_taken, except when it is created.
     '''
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="invitation_owner")
@@ -69,6 +81,87 @@ class GameInvitation(models.Model):
     game_place = models.CharField(max_length=64)
     players = models.ManyToManyField(User, blank=True, related_name="invited_players")
     extra_text = models.CharField(max_length=510, blank=True)
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = GameInvitationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Upcoming invitations, soonest first, and keyset pages over (game_time, id)
+            models.Index(fields=['game_time', 'id'], name='userbase_invitation_time_idx'),
+            # Invitations with free seats, soonest first: a range scan over this partial index
+            models.Index(
+                fields=['game_time', 'id'], condition=Q(seats_taken__lt=F('no_players')),
+                name='userbase_invitation_free_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return self.game
+
+    def save(self, *args, **kwargs):
+        # seats_taken is only written by relative UPDATEs; a full save of a stale instance must not reset it
+        if self.pk is not None and not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields if not field.primary_key and field.name != 'seats_taken'
+            ]
+        super().save(*args, **kwargs)
+
+class WaitlistEntry(models.Model):
+    '''
+    Attributes:
+        invitation: ForeignKey to GameInvitation - The full invitation the user waits for. On deletion, cascades.
+        user: ForeignKey to User - The waiting user. On deletion, cascades.
+        created_at: DateTimeField - When the user joined the waitlist.
+
+    Additional Information:
+        The queue is first in, first out by primary key. A user waits at most once per invitation.
+        Entries are added and promoted to players by userbase.seats under the invitation row lock.
+    '''
+
+    invitation = models.ForeignKey(GameInvitation, on_delete=models.CASCADE, related_name="waitlist")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="waitlist_entries")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['invitation', 'user'], name='userbase_waitlist_unique'),
+        ]
+        indexes = [
+            # Head of the queue and the entries ahead of a user: range scans in queue order
+            models.Index(fields=['invitation', 'id'], name='userbase_waitlist_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} ({self.invitation_id})'
+
+
+class ArchivedGameInvitation(models.Model):
+    '''
+    Attributes:
+        id: BigIntegerField - The primary key the invitation had in GameInvitation.
+        user, game, no_players, game_time, game_place, extra_text, seats_taken: Copied from GameInvitation.
+        players: ManyToManyField to User - The players of the invitation when it was archived.
+        archived_at: DateTimeField - When the invitation was moved to the archive.
+
+    Additional Information:
+        Filled by the archive_invitations command, which keeps GameInvitation limited to recent and upcoming
+        games. Only read by the history page, and only when it is asked for archived games.
+    '''
+
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="archived_invitations")
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="+")
+    no_players = models.IntegerField()
+    game_time = models.DateTimeField()
+    game_place = models.CharField(max_length=64)
+    players = models.ManyToManyField(User, blank=True, related_name="archived_invited_players")
+    extra_text = models.CharField(max_length=510, blank=True)
+    seats_taken = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    # Fields copied from GameInvitation when archiving
+    COPIED_FIELDS = ('id', 'user_id', 'game_id', 'no_players', 'game_time', 'game_place', 'extra_text', 'seats_taken')
 
     def __str__(self):
-        return self.game
\ No newline at end of file
+        return str(self.game)
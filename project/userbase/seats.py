@@ -0,0 +1,156 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from userbase import ical
+
+
+# Outcomes of reserve_seat
+JOINED = 'joined'
+ALREADY_JOINED = 'already-joined'
+FULL = 'full'
+WAITLISTED = 'waitlisted'
+
+
+def actual_seats(model):
+    '''
+    Description:
+        Returns the expression counting the players rows of each invitation, for UPDATE statements.
+    '''
+
+    players = model.players.through.objects.filter(gameinvitation_id=OuterRef('pk')).order_by().values(
+        'gameinvitation_id',
+    ).annotate(count=Count('*')).values('count')
+    return Coalesce(Subquery(players, output_field=IntegerField()), Value(0))
+
+
+def reconcile_seats(invitations):
+    '''
+    Description:
+        Sets seats_taken to the real number of players on the given invitations whose counter drifted,
+        with a single UPDATE. Returns the number of repaired invitations.
+    '''
+
+    seats = actual_seats(invitations.model)
+    return invitations.exclude(seats_taken=seats).update(seats_taken=seats)
+
+
+def reserve_seat(invitation, user):
+    '''
+    Description:
+        Adds a user to the players of an invitation only while it has a free seat, safely under concurrent joins.
+
+        The seat is taken by a conditional UPDATE ... SET seats_taken = seats_taken + 1 WHERE seats_taken < no_players.
+        Concurrent joiners queue on the row lock of that one statement and PostgreSQL re-checks the condition
+        once the lock is released, so the last seat goes to exactly one of them. The players row is then
+        inserted directly into the through table, which sends no m2m_changed signal, so the seat is not
+        counted twice and the calendar feed versions are bumped here. The lock is held until the short transaction commits, never across a read.
+
+    Returns:
+        JOINED, ALREADY_JOINED or FULL.
+    '''
+
+    Players = invitation.players.through
+    with transaction.atomic():
+        if Players.objects.filter(gameinvitation_id=invitation.pk, user_id=user.pk).exists():
+            return ALREADY_JOINED
+        taken = type(invitation).objects.filter(pk=invitation.pk, seats_taken__lt=F('no_players')).update(
+            seats_taken=F('seats_taken') + 1,
+        )
+        if not taken:
+            return FULL
+        try:
+            with transaction.atomic():
+                Players.objects.create(gameinvitation_id=invitation.pk, user_id=user.pk)
+        except IntegrityError:
+            # The same user joined from another request meanwhile; give the seat back
+            type(invitation).objects.filter(pk=invitation.pk).update(seats_taken=F('seats_taken') - 1)
+            return ALREADY_JOINED
+        # A waiting user who got a seat directly does not keep a place in the queue
+        invitation.waitlist.filter(user_id=user.pk).delete()
+        ical.bump_invitation_version([invitation.pk])
+    invitation.seats_taken += 1
+    return JOINED
+
+
+def lock_invitation(invitation):
+    '''
+    Description:
+        Locks the row of an invitation until the end of the current transaction and returns it freshly read.
+        Joining the waitlist and freeing a seat both take this lock first, so a seat can never be freed
+        between a joiner seeing the invitation full and the joiner entering the queue.
+    '''
+
+    return type(invitation).objects.select_for_update().get(pk=invitation.pk)
+
+
+def promote_waitlist(invitation):
+    '''
+    Description:
+        Moves the head of the waitlist into the players, one user per free seat, in queue order.
+        Runs under the invitation row lock; call it inside the transaction that freed the seats.
+        Returns the promoted users.
+    '''
+
+    Players = invitation.players.through
+    with transaction.atomic():
+        locked = lock_invitation(invitation)
+        free = locked.no_players - locked.seats_taken
+        heads = list(locked.waitlist.select_related('user').order_by('pk')[:max(free, 0)])
+        if heads:
+            Players.objects.bulk_create([Players(gameinvitation_id=locked.pk, user_id=entry.user_id) for entry in heads])
+            locked.waitlist.filter(pk__in=[entry.pk for entry in heads]).delete()
+            type(invitation).objects.filter(pk=locked.pk).update(seats_taken=F('seats_taken') + len(heads))
+            ical.bump_invitation_version([locked.pk])
+    invitation.seats_taken = locked.seats_taken + len(heads)
+    return [entry.user for entry in heads]
+
+
+def release_seat(invitation, user):
+    '''
+    Description:
+        Removes a user from the players of an invitation and gives the freed seat to the head of the
+        waitlist, in the same transaction. The players row is deleted directly, so no m2m_changed signal
+        adjusts the counter behind our back. Returns the promoted users, or None if the user was not playing.
+    '''
+
+    Players = invitation.players.through
+    with transaction.atomic():
+        lock_invitation(invitation)
+        if not Players.objects.filter(gameinvitation_id=invitation.pk, user_id=user.pk).delete()[0]:
+            return None
+        ical.bump_invitation_version([invitation.pk], user_ids=[user.pk])
+        type(invitation).objects.filter(pk=invitation.pk).update(seats_taken=F('seats_taken') - 1)
+        return promote_waitlist(invitation)
+
+
+def join_waitlist(invitation, user):
+    '''
+    Description:
+        Takes a free seat of an invitation if there is one, otherwise puts the user at the end of its waitlist.
+        A user already waiting keeps their place.
+
+    Returns:
+        JOINED, ALREADY_JOINED or WAITLISTED.
+    '''
+
+    with transaction.atomic():
+        lock_invitation(invitation)
+        outcome = reserve_seat(invitation, user)
+        if outcome != FULL:
+            return outcome
+        invitation.waitlist.get_or_create(user=user)
+    return WAITLISTED
+
+
+def waitlist_position(invitation, user):
+    '''
+    Description:
+        Returns the 1-based place of a user in the waitlist of an invitation, or None if the user is not waiting.
+        Only the entries ahead of the user are counted, with a range scan of the queue index.
+    '''
+
+    entry_id = invitation.waitlist.filter(user_id=user.pk).values_list('pk', flat=True).first()
+    if entry_id is None:
+        return None
+    return invitation.waitlist.filter(pk__lte=entry_id).count()
@@ -0,0 +1,71 @@
+from collections import Counter
+
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from userbase import ical
+from userbase.models import GameInvitation
+
+
+def _invitation_ids(sender, instance, reverse, pk_set=None, lock=False):
+    # Invitation id of every players row of the instance, optionally limited to the given other ends.
+    # Locked rows stay ours until the DELETE of remove() or clear() commits; a concurrent removal of the
+    # same rows waits for it and then no longer finds them, so each row is subtracted only once.
+    own, other = ('user_id', 'gameinvitation_id') if reverse else ('gameinvitation_id', 'user_id')
+    rows = sender.objects.filter(**{own: instance.pk})
+    if pk_set is not None:
+        rows = rows.filter(**{f'{other}__in': pk_set})
+    if lock:
+        rows = rows.select_for_update().order_by('pk')
+    return list(rows.values_list('gameinvitation_id', flat=True))
+
+
+def _shift_seats(invitation_ids, sign):
+    by_delta = {}
+    for invitation_id, delta in Counter(invitation_ids).items():
+        by_delta.setdefault(delta, []).append(invitation_id)
+    for delta, ids in by_delta.items():
+        GameInvitation.objects.filter(pk__in=ids).update(seats_taken=F('seats_taken') + sign * delta)
+
+
+@receiver(m2m_changed, sender=GameInvitation.players.through)
+def count_seats(sender, instance, action, reverse, pk_set, **kwargs):
+    # Keeps GameInvitation.seats_taken equal to the number of players with relative UPDATEs,
+    # so concurrent joins and leaves on the same invitation do not overwrite each other
+    if action == 'pre_remove':
+        # remove() reports every given id, including players who were not on the invitation
+        instance._seats_removed = _invitation_ids(sender, instance, reverse, pk_set, lock=True)
+    elif action == 'pre_clear':
+        instance._seats_removed = _invitation_ids(sender, instance, reverse, lock=True)
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if action == 'post_add':
+            # add() only reports the rows it inserted
+            changed, sign = (list(pk_set) if reverse else [instance.pk] * len(pk_set)), 1
+        else:
+            changed, sign = instance.__dict__.pop('_seats_removed', []), -1
+        _shift_seats(changed, sign)
+        if not reverse:
+            instance.seats_taken += sign * len(changed)
+
+
+@receiver(post_save, sender=GameInvitation)
+def bump_feeds_of_invitation(sender, instance, **kwargs):
+    ical.bump_invitation_version([instance.pk], user_ids=[instance.user_id])
+
+
+@receiver(pre_delete, sender=GameInvitation)
+def bump_feeds_of_deleted_invitation(sender, instance, **kwargs):
+    # Before deletion, while the players rows still tell whose feeds show the invitation;
+    # bulk deletions bump all their feeds at once beforehand under ical.invitations_bumped
+    if not ical.is_bumped(instance.pk):
+        ical.bump_invitation_version([instance.pk], user_ids=[instance.user_id])
+
+
+@receiver(m2m_changed, sender=GameInvitation.players.through)
+def bump_feeds_of_players(sender, instance, action, reverse, pk_set, **kwargs):
+    # Leaving players are still on the invitation before a removal, new ones only after an addition
+    if action in ('pre_remove', 'pre_clear', 'post_add'):
+        invitation_ids = _invitation_ids(sender, instance, reverse, None if action == 'pre_clear' else pk_set)
+        if invitation_ids:
+            ical.bump_invitation_version(invitation_ids)
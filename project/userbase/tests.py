@@ -187,10 +187,22 @@
 #         self.assertFalse(self.user.collection.filter(pk=self.game.pk).exists())
 
 
-from django.test import TestCase
+import datetime
+import random
+import threading
+from io import StringIO
+from unittest import skipUnless
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from gamelist.forms import AddMechanicForm
-from gamelist.models import RequestedMechanic
+from gamelist.models import Category, Game, RequestedMechanic
+from userbase import ical, lucky, seats
+from userbase.models import ArchivedGameInvitation, GameInvitation, User
 #
 # class AddMechanicFormTest(TestCase):
 #     def test_add_mechanic_form_valid(self):
@@ -265,4 +277,688 @@ class AddMechanicFormTest(TestCase):
         self.assertTrue(form.is_valid(), form.errors)
 
         mechanic = form.save()
-        self.assertIsInstance(mechanic, RequestedMechanic)
\ No newline at end of file
+        self.assertIsInstance(mechanic, RequestedMechanic)
+
+class LuckyShotViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='player@example.com', password='secret', nick='player')
+        cls.short = Game.objects.create(title='Onirim', author='A', description='', min_players=1, max_players=2,
+                                        game_time='15 min')
+        cls.long = Game.objects.create(title='Gloomhaven', author='B', description='', min_players=1, max_players=4,
+                                       game_time='60-120 min')
+        cls.user.games.add(cls.short, cls.long)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_time_budget_limits_the_pick(self):
+        for _ in range(5):
+            response = self.client.post(reverse('lucky-shot'), {'no_players': 1, 'max_time': 30})
+            self.assertEqual(response.context['random_game'], self.short)
+
+        response = self.client.post(reverse('lucky-shot'), {'no_players': 3, 'max_time': 30})
+        self.assertIsNone(response.context['random_game'])
+
+    def test_pick_loads_one_game_in_three_queries(self):
+        games = self.user.games.filter(min_players__lte=1)
+
+        with self.assertNumQueries(3):
+            game = lucky.pick_random(games, random.Random(1))
+        self.assertIn(game, [self.short, self.long])
+        self.assertEqual(game.get_deferred_fields(), {f.attname for f in Game._meta.concrete_fields} - {'id', 'title'})
+        self.assertIsNone(lucky.pick_random(games.filter(max_players__gte=5)))
+
+    def test_games_removed_between_count_and_pick(self):
+        user = self.user
+
+        class Shrinking:
+            # Removes the last game from the collection right after it was counted, then points at it
+            def randrange(self, count):
+                user.games.remove(self.last)
+                return count - 1
+
+        rng = Shrinking()
+        rng.last = self.long if self.long.pk > self.short.pk else self.short
+        self.assertEqual(lucky.pick_random(self.user.games.all(), rng), ({self.short, self.long} - {rng.last}).pop())
+
+    def test_prefers_games_not_picked_recently(self):
+        self.client.post(reverse('lucky-shot'), {'no_players': 1})
+        first = self.client.session[lucky.RECENT_PICKS_SESSION_KEY][0]
+
+        response = self.client.post(reverse('lucky-shot'), {'no_players': 1, 'prefer_fresh': 'on'})
+        self.assertNotEqual(response.context['random_game'].pk, first)
+        # Once everything was picked recently any game may come up again
+        response = self.client.post(reverse('lucky-shot'), {'no_players': 1, 'prefer_fresh': 'on'})
+        self.assertIsNotNone(response.context['random_game'])
+        self.assertEqual(len(self.client.session[lucky.RECENT_PICKS_SESSION_KEY]), 2)
+
+
+class GroupLuckyShotTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.ann, cls.bob = (
+            User.objects.create_user(email=f'{nick}@example.com', password='secret', nick=nick)
+            for nick in ('host', 'ann', 'bob')
+        )
+        cls.azul, cls.catan, cls.onirim = (
+            Game.objects.create(title=title, author='A', description='', min_players=low, max_players=high,
+                                game_time='45 min')
+            for title, low, high in (('Azul', 2, 4), ('Catan', 3, 4), ('Onirim', 1, 2))
+        )
+        cls.host.games.add(cls.azul, cls.catan)
+        cls.ann.games.add(cls.azul, cls.onirim)
+        cls.bob.games.add(cls.azul, cls.catan)
+        cls.invitation = GameInvitation.objects.create(user=cls.host, game=cls.azul, no_players=3, game_place='Home')
+        cls.invitation.players.add(cls.ann, cls.bob)
+
+    def test_union_and_intersection_in_one_query(self):
+        with self.assertNumQueries(1):
+            union = set(lucky.group_games(self.invitation, 'union'))
+        with self.assertNumQueries(1):
+            intersection = set(lucky.group_games(self.invitation, 'intersection'))
+
+        self.assertEqual(union, {self.azul, self.catan, self.onirim})
+        self.assertEqual(intersection, {self.azul})
+
+        # The organizer alone is a group of one
+        alone = GameInvitation.objects.create(user=self.host, game=self.azul, no_players=2, game_place='Home')
+        self.assertEqual(set(lucky.group_games(alone, 'intersection')), {self.azul, self.catan})
+
+    def test_view_draws_a_game_for_the_invitation_players(self):
+        self.client.force_login(self.ann)
+
+        for _ in range(5):
+            response = self.client.post(reverse('lucky-shot'), {'invitation': self.invitation.pk})
+            # Three players: Onirim (1-2) is out, Catan only comes from the other collections
+            self.assertIn(response.context['random_game'], [self.azul, self.catan])
+
+        response = self.client.post(reverse('lucky-shot'), {'invitation': self.invitation.pk, 'group_mode': 'intersection'})
+        self.assertEqual(response.context['random_game'], self.azul)
+
+    def test_only_own_invitations_can_be_used(self):
+        outsider = User.objects.create_user(email='out@example.com', password='secret', nick='out')
+        self.client.force_login(outsider)
+
+        response = self.client.post(reverse('lucky-shot'), {'invitation': self.invitation.pk})
+        self.assertIn('invitation', response.context['form'].errors)
+
+
+class UserInvitationsViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.host = (
+            User.objects.create_user(email=f'{nick}@example.com', password='secret', nick=nick) for nick in ('user', 'host')
+        )
+        cls.game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                       game_time='45 min')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def create_invitations(self, count, no_players=3, players=()):
+        for n in range(count):
+            invitation = GameInvitation.objects.create(user=self.host, game=self.game, no_players=no_players,
+                                                       game_place=f'Place {n}',
+                                                       game_time=timezone.now() + datetime.timedelta(days=1))
+            invitation.players.add(*players)
+
+    def test_constant_number_of_queries(self):
+        other = User.objects.create_user(email='other@example.com', password='secret', nick='other')
+        self.create_invitations(1, players=[other])
+        with self.assertNumQueries(5):
+            self.client.get(reverse('user-invitations'))
+
+        self.create_invitations(10, players=[other])
+        self.create_invitations(5, players=[self.user, other])
+        GameInvitation.objects.create(user=self.user, game=self.game, no_players=2, game_place='Home')
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('user-invitations'))
+
+        self.assertEqual(len(response.context['available_user_invitations']), 11)
+        # Counting the players is not limited to the user by the joined filter
+        self.assertEqual({i.available_places for i in response.context['invitations_accepted']}, {1})
+        self.assertEqual([i.available_places for i in response.context['user_invitations']], [2])
+
+    def test_open_invitations_can_be_limited_to_free_places(self):
+        other = User.objects.create_user(email='other@example.com', password='secret', nick='other')
+        self.create_invitations(2, no_players=1, players=[other])
+        self.create_invitations(1, no_players=2, players=[other])
+
+        response = self.client.get(reverse('user-invitations'), {'free': '1'})
+
+        self.assertEqual([i.available_places for i in response.context['available_user_invitations']], [1])
+        self.assertEqual(len(self.client.get(reverse('user-invitations')).context['available_user_invitations']), 3)
+
+    def test_past_invitations_are_not_offered(self):
+        self.create_invitations(1)
+        GameInvitation.objects.create(user=self.host, game=self.game, no_players=3, game_place='Yesterday',
+                                      game_time=timezone.now() - datetime.timedelta(days=1))
+
+        response = self.client.get(reverse('user-invitations'))
+
+        self.assertEqual([i.game_place for i in response.context['available_user_invitations']], ['Place 0'])
+
+
+class DiscoverInvitationsViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.host = (
+            User.objects.create_user(email=f'{nick}@example.com', password='secret', nick=nick) for nick in ('user', 'host')
+        )
+        cls.azul, cls.tichu = (
+            Game.objects.create(title=title, author='A', description='', min_players=2, max_players=4,
+                                game_time='45 min')
+            for title in ('Azul', 'Tichu')
+        )
+        cls.cards = Category.objects.create(name='Karciane')
+        cls.tichu.category.add(cls.cards)
+        cls.tomorrow = timezone.now() + datetime.timedelta(days=1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def invite(self, place, game=None, days=1, no_players=2):
+        return GameInvitation.objects.create(user=self.host, game=game or self.azul, no_players=no_players,
+                                             game_place=place, game_time=self.tomorrow + datetime.timedelta(days=days - 1))
+
+    def places(self, **params):
+        response = self.client.get(reverse('discover-invitations'), params)
+        return [invitation.game_place for invitation in response.context['page']]
+
+    def test_filters(self):
+        self.invite('Past', days=-2)
+        self.invite('Soon')
+        self.invite('Later', days=10)
+        self.invite('Cards', game=self.tichu, days=2)
+        full = self.invite('Full', days=3, no_players=1)
+        full.players.add(self.host)
+        self.invite('Own', days=1).players.add(self.user)
+
+        self.assertEqual(self.places(), ['Soon', 'Cards', 'Full', 'Later'])
+        self.assertEqual(self.places(date_to=(self.tomorrow + datetime.timedelta(days=1)).date()), ['Soon', 'Cards'])
+        self.assertEqual(self.places(date_from=(self.tomorrow + datetime.timedelta(days=2)).date()),
+                         ['Full', 'Later'])
+        self.assertEqual(self.places(game=self.tichu.pk), ['Cards'])
+        self.assertEqual(self.places(category=self.cards.pk), ['Cards'])
+        self.assertEqual(self.places(free='on'), ['Soon', 'Cards', 'Later'])
+
+    def test_game_choices_are_games_with_upcoming_invitations(self):
+        self.invite('Past', game=self.tichu, days=-2)
+        self.invite('Soon')
+        Game.objects.create(title='Unused', author='A', description='', min_players=2, max_players=4, game_time='')
+
+        response = self.client.get(reverse('discover-invitations'))
+
+        self.assertEqual(list(response.context['form'].fields['game'].queryset), [self.azul])
+        self.assertNotContains(response, 'Unused')
+
+    def test_reversed_window_is_rejected(self):
+        self.invite('Soon')
+        response = self.client.get(reverse('discover-invitations'), {'date_from': '2030-02-01', 'date_to': '2030-01-01'})
+        self.assertContains(response, 'Data końcowa nie może być wcześniejsza niż początkowa.')
+        self.assertEqual(list(response.context['page']), [])
+
+    def test_keyset_pages_keep_filters_and_repeat_no_rows(self):
+        # The same game_time, down to the microsecond, for every invitation: pages are split on the id
+        invitations = [self.invite(f'Place {n}') for n in range(60)]
+        seen, cursor = [], None
+        while True:
+            params = {'free': 'on', 'cursor': cursor} if cursor else {'free': 'on'}
+            # Session, user, the page, and the game and category choices of the form
+            with self.assertNumQueries(5):
+                response = self.client.get(reverse('discover-invitations'), params)
+            page = response.context['page']
+            seen.extend(invitation.pk for invitation in page)
+            if not page.has_next:
+                break
+            self.assertContains(response, f'free=on&amp;cursor={page.next_cursor}')
+            cursor = page.next_cursor
+        self.assertEqual(seen, [invitation.pk for invitation in invitations])
+
+
+class SeatsTakenTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.ann, cls.bob = (
+            User.objects.create_user(email=f'{nick}@example.com', password='secret', nick=nick)
+            for nick in ('host', 'ann', 'bob')
+        )
+        cls.game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                       game_time='45 min')
+
+    def create_invitation(self, no_players=3):
+        return GameInvitation.objects.create(user=self.host, game=self.game, no_players=no_players, game_place='Home')
+
+    def seats(self, invitation):
+        return GameInvitation.objects.values_list('seats_taken', flat=True).get(pk=invitation.pk)
+
+    def test_counter_follows_players_from_both_sides(self):
+        invitation, other = self.create_invitation(), self.create_invitation()
+
+        invitation.players.add(self.ann, self.bob)
+        invitation.players.add(self.ann)
+        self.assertEqual((self.seats(invitation), invitation.seats_taken), (2, 2))
+
+        self.host.invited_players.add(invitation, other)
+        self.assertEqual((self.seats(invitation), self.seats(other)), (3, 1))
+
+        invitation.players.remove(self.bob, User.objects.create_user(email='x@example.com', password='x', nick='x'))
+        self.assertEqual(self.seats(invitation), 2)
+
+        self.host.invited_players.clear()
+        self.assertEqual((self.seats(invitation), self.seats(other)), (1, 0))
+
+        invitation.players.set([self.bob])
+        invitation.players.clear()
+        self.assertEqual(self.seats(invitation), 0)
+
+    def test_saving_a_stale_invitation_keeps_the_counter(self):
+        invitation = self.create_invitation()
+        stale = GameInvitation.objects.get(pk=invitation.pk)
+        invitation.players.add(self.ann)
+
+        stale.game_place = 'Club'
+        stale.save()
+
+        self.assertEqual(self.seats(invitation), 1)
+
+    def test_free_places_use_the_counter(self):
+        full, open_ = self.create_invitation(no_players=1), self.create_invitation(no_players=2)
+        full.players.add(self.ann)
+        open_.players.add(self.ann)
+
+        with self.assertNumQueries(1):
+            free = list(GameInvitation.objects.with_available_places().with_free_places())
+        self.assertEqual([(invitation.pk, invitation.available_places) for invitation in free], [(open_.pk, 1)])
+
+    def test_reconcile_command_repairs_drift(self):
+        invitations = [self.create_invitation() for _ in range(3)]
+        invitations[0].players.add(self.ann, self.bob)
+        invitations[1].players.add(self.ann)
+        GameInvitation.objects.filter(pk=invitations[0].pk).update(seats_taken=0)
+        GameInvitation.objects.filter(pk=invitations[2].pk).update(seats_taken=3)
+
+        out = StringIO()
+        call_command('reconcile_seats', batch_size=2, stdout=out)
+
+        self.assertEqual([self.seats(invitation) for invitation in invitations], [2, 1, 0])
+        self.assertIn('Repaired 2 invitations.', out.getvalue())
+
+
+class SeatReservationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.ann, cls.bob = (
+            User.objects.create_user(email=f'{nick}@example.com', password='secret', nick=nick)
+            for nick in ('host', 'ann', 'bob')
+        )
+        game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                   game_time='45 min')
+        cls.invitation = GameInvitation.objects.create(user=cls.host, game=game, no_players=1, game_place='Home')
+
+    def join(self, user):
+        self.client.force_login(user)
+        return self.client.post(reverse('accept-invitation', args=[self.invitation.pk]))
+
+    def test_join_only_while_seats_remain(self):
+        response = self.join(self.ann)
+        self.assertContains(response, 'Dodano Cię do gry!')
+
+        response = self.join(self.ann)
+        self.assertContains(response, 'Jesteś już zapisany do tej gry.')
+
+        response = self.join(self.bob)
+        self.assertContains(response, 'Brak wolnych miejsc w tej grze!', status_code=409)
+
+        self.invitation.refresh_from_db()
+        self.assertEqual(list(self.invitation.players.all()), [self.ann])
+        self.assertEqual(self.invitation.seats_taken, 1)
+
+    def test_freed_seat_can_be_taken(self):
+        self.assertEqual(seats.reserve_seat(self.invitation, self.ann), seats.JOINED)
+        self.invitation.players.remove(self.ann)
+
+        self.assertEqual(seats.reserve_seat(self.invitation, self.bob), seats.JOINED)
+        self.assertEqual(GameInvitation.objects.get(pk=self.invitation.pk).seats_taken, 1)
+
+
+class ArchiveInvitationsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.ann, cls.bob = (
+            User.objects.create_user(email=f'{nick}@example.com', password='secret', nick=nick)
+            for nick in ('host', 'ann', 'bob')
+        )
+        cls.game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                       game_time='45 min')
+
+    def invite(self, place, days_ago, players=()):
+        invitation = GameInvitation.objects.create(user=self.host, game=self.game, no_players=3, game_place=place,
+                                                   game_time=timezone.now() - datetime.timedelta(days=days_ago))
+        invitation.players.add(*players)
+        return invitation
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_invitations', *args, stdout=out)
+        return out.getvalue()
+
+    def test_moves_old_invitations_with_players_in_batches(self):
+        old = [self.invite(f'Old {n}', 200 + n, players=[self.ann, self.bob][:n]) for n in range(3)]
+        recent = self.invite('Recent', 10, players=[self.ann])
+        upcoming = self.invite('Upcoming', -1)
+
+        self.assertIn('Archived 3 invitations.', self.archive('--batch-size', '2'))
+
+        self.assertEqual(list(GameInvitation.objects.order_by('pk')), [recent, upcoming])
+        archived = ArchivedGameInvitation.objects.order_by('pk')
+        self.assertEqual([a.pk for a in archived], [invitation.pk for invitation in old])
+        self.assertEqual([a.seats_taken for a in archived], [0, 1, 2])
+        self.assertEqual(list(archived[2].players.order_by('pk')), [self.ann, self.bob])
+        self.assertEqual(GameInvitation.players.through.objects.count(), 1)
+
+        self.assertIn('Archived 0 invitations.', self.archive())
+        self.assertIn('Archived 1 invitations.', self.archive('--days', '5'))
+
+    def test_feeds_of_organizer_and_players_change_once_per_batch(self):
+        for n in range(20):
+            self.invite(f'Old {n}', 200 + n, players=[self.ann])
+        before = dict(User.objects.values_list('nick', 'invitation_version'))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.archive('--batch-size', '50')
+
+        after = dict(User.objects.values_list('nick', 'invitation_version'))
+        self.assertEqual(after['host'] - before['host'], 1)
+        self.assertEqual(after['ann'] - before['ann'], 1)
+        self.assertEqual(after['bob'], before['bob'])
+        # Select, copy, bump and delete for the batch, plus the empty select ending the run
+        self.assertLess(len(queries), 15)
+
+    def test_invitations_deleted_outside_the_command_still_bump_feeds(self):
+        kept, archived = self.invite('Kept', 1, players=[self.bob]), self.invite('Old', 200, players=[self.ann])
+        before = dict(User.objects.values_list('nick', 'invitation_version'))
+
+        with ical.invitations_bumped([archived.pk]):
+            kept.delete()
+
+        after = dict(User.objects.values_list('nick', 'invitation_version'))
+        self.assertEqual(after['bob'] - before['bob'], 1)
+        self.assertEqual(after['host'] - before['host'], 1)
+        self.assertFalse(ical.is_bumped(archived.pk))
+
+    def test_history_reads_the_archive_only_when_asked(self):
+        self.invite('Old', 200, players=[self.ann])
+        self.invite('Recent', 10, players=[self.ann])
+        self.invite('Other', 200, players=[self.bob])
+        self.archive()
+        self.client.force_login(self.ann)
+
+        response = self.client.get(reverse('invitation-history'))
+        self.assertEqual([i.game_place for i in response.context['past_invitations']], ['Recent'])
+        self.assertIsNone(response.context['archived_invitations'])
+
+        response = self.client.get(reverse('invitation-history'), {'archive': '1'})
+        self.assertEqual([i.game_place for i in response.context['archived_invitations']], ['Old'])
+
+
+class WaitlistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.ann, cls.bob, cls.cid = (
+            User.objects.create_user(email=f'{nick}@example.com', password='secret', nick=nick)
+            for nick in ('host', 'ann', 'bob', 'cid')
+        )
+        game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                   game_time='45 min')
+        cls.invitation = GameInvitation.objects.create(user=cls.host, game=game, no_players=1, game_place='Home')
+
+    def wait(self, user):
+        self.client.force_login(user)
+        return self.client.post(reverse('invitation-waitlist', args=[self.invitation.pk]))
+
+    def test_queue_is_first_in_first_out(self):
+        self.assertContains(self.wait(self.ann), 'Dodano Cię do gry!')
+        self.assertContains(self.wait(self.bob), 'jesteś na liście rezerwowej na miejscu 1')
+        self.assertContains(self.wait(self.cid), 'jesteś na liście rezerwowej na miejscu 2')
+        self.assertContains(self.wait(self.cid), 'jesteś na liście rezerwowej na miejscu 2')
+
+        with self.assertNumQueries(2):
+            self.assertEqual(seats.waitlist_position(self.invitation, self.cid), 2)
+        self.assertIsNone(seats.waitlist_position(self.invitation, self.ann))
+
+    def test_organizer_removal_promotes_the_head(self):
+        seats.reserve_seat(self.invitation, self.ann)
+        self.assertEqual(seats.join_waitlist(self.invitation, self.bob), seats.WAITLISTED)
+        self.assertEqual(seats.join_waitlist(self.invitation, self.cid), seats.WAITLISTED)
+
+        self.client.force_login(self.host)
+        response = self.client.post(reverse('decline-player', args=[self.invitation.pk, self.ann.pk]))
+        self.assertContains(response, 'Usunięto gracza ann z gry! Miejsce zajął bob z listy rezerwowej.')
+
+        self.invitation.refresh_from_db()
+        self.assertEqual(list(self.invitation.players.all()), [self.bob])
+        self.assertEqual(self.invitation.seats_taken, 1)
+        self.assertEqual(seats.waitlist_position(self.invitation, self.cid), 1)
+
+    def test_leaving_player_is_replaced(self):
+        seats.reserve_seat(self.invitation, self.ann)
+        seats.join_waitlist(self.invitation, self.bob)
+
+        self.client.force_login(self.ann)
+        response = self.client.post(reverse('decline-player', args=[self.invitation.pk, self.ann.pk]))
+        self.assertContains(response, 'Wypisano Cię z gry.')
+
+        self.invitation.refresh_from_db()
+        self.assertEqual(list(self.invitation.players.all()), [self.bob])
+        self.assertFalse(self.invitation.waitlist.exists())
+
+    def test_only_the_organizer_or_the_player_can_remove(self):
+        seats.reserve_seat(self.invitation, self.ann)
+        self.client.force_login(self.bob)
+        response = self.client.post(reverse('decline-player', args=[self.invitation.pk, self.ann.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(list(self.invitation.players.all()), [self.ann])
+
+    def test_leaving_the_waitlist_and_more_seats(self):
+        seats.reserve_seat(self.invitation, self.ann)
+        for user in (self.bob, self.cid):
+            seats.join_waitlist(self.invitation, user)
+        self.client.force_login(self.bob)
+        response = self.client.post(reverse('invitation-waitlist', args=[self.invitation.pk]), {'leave': '1'})
+        self.assertContains(response, 'Wypisano Cię z listy rezerwowej.')
+
+        GameInvitation.objects.filter(pk=self.invitation.pk).update(no_players=3)
+        self.assertEqual(seats.promote_waitlist(self.invitation), [self.cid])
+        self.invitation.refresh_from_db()
+        self.assertEqual(self.invitation.seats_taken, 2)
+        self.assertEqual(set(self.invitation.players.all()), {self.ann, self.cid})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'concurrent joins need PostgreSQL')
+class ConcurrentSeatReservationTest(TransactionTestCase):
+    def test_concurrent_joins_never_overbook(self):
+        host = User.objects.create_user(email='host@example.com', password='secret', nick='host')
+        game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                   game_time='45 min')
+        invitation = GameInvitation.objects.create(user=host, game=game, no_players=3, game_place='Home')
+        players = [User.objects.create_user(email=f'p{n}@example.com', password='x', nick=f'p{n}') for n in range(12)]
+        barrier, outcomes = threading.Barrier(len(players)), []
+
+        def join(player):
+            try:
+                barrier.wait()
+                outcomes.append(seats.reserve_seat(GameInvitation.objects.get(pk=invitation.pk), player))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=join, args=[player]) for player in players]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        invitation.refresh_from_db()
+        self.assertEqual(outcomes.count(seats.JOINED), 3)
+        self.assertEqual(outcomes.count(seats.FULL), 9)
+        self.assertEqual((invitation.seats_taken, invitation.players.count()), (3, 3))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'concurrent waitlist traffic needs PostgreSQL')
+class ConcurrentWaitlistTest(TransactionTestCase):
+    def test_leaves_and_joins_keep_the_seats_consistent(self):
+        host = User.objects.create_user(email='host@example.com', password='secret', nick='host')
+        game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                   game_time='45 min')
+        invitation = GameInvitation.objects.create(user=host, game=game, no_players=4, game_place='Home')
+        users = [User.objects.create_user(email=f'p{n}@example.com', password='x', nick=f'p{n}') for n in range(16)]
+        leavers, joiners = users[:4], users[4:]
+        for user in leavers:
+            seats.reserve_seat(invitation, user)
+        barrier = threading.Barrier(len(users))
+
+        def run(action, user):
+            try:
+                barrier.wait()
+                action(GameInvitation.objects.get(pk=invitation.pk), user)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=[seats.release_seat, user]) for user in leavers]
+        threads += [threading.Thread(target=run, args=[seats.join_waitlist, user]) for user in joiners]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        invitation.refresh_from_db()
+        players = set(invitation.players.values_list('pk', flat=True))
+        waiting = set(invitation.waitlist.values_list('user_id', flat=True))
+        self.assertEqual((invitation.seats_taken, len(players)), (4, 4))
+        self.assertFalse(players & waiting)
+        self.assertEqual(players | waiting, {user.pk for user in joiners})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'concurrent removals need PostgreSQL')
+class ConcurrentPlayerRemovalTest(TransactionTestCase):
+    def test_removing_the_same_player_twice_frees_one_seat(self):
+        host = User.objects.create_user(email='host@example.com', password='secret', nick='host')
+        game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                   game_time='45 min')
+        invitation = GameInvitation.objects.create(user=host, game=game, no_players=4, game_place='Home')
+        ann, bob = (User.objects.create_user(email=f'{nick}@example.com', password='x', nick=nick) for nick in ('ann', 'bob'))
+        invitation.players.add(ann, bob)
+        removals = [
+            lambda: GameInvitation.objects.get(pk=invitation.pk).players.remove(ann),
+            lambda: ann.invited_players.remove(invitation),
+            lambda: GameInvitation.objects.get(pk=invitation.pk).players.clear(),
+            lambda: GameInvitation.objects.get(pk=invitation.pk).players.remove(ann, bob),
+        ]
+        barrier = threading.Barrier(len(removals))
+
+        def run(removal):
+            try:
+                barrier.wait()
+                removal()
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=[removal]) for removal in removals]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        invitation.refresh_from_db()
+        self.assertEqual((invitation.seats_taken, invitation.players.count()), (0, 0))
+
+
+class InvitationCalendarTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.host, cls.ann, cls.bob = (
+            User.objects.create_user(email=f'{nick}@example.com', password='secret', nick=nick)
+            for nick in ('host', 'ann', 'bob')
+        )
+        cls.game = Game.objects.create(title='Azul', author='A', description='', min_players=2, max_players=4,
+                                       game_time='45 min')
+        cls.start = datetime.datetime(2030, 5, 1, 18, 0, tzinfo=datetime.timezone.utc)
+
+    def setUp(self):
+        self.client.force_login(self.ann)
+        self.client.post(reverse('calendar-token'))
+        self.ann.refresh_from_db()
+        self.client.logout()
+        self.url = reverse('invitation-calendar', args=[self.ann.calendar_token])
+
+    def invite(self, place, organizer=None, **kwargs):
+        return GameInvitation.objects.create(user=organizer or self.host, game=self.game, no_players=4,
+                                             game_place=place, game_time=self.start, **kwargs)
+
+    def feed(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b''.join(response.streaming_content).decode() if response.status_code == 200 else ''
+        return response, body
+
+    def test_streams_the_invitations_of_the_user(self):
+        seats.reserve_seat(self.invite('Joined, with; commas', extra_text='Line 1\nLine 2'), self.ann)
+        self.invite('Own', organizer=self.ann)
+        self.invite('Not mine')
+
+        response, body = self.feed()
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertTemplateNotUsed(response, 'userbase/user_invitations.html')
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n') and body.endswith('END:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('LOCATION:Joined\\, with\\; commas\r\n', body)
+        self.assertIn('DESCRIPTION:Line 1\\nLine 2\r\n', body)
+        self.assertIn('DTSTART:20300501T180000Z\r\nDTEND:20300501T184500Z\r\n', body)
+        self.assertNotIn('Not mine', body)
+
+    def test_unchanged_feed_costs_one_query(self):
+        invitation = self.invite('Home')
+        seats.reserve_seat(invitation, self.ann)
+        response, _ = self.feed()
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response, _ = self.feed(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Joins of others, edits and removals all change the feed of everyone on the invitation
+        for change in (
+            lambda: seats.reserve_seat(invitation, self.bob),
+            lambda: invitation.save(),
+            lambda: seats.release_seat(invitation, self.ann),
+        ):
+            change()
+            response, _ = self.feed(if_none_match=etag)
+            self.assertEqual(response.status_code, 200)
+            etag = response['ETag']
+
+    def test_players_changed_through_the_relation_bump_the_version(self):
+        invitation = self.invite('Home')
+        def versions():
+            return dict(User.objects.values_list('nick', 'invitation_version'))
+
+        before = versions()
+        invitation.players.add(self.ann)
+        self.ann.invited_players.remove(invitation)
+        after = versions()
+        self.assertEqual(after['ann'] - before['ann'], 2)
+        self.assertEqual(after['host'] - before['host'], 2)
+        self.assertEqual(after['bob'], before['bob'])
+
+    def test_unknown_or_replaced_token(self):
+        self.assertEqual(self.client.get(reverse('invitation-calendar', args=['nope'])).status_code, 404)
+        ical.rotate_token(self.ann)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_long_lines_are_folded(self):
+        line = 'SUMMARY:' + 'Żółw ' * 40
+        folded = ical.fold(line)
+        self.assertTrue(all(len(part.encode()) <= 75 for part in folded.split('\r\n')))
+        self.assertEqual(folded.replace('\r\n ', '').removesuffix('\r\n'), line)
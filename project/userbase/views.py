@@ -1,13 +1,22 @@
-import random
+import datetime
+
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
 from django.views.generic import FormView, RedirectView, View
 from django.urls import reverse_lazy
 from django.contrib.auth import login, logout
 
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
 
-from .forms import LoginForm, UserCreationForm, AddInvitationForm, EditInvitationForm, LuckyShotForm
-from .models import User, Game, GameInvitation
+from gamelist.pagination import KeysetPaginator
+from . import ical, lucky, seats
+from .forms import (LoginForm, UserCreationForm, AddInvitationForm, EditInvitationForm, LuckyShotForm,
+                    DiscoverInvitationsForm)
+from .models import User, Game, GameInvitation, ArchivedGameInvitation
 
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
@@ -146,41 +155,190 @@ class UserInvitationsView(LoginRequiredMixin, View):
     '''
     Description:
         View for displaying user invitations, available places, and managing invitations.
+        Each list is a single query: available places come from the seats_taken counter and the game is joined.
 
     Variables:
         template_name, login_url
 
     Methods:
         get: Retrieves user invitations, available places, and invitations accepted by the user.
+            With ?free=1 the open invitations are limited to the ones with free places.
+            Only upcoming invitations are offered; DiscoverInvitationsView filters and pages through them.
     '''
 
     template_name = 'userbase/user_invitations.html'
     login_url = reverse_lazy('login')
 
     def get(self, request, *args, **kwargs):
-        user_invitations = GameInvitation.objects.filter(user=self.request.user).order_by('game_time')
-        # Calculate available places for each invitation in user_invitations
-        for invitation in user_invitations:
-            invitation.available_places = invitation.no_players - invitation.players.count()
-        not_user_invitations = GameInvitation.objects.exclude(user=self.request.user)
-        available_user_invitations = not_user_invitations.exclude(players=self.request.user).order_by('game_time')
-        # Calculate available places for each invitation in available_user_invitations
-        for invitation in available_user_invitations:
-            invitation.available_places = invitation.no_players - invitation.players.count()
-        invitations_accepted = not_user_invitations.filter(players=self.request.user).order_by('game_time')
-        # Calculate available places for each invitation in invitations_accepted
-        for invitation in invitations_accepted:
-            invitation.available_places = invitation.no_players - invitation.players.count()
+        # One query per list: the free places come from the seats_taken counter and the game is joined
+        invitations = GameInvitation.objects.order_by('game_time', 'pk')
+        user_invitations = invitations.filter(user=self.request.user).with_available_places()
+        not_user_invitations = invitations.exclude(user=self.request.user)
+        available_user_invitations = not_user_invitations.upcoming().not_joined_by(
+            self.request.user).with_available_places()
+        free_only = request.GET.get('free') == '1'
+        if free_only:
+            available_user_invitations = available_user_invitations.with_free_places()
+        invitations_accepted = not_user_invitations.joined_by(self.request.user).with_available_places()
         return render(
             request,
             self.template_name,
             {
                 'user_invitations': user_invitations,
                 'available_user_invitations': available_user_invitations,
-                'invitations_accepted': invitations_accepted
+                'invitations_accepted': invitations_accepted,
+                'free_only': free_only,
+            }
+        )
+
+class DiscoverInvitationsView(LoginRequiredMixin, View):
+    '''
+    Description:
+        View for browsing the upcoming game invitations the user may join, filtered by a date window,
+        game, category and free seats.
+        Pages are selected by keyset pagination on (game_time, id): every page is a range scan of
+        userbase_invitation_time_idx starting no earlier than now, so past invitations are never read.
+
+    Variables:
+        template_name, login_url, paginate_by
+
+    Methods:
+        get: Filters the invitations with DiscoverInvitationsForm and renders the page of the "cursor" GET parameter.
+        filter_invitations: Applies the cleaned form data to a queryset of invitations.
+    '''
+
+    template_name = 'userbase/discover_invitations.html'
+    login_url = reverse_lazy('login')
+    paginate_by = 25
+
+    def get(self, request, *args, **kwargs):
+        form = DiscoverInvitationsForm(request.GET)
+        invitations = GameInvitation.objects.upcoming().exclude(user=request.user).not_joined_by(request.user)
+        if form.is_valid():
+            invitations = self.filter_invitations(invitations, form.cleaned_data)
+        else:
+            invitations = invitations.none()
+        paginator = KeysetPaginator(invitations.with_available_places(), ordering=('game_time', 'pk'),
+                                    per_page=self.paginate_by)
+        query = request.GET.copy()
+        query.pop('cursor', None)
+        return render(
+            request,
+            self.template_name,
+            {
+                'form': form,
+                'page': paginator.page(request.GET.get('cursor')),
+                'query': query.urlencode(),
             }
         )
 
+    def filter_invitations(self, invitations, data):
+        # Whole days in the current time zone; the window ends before midnight after date_to
+        if data['date_from']:
+            start = datetime.datetime.combine(data['date_from'], datetime.time.min)
+            invitations = invitations.filter(game_time__gte=timezone.make_aware(start))
+        if data['date_to']:
+            end = datetime.datetime.combine(data['date_to'] + datetime.timedelta(days=1), datetime.time.min)
+            invitations = invitations.filter(game_time__lt=timezone.make_aware(end))
+        if data['game']:
+            invitations = invitations.filter(game=data['game'])
+        if data['category']:
+            invitations = invitations.filter(game__in=Game.category.through.objects.filter(
+                category=data['category']).values('game_id'))
+        if data['free']:
+            invitations = invitations.with_free_places()
+        return invitations
+
+
+class InvitationHistoryView(LoginRequiredMixin, View):
+    '''
+    Description:
+        View for displaying the past game invitations the user organized or played in.
+        Invitations moved away by the archive_invitations command are only read with ?archive=1,
+        so the usual page touches the live table alone.
+
+    Variables:
+        template_name, login_url
+
+    Methods:
+        get: Retrieves the past invitations of the user, and the archived ones when asked for.
+    '''
+
+    template_name = 'userbase/invitation_history.html'
+    login_url = reverse_lazy('login')
+
+    def get(self, request, *args, **kwargs):
+        user = self.request.user
+        past_invitations = GameInvitation.objects.filter(game_time__lt=timezone.now()).filter(
+            Q(user=user) | Q(pk__in=GameInvitation.players.through.objects.filter(user=user).values('gameinvitation_id'))
+        ).select_related('game', 'user').order_by('-game_time', '-pk')
+        with_archive = request.GET.get('archive') == '1'
+        archived_invitations = None
+        if with_archive:
+            archived_invitations = ArchivedGameInvitation.objects.filter(
+                Q(user=user) | Q(pk__in=ArchivedGameInvitation.players.through.objects.filter(user=user).values(
+                    'archivedgameinvitation_id'))
+            ).select_related('game', 'user').order_by('-game_time', '-pk')
+        return render(
+            request,
+            self.template_name,
+            {
+                'past_invitations': past_invitations,
+                'archived_invitations': archived_invitations,
+                'with_archive': with_archive,
+            }
+        )
+
+
+class InvitationCalendarView(View):
+    '''
+    Description:
+        iCalendar feed of the invitations a user organizes or plays in, for calendar apps polling it.
+        The secret token in the URL identifies the user; no session is needed.
+
+        A poll starts with one lookup of the token on its unique index, which also reads the user's
+        invitation_version; an unchanged feed is answered 304 Not Modified right away. Otherwise the
+        events are streamed from a server-side cursor (see userbase.ical.feed_lines).
+
+    Methods:
+        get: Answers 304 for a matching If-None-Match, otherwise streams the feed with its ETag.
+    '''
+
+    def get(self, request, *args, **kwargs):
+        user = User.objects.filter(calendar_token=self.kwargs['token']).values_list('pk', 'invitation_version').first()
+        if user is None:
+            raise Http404
+        etag = ical.feed_etag(*user)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = StreamingHttpResponse(ical.feed_lines(user[0], request.get_host()),
+                                             content_type='text/calendar; charset=utf-8')
+            response['Content-Disposition'] = 'inline; filename="fog.ics"'
+        response['ETag'] = etag
+        # Calendar apps must ask again every time; the 304 makes that cheap
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class CalendarTokenView(LoginRequiredMixin, View):
+    '''
+    Description:
+        View for creating or replacing the token of the user's iCalendar feed URL.
+
+    Variables:
+        login_url
+
+    Methods:
+        post: Gives the user a new token, disabling the previous feed URL, and returns to the invitations.
+    '''
+
+    login_url = reverse_lazy('login')
+
+    def post(self, request, *args, **kwargs):
+        ical.rotate_token(request.user)
+        return redirect('user-invitations')
+
+
 class AddInvitationView(LoginRequiredMixin, View):
     '''
     Description:
@@ -232,6 +390,11 @@ class UserInvitationDetailsView(LoginRequiredMixin, View):
     Methods:
         get: Retrieves and renders the details of a specific game invitation.
         post: Processes the form submission for joining or leaving a game invitation.
+            A join only succeeds while a seat is free (see userbase.seats.reserve_seat);
+            a full invitation is answered with 409 Conflict and offers the waitlist.
+            A player may be removed by the organizer or leave by themselves; the freed seat goes
+            to the head of the waitlist in the same transaction (see userbase.seats.release_seat).
+        render_details: Renders the details page with the waitlist place of the current user.
     '''
 
     template_name = 'userbase/invitation_details.html'
@@ -240,7 +403,7 @@ class UserInvitationDetailsView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         invitation_pk = self.kwargs['invitation_pk']
         invitation = get_object_or_404(GameInvitation, pk=invitation_pk)
-        return render(request, self.template_name, {'invitation': invitation})
+        return self.render_details(invitation)
 
     def post(self, request, *args, **kwargs):
         invitation_pk = self.kwargs['invitation_pk']
@@ -249,16 +412,62 @@ class UserInvitationDetailsView(LoginRequiredMixin, View):
         if 'player_pk' in self.kwargs:
             player_pk = self.kwargs['player_pk']
             player = get_object_or_404(User, pk=player_pk)
-            invitation.players.remove(player)
-            text = f'Usunięto gracza {player.nick} z gry!'
+            if self.request.user.pk not in (invitation.user_id, player.pk):
+                raise PermissionDenied
+            promoted = seats.release_seat(invitation, player)
+            if player == self.request.user:
+                text = 'Wypisano Cię z gry.'
+            else:
+                text = f'Usunięto gracza {player.nick} z gry!'
+            if promoted:
+                text += f' Miejsce zajął {promoted[0].nick} z listy rezerwowej.'
         else:
-            invitation.players.add(self.request.user)
-            text = f'Dodano Cię do gry!'
-        invitation.save()
-        return render(
-            request,
-            'userbase/invitation_details.html',
-            {'invitation': invitation, 'text': text})
+            outcome = seats.reserve_seat(invitation, self.request.user)
+            if outcome == seats.FULL:
+                return self.render_details(invitation, 'Brak wolnych miejsc w tej grze!', status=409)
+            if outcome == seats.ALREADY_JOINED:
+                text = 'Jesteś już zapisany do tej gry.'
+            else:
+                text = f'Dodano Cię do gry!'
+        return self.render_details(invitation, text)
+
+    def render_details(self, invitation, text=None, status=200):
+        user = self.request.user
+        context = {
+            'invitation': invitation,
+            'text': text,
+            'is_player': invitation.players.filter(pk=user.pk).exists(),
+            'waitlist_position': seats.waitlist_position(invitation, user),
+        }
+        return render(self.request, self.template_name, context, status=status)
+
+
+class InvitationWaitlistView(UserInvitationDetailsView):
+    '''
+    Description:
+        View for joining or leaving the waitlist of a full game invitation.
+
+    Methods:
+        post: Puts the user at the end of the waitlist, or takes a seat if one is free meanwhile.
+            With "leave" in the submitted data the user leaves the waitlist instead.
+    '''
+
+    def post(self, request, *args, **kwargs):
+        invitation_pk = self.kwargs['invitation_pk']
+        invitation = get_object_or_404(GameInvitation, pk=invitation_pk)
+
+        if 'leave' in request.POST:
+            invitation.waitlist.filter(user=self.request.user).delete()
+            return self.render_details(invitation, 'Wypisano Cię z listy rezerwowej.')
+
+        outcome = seats.join_waitlist(invitation, self.request.user)
+        if outcome == seats.ALREADY_JOINED:
+            text = 'Jesteś już zapisany do tej gry.'
+        elif outcome == seats.JOINED:
+            text = 'Dodano Cię do gry!'
+        else:
+            text = 'Zapisano Cię na listę rezerwową.'
+        return self.render_details(invitation, text)
 
 
 class EditInvitationView(LoginRequiredMixin, View):
@@ -272,6 +481,7 @@ class EditInvitationView(LoginRequiredMixin, View):
     Methods:
         get: Renders the form for editing a game invitation.
         post: Processes the form submission for editing a game invitation.
+            Seats added by raising the number of players go to the waitlist first.
     '''
 
     form_class = EditInvitationForm
@@ -306,6 +516,8 @@ class EditInvitationView(LoginRequiredMixin, View):
             invitation = form.save(commit=False)
             invitation.user = request.user
             invitation.save()
+            # More players allowed: the waitlist takes the new seats first
+            seats.promote_waitlist(invitation)
             return redirect('invitation-details', invitation_pk=invitation.pk)
         else:
             return render(request, self.template_name, context)
@@ -340,7 +552,10 @@ class DeleteInvitationView(View):
 class LuckyShotView(LoginRequiredMixin, View):
     '''
     Description:
-    View for a lucky shot game where the user can find a random game based on the number of players.
+    View for a lucky shot game where the user can find a random game based on the number of players
+    and, optionally, the time budget. The game is drawn in the database without loading the collection,
+    optionally preferring games not picked recently in the session (see userbase.lucky).
+    For a game night, the game can be drawn from the collections of everyone on an invitation instead.
 
     Variables:
     form_class, template_name, login_url
@@ -356,16 +571,29 @@ class LuckyShotView(LoginRequiredMixin, View):
 
 
     def get(self, request, *args, **kwargs):
-        form = self.form_class()
+        # Links from an invitation preselect it, e.g. ?invitation=12
+        form = self.form_class(request.user, initial={'invitation': request.GET.get('invitation')})
         context = {"form": form}
         return render(request, self.template_name, context)
 
     def post(self, request, *args, **kwargs):
-        form = self.form_class(request.POST)
+        form = self.form_class(request.user, request.POST)
         if form.is_valid():
             no_players = form.cleaned_data['no_players']
-            games = request.user.games.filter(min_players__lte=no_players, max_players__gte=no_players)
-            random_game = random.choice(games) if games else None
+            invitation = form.cleaned_data['invitation']
+            if invitation:
+                games = lucky.group_games(invitation, form.cleaned_data['group_mode'])
+            else:
+                games = request.user.games.all()
+            games = games.filter(min_players__lte=no_players, max_players__gte=no_players)
+            if form.cleaned_data['max_time']:
+                games = games.filter(max_minutes__lte=form.cleaned_data['max_time'])
+            if form.cleaned_data['prefer_fresh']:
+                random_game = lucky.pick_fresh(games, request.session.get(lucky.RECENT_PICKS_SESSION_KEY, []))
+            else:
+                random_game = lucky.pick_random(games)
+            if random_game is not None:
+                lucky.remember_pick(request.session, random_game)
             context = {"form": form, "random_game": random_game}
             return render(request, self.template_name, context)
         else: